@@ -10,9 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -46,6 +49,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым: время запроса для /metrics включает все остальные middleware
+    'tasks.middleware.MetricsMiddleware',
+    # Чтение безопасных запросов - с реплик DATABASE_REPLICAS (до всего, что ходит в базу)
+    'tasks.db_router.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,12 +87,72 @@ WSGI_APPLICATION = 'DjangoProject8.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# По умолчанию SQLite; DB_ENGINE=postgresql - PostgreSQL из переменных POSTGRES_*
+# (нужен пакет psycopg[pool]). Локальный сервер для разработки и тестов: docker-compose.yml.
+# POSTGRES_POOL=1 (по умолчанию) - пул соединений psycopg внутри процесса; с пулом
+# CONN_MAX_AGE должен быть 0. POSTGRES_POOL=0 - постоянные соединения на CONN_MAX_AGE секунд
+# с проверкой перед использованием (CONN_HEALTH_CHECKS)
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    POSTGRES_POOL = os.environ.get('POSTGRES_POOL', '1') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'task_manager'),
+            'USER': os.environ.get('POSTGRES_USER', 'task_manager'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'task_manager'),
+            'HOST': os.environ.get('POSTGRES_HOST', '127.0.0.1'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if POSTGRES_POOL else int(os.environ.get('POSTGRES_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('POSTGRES_POOL_MIN_SIZE', 2)),
+                    'max_size': int(os.environ.get('POSTGRES_POOL_MAX_SIZE', 20)),
+                    # Сколько ждать свободного соединения, прежде чем запрос упадет
+                    'timeout': float(os.environ.get('POSTGRES_POOL_TIMEOUT', 10)),
+                },
+            } if POSTGRES_POOL else {},
+        }
     }
-}
+elif DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Транзакция сразу берет блокировку на запись: без этого повышение
+                # блокировки чтения до записи падает с "database is locked", не дожидаясь busy_timeout
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(f'DB_ENGINE={DB_ENGINE!r}: ожидается sqlite или postgresql')
+
+# Реплики только для чтения (tasks/db_router.py): DB_REPLICAS=путь1,путь2 для SQLite
+# (копия базы: manage.py sqlite_replica путь) или DB_REPLICAS=хост1,хост2 для PostgreSQL.
+# Запись всегда идет в default. Тесты запускаются без DB_REPLICAS (MIRROR - чтобы раннер
+# не создавал для реплик свои базы); маршрутизацию на копии файла проверяет ReplicaRoutingTests
+DATABASE_REPLICAS = []
+for replica_index, replica in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    replica_alias = f'replica{replica_index}'
+    DATABASES[replica_alias] = {
+        **DATABASES['default'],
+        'HOST' if DB_ENGINE == 'postgresql' else 'NAME': replica,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(replica_alias)
+DATABASE_ROUTERS = ['tasks.db_router.ReplicaRouter']
+# Сколько секунд после записи клиент читает только из default (задержка репликации)
+DATABASE_REPLICA_STICKY_SECONDS = 5
+
+# PRAGMA для каждого соединения SQLite (tasks/sqlite_tuning.py).
+# SQLITE_TUNING=0 - оставить настройки SQLite по умолчанию. Обслуживание - db_maintenance
+SQLITE_TUNING_ENABLED = os.environ.get('SQLITE_TUNING', '1') == '1'
+# None - DEFAULT_PRAGMAS; словарь целиком заменяет набор PRAGMA
+SQLITE_PRAGMAS = None
 
 
 # Password validation
@@ -106,6 +173,22 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Хэшеры Django по умолчанию, PBKDF2-SHA256 - с числом итераций из калибровки (tasks/hashers.py).
+# calibrate_password_hasher подбирает итерации под целевое время хэша на этом хосте и пишет их
+# в PASSWORD_HASHER_CALIBRATION_FILE; хэши пересчитываются при следующем входе пользователя.
+# Итераций не меньше PASSWORD_HASHER_MIN_ITERATIONS (по умолчанию - значение Django).
+# На нескольких хостах файл калибровки должен быть одинаковым, иначе хэши пересчитываются
+# туда-обратно при каждом входе на другой хост
+PASSWORD_HASHERS = [
+    'tasks.hashers.CalibratedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASHER_CALIBRATION_FILE = BASE_DIR / 'run' / 'password_hasher.json'
+PASSWORD_HASHER_TARGET_MS = 250
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -132,8 +215,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Настройки Django REST Framework
 REST_FRAMEWORK = {
     # ЗАДАНИЕ 1: JWT аутентификация
+    # Пользователь берется из кэша (tasks/authentication.py), а не из auth_user на каждый запрос
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'tasks.authentication.CachedJWTAuthentication',
     ),
 
     # ЗАДАНИЕ 2: Пермишены по умолчанию
@@ -145,6 +229,12 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,  # 5 элементов по умолчанию
 
+    # JSON-рендерер с замером времени рендеринга для /metrics
+    'DEFAULT_RENDERER_CLASSES': [
+        'tasks.metrics.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
     # Фильтрация, поиск, сортировка
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -153,13 +243,74 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Объединение одинаковых одновременных запросов (tasks/coalescing.py):
+# сколько секунд готовый ответ отдается повторным запросам из памяти
+SINGLE_FLIGHT_TTL = 1.0
+
+# Монитор SQL (tasks/sql_monitor.py): в db_logs.log попадают запросы дольше SQL_SLOW_QUERY_MS
+# и случайная доля SQL_QUERY_SAMPLE_RATE остальных; агрегаты по отпечаткам запросов
+# (SQL_STATS_TOP самых затратных) сбрасываются раз в SQL_STATS_FLUSH_INTERVAL секунд
+SQL_MONITOR_ENABLED = True
+SQL_SLOW_QUERY_MS = 100
+SQL_QUERY_SAMPLE_RATE = 0.01
+SQL_STATS_FLUSH_INTERVAL = 60
+SQL_STATS_TOP = 50
+
+# Кэш Django. LocMemCache - у каждого процесса свой: сброс по записи виден только
+# в том воркере, где была запись, остальные отдают старый ответ до RESPONSE_CACHE_TTL.
+# Для нескольких воркеров нужен общий кэш, например Redis (пакет redis):
+#     'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#     'LOCATION': 'redis://127.0.0.1:6379/1',
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'task-manager',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Кэш ответов анонимных GET для списков и карточек задач, подзадач и категорий
+# (tasks/response_cache.py): ключ включает поколения моделей, запись в модель их сдвигает
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TTL = 300
+
+# Кэш пользователей JWT-аутентификации (tasks/authentication.py): сбрасывается при сохранении
+# пользователя; TTL ограничивает устаревание, если User меняют в обход save() или в другом
+# воркере при LocMemCache. QuerySet.update(is_active=False) сигналов не шлет: заблокированный
+# так пользователь проходит аутентификацию до AUTH_USER_CACHE_TTL секунд - блокировать через
+# user.save() или вызывать tasks.authentication.invalidate_user(pk) после update()
+AUTH_USER_CACHE_ALIAS = 'default'
+AUTH_USER_CACHE_TTL = 60
+
+# Отозванные refresh-токены (tasks/tokens.py): jti из BlacklistedToken держатся в фильтре Блума
+# процесса; новые записи подгружаются раз в TOKEN_BLACKLIST_REFRESH_INTERVAL секунд, фильтр
+# пересобирается раз в TOKEN_BLACKLIST_REBUILD_INTERVAL. Истекшие токены удаляет purge_expired_tokens
+TOKEN_BLACKLIST_REFRESH_INTERVAL = 5
+TOKEN_BLACKLIST_REBUILD_INTERVAL = 600
+
+# last_login (tasks/last_login.py): вход только кладет время в буфер процесса, буфер пишется
+# одним UPDATE на LAST_LOGIN_BATCH_SIZE пользователей раз в LAST_LOGIN_FLUSH_INTERVAL секунд
+LAST_LOGIN_FLUSH_INTERVAL = 30
+LAST_LOGIN_BATCH_SIZE = 500
+
+# Метрики (/metrics, tasks/metrics.py): каждый воркер раз в METRICS_FLUSH_INTERVAL секунд
+# сбрасывает свой снимок в METRICS_DIR, /metrics суммирует снимки всех воркеров хоста.
+# METRICS_DIR = None - только метрики обслуживающего процесса
+# Снимки завершившихся процессов удаляются при сборе; тесты снимков не пишут (tasks/test_runner.py)
+METRICS_DIR = BASE_DIR / 'run' / 'metrics'
+METRICS_FLUSH_INTERVAL = 5
+
+TEST_RUNNER = 'tasks.test_runner.TestRunner'
+
 # Настройки SimpleJWT
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,  # Важно для безопасности
     'BLACKLIST_AFTER_ROTATION': True,  # Помещать использованные токены в blacklist
-    'UPDATE_LAST_LOGIN': True,
+    # last_login пишет буфер tasks/last_login.py, а не simplejwt на каждый вход
+    'UPDATE_LAST_LOGIN': False,
 
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': 'django-insecure-your-secret-key-here-change-in-production',
@@ -187,8 +338,6 @@ SIMPLE_JWT = {
 # ==============================================
 
 # Создаем папку logs если ее нет
-import os
-
 LOG_DIR = os.path.join(BASE_DIR, 'logs')
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
@@ -209,47 +358,53 @@ LOGGING = {
             'format': '{asctime} {levelname} {message}',
             'style': '{',
         },
-        'db_format': {
-            'format': '{asctime} {levelname} {duration}s\nSQL: {sql}',
-            'style': '{',
+        # Структурированные записи: одна строка JSON, поля из extra= попадают в запись
+        'json': {
+            '()': 'tasks.log_pipeline.JSONFormatter',
         },
     },
     'handlers': {
+        # Обработчики tasks.log_pipeline.Queued*: поток запроса только кладет запись в очередь,
+        # форматирует и пишет пачками фоновый поток; при переполнении записи отбрасываются и считаются
+
         # Задание 2: Логи в консоль (работа сервера)
         'console': {
             'level': 'INFO',
-            'class': 'logging.StreamHandler',
+            'class': 'tasks.log_pipeline.QueuedStreamHandler',
             'formatter': 'verbose',
         },
 
-        # Задание 2: Логи HTTP запросов в файл
+        # Задание 2: Логи HTTP запросов в файл (JSON, ротация безопасна для нескольких процессов)
         'http_file': {
             'level': 'INFO',
-            'class': 'logging.handlers.RotatingFileHandler',
+            'class': 'tasks.log_pipeline.QueuedRotatingFileHandler',
             'filename': os.path.join(LOG_DIR, 'http_logs.log'),
             'maxBytes': 1024 * 1024 * 5,  # 5 MB
             'backupCount': 5,
-            'formatter': 'http_format',
+            'queue_size': 10000,
+            'formatter': 'json',
         },
 
-        # Задание 2: Логи запросов в базу данных в файл
+        # Задание 2: Логи запросов в базу данных в файл (медленные, выборка и агрегаты, см. SQL_*)
         'db_file': {
-            'level': 'DEBUG',
-            'class': 'logging.handlers.RotatingFileHandler',
+            'level': 'INFO',
+            'class': 'tasks.log_pipeline.QueuedRotatingFileHandler',
             'filename': os.path.join(LOG_DIR, 'db_logs.log'),
             'maxBytes': 1024 * 1024 * 5,  # 5 MB
             'backupCount': 5,
-            'formatter': 'db_format',
+            'queue_size': 10000,
+            'formatter': 'json',
         },
 
         # Общий файл логов
         'file': {
             'level': 'WARNING',
-            'class': 'logging.handlers.RotatingFileHandler',
+            'class': 'tasks.log_pipeline.QueuedRotatingFileHandler',
             'filename': os.path.join(LOG_DIR, 'general.log'),
             'maxBytes': 1024 * 1024 * 5,  # 5 MB
             'backupCount': 5,
-            'formatter': 'verbose',
+            'queue_size': 10000,
+            'formatter': 'json',
         },
     },
     'loggers': {
@@ -274,10 +429,11 @@ LOGGING = {
             'propagate': False,
         },
 
-        # Задание 2: Логи запросов в базу данных
-        'django.db.backends': {
+        # Задание 2: Логи запросов в базу данных. Вместо DEBUG-лога каждого запроса
+        # django.db.backends - монитор tasks/sql_monitor.py на execute wrapper соединений
+        'tasks.sql': {
             'handlers': ['db_file'],
-            'level': 'DEBUG',
+            'level': 'INFO',
             'propagate': False,
         },
 
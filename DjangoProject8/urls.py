@@ -4,6 +4,9 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from tasks.coalescing import coalesce_view
+from tasks.metrics import metrics_view
+
 # Swagger
 schema_view = get_schema_view(
     openapi.Info(
@@ -24,15 +27,18 @@ urlpatterns = [
 
     # Swagger документация
     re_path(r'^swagger(?P<format>\.json|\.yaml)$',
-            schema_view.without_ui(cache_timeout=0),
+            coalesce_view(schema_view.without_ui(cache_timeout=0)),
             name='schema-json'),
     path('swagger/',
-         schema_view.with_ui('swagger', cache_timeout=0),
+         coalesce_view(schema_view.with_ui('swagger', cache_timeout=0)),
          name='schema-swagger-ui'),
     path('redoc/',
-         schema_view.with_ui('redoc', cache_timeout=0),
+         coalesce_view(schema_view.with_ui('redoc', cache_timeout=0)),
          name='schema-redoc'),
 
+    # Метрики в формате Prometheus
+    path('metrics', metrics_view, name='metrics'),
+
     # Наше API (JWT токены теперь внутри tasks.urls)
     path('api/', include('tasks.urls')),
 ]
\ No newline at end of file
@@ -1,7 +1,108 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from django.utils.text import Truncator
 from .models import Task, SubTask, Category
+from .search import full_text_search
+
+
+# ==============================================
+# ИНСТРУМЕНТЫ ДЛЯ БОЛЬШИХ ТАБЛИЦ
+# ==============================================
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор без точного COUNT(*) по всей таблице.
+    Без фильтров число строк - верхняя оценка MAX(id): статистика СУБД (sqlite_stat1 / pg_class)
+    обновляется только ANALYZE и может сильно отставать, а до строк за ее пределами было бы
+    не дойти. В конце списка после удалений возможны пустые страницы.
+    С фильтрами строки считаются не дальше страницы после текущей (и не меньше count_limit):
+    если строк больше, count на одну больше - ссылка на следующую страницу остается
+    """
+    count_limit = 10000
+
+    def __init__(self, *args, current_page=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.current_page = current_page
+
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        if not query.where:
+            return self.estimate_table_rows(self.object_list.model, self.object_list.db)
+        window = max(self.count_limit, (self.current_page + 1) * self.per_page)
+        return self.object_list.order_by()[:window + 1].count()
+
+    @staticmethod
+    def estimate_table_rows(model, using):
+        connection = connections[using]
+        table = model._meta.db_table
+        estimate = 0
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+                row = cursor.fetchone()
+                if row and row[0] >= 0:
+                    estimate = row[0]
+            elif connection.vendor == 'sqlite':
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+                )
+                if cursor.fetchone():
+                    cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+                    row = cursor.fetchone()
+                    if row:
+                        estimate = int(row[0].split()[0])
+            # Верхняя оценка по первичному ключу - O(1) по индексу; строк не больше MAX(id)
+            cursor.execute(f'SELECT MAX({model._meta.pk.column}) FROM {connection.ops.quote_name(table)}')
+            row = cursor.fetchone()
+        return max(estimate, row[0] or 0)
+
+
+class EstimatedCountAdminMixin:
+    """Список большой таблицы без точного COUNT(*) на каждой странице (EstimatedCountPaginator)"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        try:
+            current_page = int(request.GET.get(PAGE_VAR, 1))
+        except ValueError:
+            current_page = 1
+        return self.paginator(queryset, per_page, orphans, allow_empty_first_page, current_page=current_page)
+
+
+class BoundedRelatedFieldListFilter(admin.RelatedFieldListFilter):
+    """
+    Фильтр по связанной модели, который не выводит в боковую панель всю таблицу:
+    только последние limit объектов (по ordering их админки) и выбранное значение
+    """
+    limit = 20
+
+    def field_choices(self, field, request, model_admin):
+        related_model = field.remote_field.model
+        ordering = self.field_admin_ordering(field, request, model_admin) or ('-pk',)
+        queryset = related_model._default_manager.order_by(*ordering)
+        choices = [(obj.pk, str(obj)) for obj in queryset[:self.limit]]
+
+        shown = {str(pk) for pk, _ in choices}
+        selected = [value for value in (self.lookup_val or []) if value not in shown]
+        if selected:
+            choices += [(obj.pk, str(obj)) for obj in related_model._default_manager.filter(pk__in=selected)]
+        return choices
+
+
+class FullTextSearchAdminMixin:
+    """Поиск в списке и в автодополнении через FTS5-индекс вместо LIKE по всем строкам"""
+
+    def get_search_results(self, request, queryset, search_term):
+        searched = full_text_search(queryset, search_term.split()) if search_term else None
+        if searched is None:
+            return super().get_search_results(request, queryset, search_term)
+        return searched, False
 
 
 # 1. Инлайн форма для отображения подзадач внутри задачи
@@ -34,11 +135,11 @@ class CategoryAdmin(admin.ModelAdmin):
 
 
 # 3. Настройка админки для Task
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(EstimatedCountAdminMixin, FullTextSearchAdminMixin, admin.ModelAdmin):
     # Используем кастомный метод для отображения укороченного названия
     list_display = ('id', 'short_title', 'status', 'deadline', 'created_at', 'subtasks_count')
     list_display_links = ('id', 'short_title')
-    list_filter = ('status', 'categories', 'deadline')
+    list_filter = ('status', ('categories', BoundedRelatedFieldListFilter), 'deadline')
     search_fields = ('title', 'description')
     filter_horizontal = ('categories',)
     ordering = ('-created_at',)
@@ -78,28 +179,35 @@ class TaskAdmin(admin.ModelAdmin):
     def subtasks_count(self, obj):
         """
         Показывает количество подзадач у задачи
+        (денормализованный счетчик - без запроса на каждую строку)
         """
-        count = obj.subtasks.count()
+        count = obj.subtask_count
         return format_html(
             '<span style="color: {};">{}</span>',
             'green' if count > 0 else 'gray',
-            f"{count} подзадач"
+            f"{obj.subtask_done_count}/{count} подзадач"
         )
 
     subtasks_count.short_description = 'Подзадачи'
+    subtasks_count.admin_order_field = 'subtask_count'
 
 
 # 4. Настройка админки для SubTask
-class SubTaskAdmin(admin.ModelAdmin):
+class SubTaskAdmin(EstimatedCountAdminMixin, FullTextSearchAdminMixin, admin.ModelAdmin):
     # Кастомный action для массового изменения статуса
     actions = ['mark_as_done']
 
     list_display = ('id', 'title', 'task_with_full_title', 'status', 'deadline', 'created_at')
     list_display_links = ('id', 'title')
-    list_filter = ('status', 'task', 'deadline')
+    list_filter = ('status', ('task', BoundedRelatedFieldListFilter), 'deadline')
     search_fields = ('title', 'description')
     ordering = ('-created_at',)
 
+    # Название задачи подтягивается JOIN'ом, а не запросом на каждую строку
+    list_select_related = ('task',)
+    # Выбор задачи через автодополнение (поиск по TaskAdmin), а не <select> со всеми задачами
+    autocomplete_fields = ('task',)
+
     # Группировка полей в форме редактирования
     fieldsets = (
         ('Основная информация', {
@@ -143,18 +251,6 @@ class SubTaskAdmin(admin.ModelAdmin):
 
         self.message_user(request, message, level='success')
 
-    # Переопределяем метод formfield_for_foreignkey для отображения полных названий задач
-    def formfield_for_foreignkey(self, db_field, request, **kwargs):
-        """
-        Настройка поля ForeignKey для отображения полных названий задач
-        при создании/редактировании подзадачи
-        """
-        if db_field.name == "task":
-            # Используем строковое представление задачи (__str__ метод)
-            # которое возвращает полное название
-            kwargs["queryset"] = Task.objects.all().order_by('title')
-        return super().formfield_for_foreignkey(db_field, request, **kwargs)
-
 
 # Регистрируем модели с нашими настройками
 admin.site.register(Category, CategoryAdmin)
@@ -1,6 +1,30 @@
 from django.apps import AppConfig
+from django.core.signals import request_finished
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class TasksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tasks'
+
+    def ready(self):
+        # Подключаем обработчики сигналов (счетчики и т.п.)
+        from . import signals  # noqa: F401
+        from .search import ensure_search_index_after_migrate
+        from .metrics import install_query_counter
+        from .sql_monitor import install_monitor
+        from .last_login import flush_last_login_if_due
+        from .sqlite_tuning import configure_sqlite_connection
+
+        # FTS5-индекс не описан в моделях - создаем/чиним его после каждого migrate
+        post_migrate.connect(ensure_search_index_after_migrate, sender=self)
+
+        # WAL, synchronous=NORMAL, mmap и остальные PRAGMA из SQLITE_PRAGMAS - до первого запроса
+        connection_created.connect(configure_sqlite_connection)
+        # Медленные запросы и агрегаты по отпечаткам SQL - на каждом соединении
+        connection_created.connect(install_monitor)
+        # Число и время SQL-запросов каждого HTTP-запроса для /metrics
+        connection_created.connect(install_query_counter)
+        # Отложенные last_login пишутся пачкой после ответа, а не в запросе входа
+        request_finished.connect(flush_last_login_if_due)
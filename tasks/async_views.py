@@ -0,0 +1,207 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.forms import ModelChoiceField
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.views import View
+from django_filters import utils as filter_utils
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import exceptions
+from rest_framework.response import Response
+
+from . import views
+from .coalescing import request_key, single_flight
+from .conditional import ConditionalListMixin, ConditionalObjectMixin, set_validators
+from .metrics import TimedJSONRenderer
+from .models import TaskStatusCounter
+from .response_cache import CachedResponseMixin
+
+
+# ==============================================
+# АСИНХРОННЫЕ АНАЛОГИ ШАГОВ DRF
+# ==============================================
+
+async def aperform_authentication(request):
+    """
+    Request._authenticate для асинхронного кода: схемы с aauthenticate (CachedJWTAuthentication)
+    работают без блокировок, остальные - в потоке через sync_to_async
+    """
+    for authenticator in request.authenticators:
+        try:
+            if hasattr(authenticator, 'aauthenticate'):
+                user_auth_tuple = await authenticator.aauthenticate(request)
+            else:
+                user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+        except exceptions.APIException:
+            request._not_authenticated()
+            raise
+
+        if user_auth_tuple is not None:
+            request._authenticator = authenticator
+            request.user, request.auth = user_auth_tuple
+            return
+
+    request._not_authenticated()
+
+
+async def afilter_by_filterset(backend, request, queryset, view):
+    """DjangoFilterBackend.filter_queryset: ModelChoiceFilter проверяет значение запросом к базе - в потоке"""
+    filterset = backend.get_filterset(request, queryset, view)
+    if filterset is None:
+        return queryset
+
+    if any(isinstance(field, ModelChoiceField) for field in filterset.form.fields.values()):
+        valid = await sync_to_async(filterset.is_valid)()
+    else:
+        valid = filterset.is_valid()
+    if not valid and backend.raise_exception:
+        raise filter_utils.translate_validation(filterset.errors)
+    return filterset.qs
+
+
+async def afilter_queryset(view, request, queryset):
+    """GenericAPIView.filter_queryset: остальные фильтры только строят queryset и базу не трогают"""
+    for backend_class in list(view.filter_backends):
+        backend = backend_class()
+        if isinstance(backend, DjangoFilterBackend):
+            queryset = await afilter_by_filterset(backend, request, queryset, view)
+        else:
+            queryset = backend.filter_queryset(request, queryset, view)
+    return queryset
+
+
+async def aget_object(view):
+    """GenericAPIView.get_object через aget"""
+    queryset = await afilter_queryset(view, view.request, view.get_queryset())
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+    try:
+        instance = await queryset.aget(**{view.lookup_field: view.kwargs[lookup_url_kwarg]})
+    except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+        raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+    view.check_object_permissions(view.request, instance)
+    return instance
+
+
+def to_http_response(response):
+    """
+    Отрендеренный Response как обычный HttpResponse: у Response есть render(),
+    и обработчик Django вызвал бы его через sync_to_async
+    """
+    if not hasattr(response, 'render'):
+        return response
+    response.render()
+    http_response = HttpResponse(response.content, status=response.status_code)
+    for header, value in response.items():
+        http_response[header] = value
+    return http_response
+
+
+# ==============================================
+# ПРЕДСТАВЛЕНИЯ
+# ==============================================
+
+class AsyncAPIView(View):
+    """
+    Асинхронное представление только для чтения по настройкам DRF-представления view_class:
+    те же аутентификация, права, фильтры, сортировка, пагинация, сериализатор, кэш ответов,
+    ETag и формат ошибок. Запросы к базе идут через асинхронный ORM, пользователь JWT -
+    через aauthenticate. Отвечает только JSON: BrowsableAPIRenderer строит формы синхронно
+    """
+    view_class = None
+    http_method_names = ['get', 'head', 'options']
+    renderer_classes = [TimedJSONRenderer]
+
+    async def get(self, request, *args, **kwargs):
+        view = self.view_class(renderer_classes=self.renderer_classes)
+        view.args, view.kwargs = args, kwargs
+        view.headers = view.default_response_headers
+        drf_request = view.initialize_request(request, *args, **kwargs)
+        view.request = drf_request
+
+        try:
+            view.format_kwarg = view.get_format_suffix(**kwargs)
+            drf_request.accepted_renderer, drf_request.accepted_media_type = (
+                view.perform_content_negotiation(drf_request)
+            )
+            await aperform_authentication(drf_request)
+            view.check_permissions(drf_request)
+            view.check_throttles(drf_request)
+            response = await self.handle(view, drf_request)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+
+        return to_http_response(view.finalize_response(drf_request, response, *args, **kwargs))
+
+    async def handle(self, view, request):
+        raise NotImplementedError
+
+
+class AsyncListView(AsyncAPIView):
+    """list() над ListAPIView: keyset-страница читается через aiterator"""
+
+    async def handle(self, view, request):
+        if isinstance(view, CachedResponseMixin):
+            return await view.acached_response(self.list, request, view)
+        return await self.list(request, view)
+
+    async def list(self, request, view):
+        queryset = await afilter_queryset(view, request, view.get_queryset())
+        etag = None
+        if isinstance(view, ConditionalListMixin):
+            etag = await view.aget_list_etag(queryset)
+            response = get_conditional_response(request, etag)
+            if response is not None:
+                return set_validators(response, etag)
+
+        page = await view.paginator.apaginate_queryset(queryset, request, view)
+        response = view.get_paginated_response(view.get_serializer(page, many=True).data)
+        return set_validators(response, etag) if etag else response
+
+
+class AsyncRetrieveView(AsyncAPIView):
+    """retrieve() над RetrieveAPIView: объект загружается через aget"""
+
+    async def handle(self, view, request):
+        if isinstance(view, CachedResponseMixin):
+            return await view.acached_response(self.retrieve, request, view)
+        return await self.retrieve(request, view)
+
+    async def retrieve(self, request, view):
+        instance = await aget_object(view)
+        if isinstance(view, ConditionalObjectMixin):
+            return view.object_response(request, instance)
+        return Response(view.get_serializer(instance).data)
+
+
+class AsyncTaskListView(AsyncListView):
+    view_class = views.TaskListCreateView
+
+
+class AsyncTaskDetailView(AsyncRetrieveView):
+    view_class = views.TaskRetrieveUpdateDestroyView
+
+
+class AsyncMyTasksView(AsyncListView):
+    view_class = views.MyTasksView
+
+
+class AsyncSubTaskListView(AsyncListView):
+    view_class = views.SubTaskListCreateView
+
+
+class AsyncTaskStatsView(AsyncAPIView):
+    """Статистика TaskStatsAPIView: счетчики читаются async for, просроченные - acount"""
+    view_class = views.TaskStatsAPIView
+
+    async def handle(self, view, request):
+        async def compute():
+            owner = view.get_owner(request)
+            # Не aiterator: в Django 5.2 он выполняет values_list-запрос вне потока (SynchronousOnlyOperation)
+            status_counts = [
+                row async for row in TaskStatusCounter.objects.filter(owner=owner).values_list('status', 'count')
+            ]
+            return view.build_stats(status_counts, await view.overdue_tasks(owner).acount())
+
+        # Одинаковые одновременные запросы разделяют одно вычисление, как @coalesce_response
+        key = request_key(request, type(self).__qualname__, 'get')
+        return Response(await single_flight.ado(key, compute))
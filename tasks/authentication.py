@@ -0,0 +1,145 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .db_router import areplica_may_be_stale, replica_may_be_stale
+
+
+def get_config():
+    return {
+        'alias': getattr(settings, 'AUTH_USER_CACHE_ALIAS', 'default'),
+        'ttl': getattr(settings, 'AUTH_USER_CACHE_TTL', 60),
+    }
+
+
+def get_cache():
+    return caches[get_config()['alias']]
+
+
+def _user_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def _version_key(user_id):
+    return f'auth-user:version:{user_id}'
+
+
+def _bump_version(user_id):
+    cache = get_cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.add(_version_key(user_id), time.time_ns(), timeout=None)
+
+
+def invalidate_user(user_id, using=None):
+    """
+    Сбрасывает закэшированного пользователя: версия сдвигается сразу и после коммита,
+    так что пользователь, прочитанный параллельным запросом до коммита, не подойдет
+    """
+    _bump_version(user_id)
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(lambda: _bump_version(user_id), using=using)
+
+
+def fresh_user(user):
+    """Пользователь для изменения: объект из кэша перечитывается, чтобы save() не записал устаревшие поля"""
+    if getattr(user, 'from_auth_cache', False):
+        return type(user).objects.get(pk=user.pk)
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication без запроса к auth_user на каждый запрос: пользователь берется
+    из кэша по user_id на AUTH_USER_CACHE_TTL секунд. Рядом лежит версия пользователя,
+    ее сдвигает любое сохранение или удаление User (tasks/signals.py) - смена пароля,
+    профиля, деактивация. Пользователь и версия читаются одним get_many; запись
+    с устаревшей версией считается промахом. Проверки активности и отзыва токена
+    (CHECK_USER_IS_ACTIVE, CHECK_REVOKE_TOKEN) выполняются и для пользователя из кэша
+    """
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as error:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from error
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        cache = get_cache()
+        user_key, version_key = _user_key(user_id), _version_key(user_id)
+        cached = cache.get_many([user_key, version_key])
+        version = cached.get(version_key)
+        if version is None:
+            cache.add(version_key, time.time_ns(), timeout=None)
+            version = cache.get(version_key)
+
+        entry = cached.get(user_key)
+        if entry is not None and entry[0] == version:
+            return self.cached_user(entry[1], validated_token)
+
+        # Версия прочитана до запроса в базу: изменение пользователя во время
+        # чтения сдвинет ее, и сохраненная запись не будет использована.
+        # Пользователь с отстающей реплики сразу после записи не кэшируется
+        user = super().get_user(validated_token)
+        if not replica_may_be_stale():
+            cache.set(user_key, (version, user), get_config()['ttl'])
+        return user
+
+    def cached_user(self, user, validated_token):
+        self.check_user(user, validated_token)
+        user.from_auth_cache = True
+        return user
+
+    # Асинхронные представления (tasks/async_views.py)
+
+    async def aauthenticate(self, request):
+        """authenticate без блокирующих вызовов: кэш через aget_many, промах - User.objects.aget"""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        cache = get_cache()
+        user_key, version_key = _user_key(user_id), _version_key(user_id)
+        cached = await cache.aget_many([user_key, version_key])
+        version = cached.get(version_key)
+        if version is None:
+            await cache.aadd(version_key, time.time_ns(), timeout=None)
+            version = await cache.aget(version_key)
+
+        entry = cached.get(user_key)
+        if entry is not None and entry[0] == version:
+            return self.cached_user(entry[1], validated_token)
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as error:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found') from error
+        self.check_user(user, validated_token)
+        if not await areplica_may_be_stale():
+            await cache.aset(user_key, (version, user), get_config()['ttl'])
+        return user
+
+    def check_user(self, user, validated_token):
+        """Те же проверки, что делает JWTAuthentication.get_user после загрузки из базы"""
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
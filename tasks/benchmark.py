@@ -0,0 +1,426 @@
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from urllib import error as urllib_error, request as urllib_request
+from urllib.parse import urlencode
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import connections
+from django.test import AsyncClient, Client
+
+STATUSES = ['new', 'in_progress', 'pending', 'blocked', 'done']
+ORDERINGS = ['-created_at', 'created_at', 'deadline', '-deadline', 'title']
+SEARCH_WORDS = ['отчет', 'релиз', 'клиент', 'данные', 'API', 'release', 'cache', 'план']
+
+# Доли запросов к эндпоинтам по умолчанию: чтение преобладает, как в реальном трафике
+DEFAULT_MIX = (
+    'task_list=30,task_search=10,task_detail=20,my_tasks=5,subtask_list=5,task_create=8,task_update=10,'
+    'stats=12,login=5,refresh=5'
+)
+# Смесь для сравнения емкости: только чтение, у которого есть асинхронные варианты
+READ_MIX = 'task_list=30,task_search=10,task_detail=25,my_tasks=10,subtask_list=10,stats=15'
+
+# Эндпоинты, которые пишут в базу (вход - last_login и OutstandingToken, refresh - blacklist)
+WRITE_ENDPOINTS = {'task_create', 'task_update', 'login', 'refresh'}
+
+# Префикс эндпоинтов чтения: синхронные DRF-представления или их асинхронные варианты (tasks/async_views.py)
+VIEW_PREFIXES = {'sync': '/api/', 'async': '/api/async/'}
+
+
+class BenchmarkError(Exception):
+    """Харнесс не может начать прогон (нет пользователя, цель недоступна и т.п.)"""
+
+
+# ==============================================
+# ТРАНСПОРТ
+# ==============================================
+# Транспорт выполняет один запрос и возвращает (HTTP-статус, тело ответа, число SQL-запросов или None)
+
+def local_host():
+    """
+    Host для клиента в этом процессе: testserver по умолчанию разрешен только под тестовым
+    раннером. Берем первый точный хост из ALLOWED_HOSTS, иначе localhost (разрешен при DEBUG)
+    """
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*' and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+class WSGITransport:
+    """Приложение в этом же процессе через django.test.Client; SQL-запросы считаются"""
+    counts_queries = True
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def _client(self):
+        if not hasattr(self.local, 'client'):
+            self.local.client = Client(raise_request_exception=False, headers={'host': local_host()})
+        return self.local.client
+
+    def _send(self, method, path, body, headers):
+        return getattr(self._client(), method.lower())(
+            path, data=json.dumps(body) if body is not None else None,
+            content_type='application/json', headers=headers,
+        )
+
+    def request(self, method, path, body=None, headers=None):
+        queries = [0]
+
+        def count_query(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        # Соединения привязаны к потоку, поэтому обертка видит только запросы этого клиента
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            response = self._send(method, path, body, headers or {})
+        return response.status_code, response.content, queries[0]
+
+
+class ASGITransport(WSGITransport):
+    """
+    То же приложение через ASGI-обработчик (django.test.AsyncClient). Каждый клиент - поток
+    со своим async_to_sync, одного цикла событий на все соединения нет: конкурентность здесь
+    все равно потоковая, и емкость async-представлений меряется только на настоящем ASGI-сервере
+    """
+
+    def _client(self):
+        if not hasattr(self.local, 'client'):
+            self.local.client = AsyncClient(raise_request_exception=False, headers={'host': local_host()})
+        return self.local.client
+
+    def _send(self, method, path, body, headers):
+        async def send():
+            return await super(ASGITransport, self)._send(method, path, body, headers)
+
+        return async_to_sync(send)()
+
+
+class HTTPTransport:
+    """Запущенный сервер (runserver, gunicorn, uvicorn); SQL-запросы снаружи не видны"""
+    counts_queries = False
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, body=None, headers=None):
+        data = json.dumps(body).encode() if body is not None else None
+        http_request = urllib_request.Request(
+            self.base_url + path, data=data, method=method,
+            headers={'Content-Type': 'application/json', **(headers or {})},
+        )
+        try:
+            with urllib_request.urlopen(http_request, timeout=self.timeout) as response:
+                return response.status, response.read(), None
+        except urllib_error.HTTPError as error:
+            return error.code, error.read(), None
+        except (urllib_error.URLError, OSError) as error:
+            raise BenchmarkError(f'{method} {self.base_url}{path}: {error}')
+
+
+def make_transport(target):
+    if target == 'wsgi':
+        return WSGITransport()
+    if target == 'asgi':
+        return ASGITransport()
+    if target.startswith(('http://', 'https://')):
+        return HTTPTransport(target)
+    raise BenchmarkError(f'Неизвестная цель "{target}": ожидается wsgi, asgi или URL сервера')
+
+
+# ==============================================
+# СЦЕНАРИИ
+# ==============================================
+
+class Session:
+    """
+    Состояние одного виртуального клиента: токены и id задач, которые он может менять.
+    Каждый клиент входит своим запросом, а refresh-токен после ротации хранит у себя
+    """
+
+    def __init__(self, transport, username, password, rng, views='sync'):
+        self.transport = transport
+        self.read_prefix = VIEW_PREFIXES[views]
+        self.username = username
+        self.password = password
+        self.rng = rng
+        self.access = None
+        self.refresh = None
+        self.task_ids = []
+
+    def call(self, method, path, body=None, auth=False):
+        headers = {'Authorization': f'Bearer {self.access}'} if auth and self.access else {}
+        return self.transport.request(method, path, body, headers)
+
+    def login(self):
+        status, content, queries = self.call(
+            'POST', '/api/login/', {'username': self.username, 'password': self.password}
+        )
+        if status == 200:
+            tokens = json.loads(content)['tokens']
+            self.access, self.refresh = tokens['access'], tokens['refresh']
+        return status, content, queries
+
+    def start(self):
+        status, content, _ = self.login()
+        if status != 200:
+            raise BenchmarkError(f'Не удалось войти как "{self.username}": HTTP {status} {content[:200]!r}')
+        status, content, _ = self.call('GET', '/api/tasks/?my_tasks=true', auth=True)
+        if status == 200:
+            self.task_ids = [task['id'] for task in json.loads(content)['results']]
+
+    # Эндпоинты: каждый возвращает (статус, тело, число запросов)
+
+    def task_list(self):
+        params = {'ordering': self.rng.choice(ORDERINGS)}
+        if self.rng.random() < 0.5:
+            params['status'] = self.rng.choice(STATUSES)
+        return self.call('GET', f'{self.read_prefix}tasks/?{urlencode(params)}')
+
+    def task_search(self):
+        return self.call('GET', f'{self.read_prefix}tasks/?{urlencode({"search": self.rng.choice(SEARCH_WORDS)})}')
+
+    def task_detail(self):
+        if not self.task_ids:
+            return self.task_list()
+        return self.call('GET', f'{self.read_prefix}tasks/{self.rng.choice(self.task_ids)}/')
+
+    def my_tasks(self):
+        return self.call('GET', f'{self.read_prefix}tasks/my/', auth=True)
+
+    def subtask_list(self):
+        params = {'ordering': self.rng.choice(ORDERINGS)}
+        if self.task_ids and self.rng.random() < 0.5:
+            params['task'] = self.rng.choice(self.task_ids)
+        return self.call('GET', f'{self.read_prefix}subtasks/?{urlencode(params)}')
+
+    def task_create(self):
+        result = self.call('POST', '/api/tasks/', {
+            'title': f'Нагрузочный тест #{self.rng.randint(1, 10 ** 9)}',
+            'description': 'создано benchmark_api',
+            'status': self.rng.choice(STATUSES),
+        }, auth=True)
+        if result[0] == 201:
+            self.task_ids.append(json.loads(result[1])['id'])
+        return result
+
+    def task_update(self):
+        if not self.task_ids:
+            return self.task_create()
+        task_id = self.rng.choice(self.task_ids)
+        return self.call('PATCH', f'/api/tasks/{task_id}/', {'status': self.rng.choice(STATUSES)}, auth=True)
+
+    def stats(self):
+        return self.call('GET', f'{self.read_prefix}tasks/stats/')
+
+    def refresh_token(self):
+        status, content, queries = self.call('POST', '/api/token/refresh/', {'refresh': self.refresh})
+        if status == 200:
+            tokens = json.loads(content)
+            self.access, self.refresh = tokens['access'], tokens['refresh']
+        return status, content, queries
+
+
+ENDPOINTS = {
+    'task_list': Session.task_list,
+    'task_search': Session.task_search,
+    'task_detail': Session.task_detail,
+    'my_tasks': Session.my_tasks,
+    'subtask_list': Session.subtask_list,
+    'task_create': Session.task_create,
+    'task_update': Session.task_update,
+    'stats': Session.stats,
+    'login': Session.login,
+    'refresh': Session.refresh_token,
+}
+
+
+def parse_mix(value):
+    """'task_list=30,stats=10' -> {'task_list': 30.0, 'stats': 10.0}"""
+    mix = {}
+    try:
+        for part in value.split(','):
+            name, weight = part.split('=')
+            mix[name.strip()] = float(weight)
+    except ValueError:
+        raise BenchmarkError(f'Некорректный набор эндпоинтов "{value}", ожидается имя=вес,...')
+    unknown = mix.keys() - ENDPOINTS.keys()
+    if unknown:
+        raise BenchmarkError(f'Неизвестные эндпоинты: {", ".join(sorted(unknown))}')
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+# ==============================================
+# ПРОГОН И ОТЧЕТ
+# ==============================================
+
+def percentile(sorted_values, fraction):
+    """Перцентиль по методу ближайшего ранга"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def run_benchmark(transport, mix, username, password, concurrency=8, duration=10.0, seed=42, views='sync'):
+    """
+    Гоняет concurrency клиентов duration секунд, каждый выбирает эндпоинт по весам mix.
+    views - sync или async: какие представления обслуживают эндпоинты чтения.
+    Возвращает отчет: по каждому эндпоинту p50/p95/p99 в мс, запросы в секунду,
+    ошибки и среднее число SQL-запросов на запрос; в целом - rps (отдельно чтение
+    и запись, см. WRITE_ENDPOINTS), p95 и ошибки
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = defaultdict(list)
+    lock = threading.Lock()
+    failures = []
+
+    sessions = [
+        Session(transport, username, password, random.Random(seed + index), views)
+        for index in range(concurrency)
+    ]
+    for session in sessions:
+        session.start()
+
+    deadline = time.monotonic() + duration
+
+    def worker(session):
+        local = defaultdict(list)
+        try:
+            while time.monotonic() < deadline:
+                name = session.rng.choices(names, weights)[0]
+                started = time.perf_counter()
+                status, _, queries = ENDPOINTS[name](session)
+                local[name].append((time.perf_counter() - started, status, queries))
+        except Exception as error:  # noqa: BLE001 - ошибка клиента не должна ронять остальных
+            failures.append(f'{type(error).__name__}: {error}')
+        finally:
+            with lock:
+                for name, values in local.items():
+                    samples[name].extend(values)
+            for connection in connections.all():
+                connection.close()
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(session,), daemon=True) for session in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    endpoints = {}
+    for name in names:
+        values = samples.get(name, [])
+        latencies = sorted(latency * 1000 for latency, _, _ in values)
+        queries = [count for _, _, count in values if count is not None]
+        endpoints[name] = {
+            'requests': len(values),
+            'errors': sum(1 for _, status, _ in values if status >= 400),
+            'rps': round(len(values) / elapsed, 2) if elapsed else 0,
+            'p50_ms': _round(percentile(latencies, 0.50)),
+            'p95_ms': _round(percentile(latencies, 0.95)),
+            'p99_ms': _round(percentile(latencies, 0.99)),
+            'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        }
+
+    total = sum(endpoint['requests'] for endpoint in endpoints.values())
+    writes = sum(endpoint['requests'] for name, endpoint in endpoints.items() if name in WRITE_ENDPOINTS)
+    all_latencies = sorted(latency * 1000 for values in samples.values() for latency, _, _ in values)
+    return {
+        'database': connections['default'].vendor,
+        'concurrency': concurrency,
+        'views': views,
+        'duration_s': round(elapsed, 2),
+        'requests': total,
+        'rps': round(total / elapsed, 2) if elapsed else 0,
+        'read_rps': round((total - writes) / elapsed, 2) if elapsed else 0,
+        'write_rps': round(writes / elapsed, 2) if elapsed else 0,
+        'p95_ms': _round(percentile(all_latencies, 0.95)),
+        'errors': sum(endpoint['errors'] for endpoint in endpoints.values()),
+        'client_failures': failures,
+        'endpoints': endpoints,
+    }
+
+
+def run_capacity(transport, mix, username, password, levels, duration=10.0, seed=42, max_p95_ms=500.0):
+    """
+    Емкость по одновременным соединениям: одна и та же смесь на синхронных и асинхронных
+    представлениях при каждой конкурентности из levels. Емкость - наибольшая конкурентность,
+    при которой нет ни ошибок, ни остановленных клиентов, а общий p95 не выше max_p95_ms.
+    Разница видна против ASGI-сервера (uvicorn/daphne): WSGI держит по потоку на соединение
+    """
+    result = {'levels': list(levels), 'max_p95_ms': max_p95_ms, 'views': {}}
+    for views in VIEW_PREFIXES:
+        runs = []
+        for level in levels:
+            report = run_benchmark(
+                transport, mix, username, password, concurrency=level, duration=duration, seed=seed, views=views,
+            )
+            runs.append({
+                'concurrency': level,
+                'requests': report['requests'],
+                'rps': report['rps'],
+                'p95_ms': report['p95_ms'],
+                'errors': report['errors'] + len(report['client_failures']),
+            })
+        healthy = [
+            run['concurrency'] for run in runs
+            if run['requests'] and not run['errors'] and run['p95_ms'] <= max_p95_ms
+        ]
+        result['views'][views] = {'runs': runs, 'capacity': max(healthy, default=0)}
+    return result
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+def compare_reports(baseline, current, max_latency_increase=0.2, max_throughput_drop=0.2):
+    """
+    Сравнивает отчет с базовым. Регрессия - рост p95 или падение rps эндпоинта
+    больше заданной доли. Возвращает список описаний регрессий
+    """
+    regressions = []
+    for name, now in current['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if not before or not now['requests']:
+            continue
+        if before.get('p95_ms') and now['p95_ms'] > before['p95_ms'] * (1 + max_latency_increase):
+            regressions.append(f'{name}: p95 {before["p95_ms"]} мс -> {now["p95_ms"]} мс')
+        if before.get('rps') and now['rps'] < before['rps'] * (1 - max_throughput_drop):
+            regressions.append(f'{name}: rps {before["rps"]} -> {now["rps"]}')
+    return regressions
+
+
+def compare_databases(baseline, current):
+    """
+    Сравнение прогонов на разных СУБД (например, sqlite и postgresql) или с разными
+    PRAGMA SQLite по эндпоинтам:
+    rps и p95 обоих прогонов и их отношение current / baseline
+    """
+    rows = []
+    for name, now in current['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if not before:
+            continue
+        rows.append({
+            'endpoint': name,
+            'baseline_rps': before['rps'],
+            'rps': now['rps'],
+            'rps_ratio': round(now['rps'] / before['rps'], 2) if before['rps'] else None,
+            'baseline_p95_ms': before['p95_ms'],
+            'p95_ms': now['p95_ms'],
+            'p95_ratio': round(now['p95_ms'] / before['p95_ms'], 2)
+            if before['p95_ms'] and now['p95_ms'] is not None else None,
+        })
+    return rows
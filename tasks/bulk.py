@@ -0,0 +1,223 @@
+from django.db import transaction
+from rest_framework import permissions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+# Сколько объектов принимает один запрос и сколько строк уходит в один INSERT/UPDATE
+BULK_MAX_ITEMS = 500
+BULK_BATCH_SIZE = 100
+
+
+class PrefetchedPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField, который сначала ищет объект в context['prefetched'][имя поля].
+    Массовые представления заранее загружают связанные объекты одним запросом
+    и не делают SELECT на каждый элемент; объекта нет в словаре - ошибка does_not_exist
+    """
+
+    def to_internal_value(self, data):
+        prefetched = self.context.get('prefetched', {}).get(self.field_name)
+        if prefetched is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return prefetched[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class BulkWriteView(APIView):
+    """
+    Массовые операции над объектами текущего пользователя:
+      POST   - список объектов для создания;
+      PATCH  - список объектов с id и изменяемыми полями;
+      DELETE - {"ids": [...]}.
+    Каждый элемент проверяется сериализатором, владелец проверяется одним запросом
+    на всю пачку, запись идет через bulk_create/bulk_update/delete в одной транзакции.
+    В ответе - результат по каждому элементу; 207, если часть элементов не прошла
+    """
+    model = None
+    serializer_class = None
+    permission_classes = [permissions.IsAuthenticated]
+    max_items = BULK_MAX_ITEMS
+    batch_size = BULK_BATCH_SIZE
+
+    def get_serializer_context(self, items):
+        return {'request': self.request, 'view': self, 'format': self.format_kwarg}
+
+    def get_serializer(self, *args, **kwargs):
+        return self.serializer_class(*args, **kwargs)
+
+    def get_items(self, request):
+        items = request.data
+        if isinstance(items, dict):
+            items = items.get('items')
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'detail': 'Ожидается непустой список объектов'})
+        if len(items) > self.max_items:
+            raise ValidationError({'detail': f'Не более {self.max_items} объектов за запрос'})
+        return items
+
+    def get_ids(self, request):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else request.data
+        if not isinstance(ids, list) or not ids:
+            raise ValidationError({'ids': 'Ожидается непустой список id'})
+        if len(ids) > self.max_items:
+            raise ValidationError({'ids': f'Не более {self.max_items} id за запрос'})
+        return ids
+
+    def get_owned_queryset(self):
+        return self.model.objects.filter(owner=self.request.user)
+
+    def build_instance(self, validated_data):
+        return self.model(owner=self.request.user, **validated_data)
+
+    # ==============================================
+    # РЕЗУЛЬТАТЫ
+    # ==============================================
+
+    @staticmethod
+    def _error(index, errors, item_id=None):
+        result = {'index': index, 'status': 'error', 'errors': errors}
+        if item_id is not None:
+            result['id'] = item_id
+        return result
+
+    def _success(self, index, result_status, instance, context):
+        return {
+            'index': index,
+            'status': result_status,
+            'id': instance.pk,
+            'data': self.get_serializer(instance, context=context).data,
+        }
+
+    @staticmethod
+    def _pk(value):
+        if isinstance(value, bool):
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    def respond(self, results, success_status):
+        succeeded = sum(1 for result in results if result['status'] != 'error')
+        failed = len(results) - succeeded
+        if not failed:
+            response_status = success_status
+        elif succeeded:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response(
+            {'succeeded': succeeded, 'failed': failed, 'results': results},
+            status=response_status,
+        )
+
+    # ==============================================
+    # ОПЕРАЦИИ
+    # ==============================================
+
+    def post(self, request, *args, **kwargs):
+        items = self.get_items(request)
+        context = self.get_serializer_context(items)
+        results = [None] * len(items)
+        valid = []
+
+        for index, item in enumerate(items):
+            serializer = self.get_serializer(data=item, context=context)
+            if serializer.is_valid():
+                valid.append((index, self.build_instance(serializer.validated_data)))
+            else:
+                results[index] = self._error(index, serializer.errors)
+
+        instances = [instance for _, instance in valid]
+        if instances:
+            with transaction.atomic():
+                self.model.objects.bulk_create(instances, batch_size=self.batch_size)
+
+        for index, instance in valid:
+            results[index] = self._success(index, 'created', instance, context)
+        return self.respond(results, status.HTTP_201_CREATED)
+
+    def patch(self, request, *args, **kwargs):
+        items = self.get_items(request)
+        context = self.get_serializer_context(items)
+        results = [None] * len(items)
+
+        ids = {self._pk(item.get('id')) for item in items if isinstance(item, dict)}
+        ids.discard(None)
+        # Один запрос на всю пачку вместо IsTaskOwner на каждый объект
+        instances = self.model.objects.in_bulk(ids)
+
+        seen = set()
+        updated = []
+        fields = set()
+        for index, item in enumerate(items):
+            item_id = self._pk(item.get('id')) if isinstance(item, dict) else None
+            instance = instances.get(item_id)
+            if item_id is None:
+                results[index] = self._error(index, {'id': ['Обязательное поле (целое число)']})
+                continue
+            if instance is None:
+                results[index] = self._error(index, {'detail': 'Объект не найден'}, item_id)
+                continue
+            if instance.owner_id != request.user.id:
+                results[index] = self._error(index, {'detail': 'Нет прав на изменение объекта'}, item_id)
+                continue
+            if item_id in seen:
+                results[index] = self._error(index, {'id': ['Объект повторяется в запросе']}, item_id)
+                continue
+            seen.add(item_id)
+
+            serializer = self.get_serializer(instance, data=item, partial=True, context=context)
+            if not serializer.is_valid():
+                results[index] = self._error(index, serializer.errors, item_id)
+                continue
+            for attr, value in serializer.validated_data.items():
+                setattr(instance, attr, value)
+            fields.update(serializer.validated_data)
+            updated.append((index, instance))
+
+        if updated and fields:
+            with transaction.atomic():
+                self.model.objects.bulk_update(
+                    [instance for _, instance in updated], sorted(fields), batch_size=self.batch_size
+                )
+
+        for index, instance in updated:
+            results[index] = self._success(index, 'updated', instance, context)
+        return self.respond(results, status.HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        ids = self.get_ids(request)
+        pks = [self._pk(item_id) for item_id in ids]
+        owners = dict(
+            self.model.objects.filter(pk__in={pk for pk in pks if pk is not None})
+            .values_list('pk', 'owner_id')
+        )
+
+        results = []
+        allowed = set()
+        for index, pk in enumerate(pks):
+            if pk is None:
+                results.append(self._error(index, {'id': ['Ожидается целое число']}))
+            elif pk not in owners:
+                results.append(self._error(index, {'detail': 'Объект не найден'}, pk))
+            elif owners[pk] != request.user.id:
+                results.append(self._error(index, {'detail': 'Нет прав на удаление объекта'}, pk))
+            elif pk in allowed:
+                results.append(self._error(index, {'id': ['Объект повторяется в запросе']}, pk))
+            else:
+                allowed.add(pk)
+                results.append({'index': index, 'status': 'deleted', 'id': pk})
+
+        if allowed:
+            with transaction.atomic():
+                self.get_owned_queryset().filter(pk__in=allowed).delete()
+        return self.respond(results, status.HTTP_200_OK)
@@ -0,0 +1,190 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import wraps
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+# Методы, ответы на которые можно разделять между одинаковыми запросами
+COALESCE_METHODS = ('GET', 'HEAD')
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных вычислений (single-flight).
+    Первый вызов с ключом считает результат, остальные ждут его и получают тот же ответ;
+    после завершения результат еще ttl секунд отдается из памяти.
+    Работает между потоками и asyncio-задачами одного процесса
+    """
+    max_results = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        # Порядок вставки - порядок вытеснения при переполнении
+        self._results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+
+    def _acquire(self, key):
+        """Возвращает (готовый результат, future, является ли вызывающий лидером)"""
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                self.hits += 1
+                return cached, None, False
+
+            future = self._inflight.get(key)
+            if future is not None:
+                self.waits += 1
+                return None, future, False
+
+            future = Future()
+            self._inflight[key] = future
+            self.misses += 1
+            return None, future, True
+
+    def _release(self, key, future, ttl, value=None, error=None):
+        with self._lock:
+            self._inflight.pop(key, None)
+            if error is None and ttl > 0:
+                now = time.monotonic()
+                if len(self._results) >= self.max_results:
+                    self._results = OrderedDict((k, v) for k, v in self._results.items() if v[0] > now)
+                    # В одном окне TTL ключей может быть больше лимита - вытесняем самые старые
+                    while len(self._results) >= self.max_results:
+                        self._results.popitem(last=False)
+                self._results.pop(key, None)
+                self._results[key] = (now + ttl, value)
+
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(error)
+
+    def do(self, key, fn, ttl=None):
+        ttl = get_ttl() if ttl is None else ttl
+        cached, future, leader = self._acquire(key)
+        if cached is not None:
+            return cached[1]
+        if not leader:
+            return future.result()
+
+        try:
+            value = fn()
+        except BaseException as error:
+            self._release(key, future, ttl, error=error)
+            raise
+        self._release(key, future, ttl, value=value)
+        return value
+
+    async def ado(self, key, coro_fn, ttl=None):
+        ttl = get_ttl() if ttl is None else ttl
+        cached, future, leader = self._acquire(key)
+        if cached is not None:
+            return cached[1]
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        try:
+            value = await coro_fn()
+        except BaseException as error:
+            self._release(key, future, ttl, error=error)
+            raise
+        self._release(key, future, ttl, value=value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'waits': self.waits,
+                'inflight': len(self._inflight),
+                'cached': len(self._results),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+single_flight = SingleFlight()
+
+
+def get_ttl():
+    return getattr(settings, 'SINGLE_FLIGHT_TTL', 1.0)
+
+
+def request_key(request, *parts):
+    """Ключ запроса: метод, путь, отсортированные параметры, Accept и пользователь"""
+    query = sorted((key, value) for key in request.GET for value in request.GET.getlist(key))
+    user = getattr(request, 'user', None)
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    return (
+        *parts,
+        request.method,
+        request.path,
+        tuple(query),
+        request.META.get('HTTP_ACCEPT', ''),
+        user_id,
+    )
+
+
+# ==============================================
+# ДЕКОРАТОРЫ ДЛЯ ПРЕДСТАВЛЕНИЙ
+# ==============================================
+
+def coalesce_response(ttl=None):
+    """
+    Для методов DRF-представлений (get, @action): одинаковые запросы
+    разделяют response.data и заголовки, каждый получает свой объект Response
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in COALESCE_METHODS:
+                return handler(self, request, *args, **kwargs)
+
+            def compute():
+                response = handler(self, request, *args, **kwargs)
+                return response.data, response.status_code, list(response.items())
+
+            key = request_key(request, type(self).__qualname__, handler.__name__)
+            data, status_code, headers = single_flight.do(key, compute, ttl)
+            return Response(data, status=status_code, headers=dict(headers))
+
+        return wrapper
+
+    return decorator
+
+
+def coalesce_view(view_func, ttl=None):
+    """
+    Для обычных Django-представлений (например, swagger-схемы):
+    разделяется уже отрендеренный ответ, каждый запрос получает его копию
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in COALESCE_METHODS:
+            return view_func(request, *args, **kwargs)
+
+        def compute():
+            response = view_func(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            return response.status_code, response.content, list(response.items())
+
+        key = request_key(request, view_func.__module__, view_func.__qualname__, tuple(sorted(kwargs.items())))
+        status_code, content, headers = single_flight.do(key, compute, ttl)
+        response = HttpResponse(content, status=status_code)
+        for header, value in headers:
+            response[header] = value
+        return response
+
+    return wrapper
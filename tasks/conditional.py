@@ -0,0 +1,137 @@
+import hashlib
+from contextlib import nullcontext
+
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+# Методы, которые меняют объект и проверяют If-Match / If-Unmodified-Since
+CONDITIONAL_WRITE_METHODS = ('PUT', 'PATCH')
+PRECONDITION_HEADERS = ('HTTP_IF_MATCH', 'HTTP_IF_UNMODIFIED_SINCE', 'HTTP_IF_NONE_MATCH')
+# Агрегат, от которого зависит ETag списка
+LIST_AGGREGATE = {'last_modified': Max('updated_at'), 'count': Count('pk')}
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'Объект изменен другим запросом: условие If-Match не выполнено'
+    default_code = 'precondition_failed'
+
+
+def make_etag(*parts):
+    """Сильный ETag из значений, от которых зависит тело ответа"""
+    return quote_etag(hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest())
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def is_conditional_write(request):
+    return request.method in CONDITIONAL_WRITE_METHODS and any(
+        header in request.META for header in PRECONDITION_HEADERS
+    )
+
+
+def _timestamp(value):
+    return int(value.timestamp()) if value is not None else None
+
+
+# ==============================================
+# МИКСИНЫ ДЛЯ ПРЕДСТАВЛЕНИЙ
+# ==============================================
+
+class ConditionalObjectMixin:
+    """
+    Для detail-представлений над моделями с updated_at (TimestampedModel).
+    ETag и Last-Modified считаются по updated_at уже загруженного объекта, без сериализации:
+      GET/HEAD  - If-None-Match / If-Modified-Since -> 304, тело не строится;
+      PUT/PATCH - If-Match / If-Unmodified-Since не совпали -> 412, запись не выполняется.
+    Условная запись идет в одной транзакции со строкой под select_for_update;
+    запись без заголовков-условий выполняется как раньше
+    """
+
+    def get_object_validators(self, instance):
+        etag = make_etag(
+            type(instance).__name__, instance.pk, instance.updated_at.isoformat(),
+            self.request.accepted_renderer.format,
+        )
+        return etag, _timestamp(instance.updated_at)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if is_conditional_write(self.request):
+            queryset = queryset.select_for_update()
+        return queryset
+
+    def get_object(self):
+        instance = super().get_object()
+        if is_conditional_write(self.request):
+            if get_conditional_response(self.request, *self.get_object_validators(instance)) is not None:
+                raise PreconditionFailed()
+        return instance
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.object_response(request, self.get_object())
+
+    def object_response(self, request, instance):
+        etag, last_modified = self.get_object_validators(instance)
+        response = get_conditional_response(request, etag, last_modified)
+        if response is None:
+            response = Response(self.get_serializer(instance).data)
+        return set_validators(response, etag, last_modified)
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic() if is_conditional_write(request) else nullcontext():
+            response = super().update(request, *args, **kwargs)
+        # Новые валидаторы - клиент сразу шлет их в следующем If-Match
+        return set_validators(response, *self.get_object_validators(self.updated_instance))
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.updated_instance = serializer.instance
+
+
+class ConditionalListMixin:
+    """
+    Для списков: ETag из одного агрегата Max(updated_at) и Count по отфильтрованному queryset
+    плюс параметры запроса (страница, фильтры, сортировка) и пользователь.
+    Совпал If-None-Match - 304 без выборки страницы и сериализации.
+    Last-Modified спискам не отдается: удаление строки не сдвигает Max(updated_at),
+    его учитывает только Count в ETag
+    """
+
+    def get_list_etag(self, queryset):
+        return self.make_list_etag(queryset.order_by().aggregate(**LIST_AGGREGATE))
+
+    async def aget_list_etag(self, queryset):
+        return self.make_list_etag(await queryset.order_by().aaggregate(**LIST_AGGREGATE))
+
+    def make_list_etag(self, aggregate):
+        last_modified = aggregate['last_modified']
+        return make_etag(
+            type(self).__name__, self.request.user.pk, sorted(self.request.GET.lists()),
+            last_modified.isoformat() if last_modified else None, aggregate['count'],
+            self.request.accepted_renderer.format,
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = self.get_list_etag(queryset)
+        response = get_conditional_response(request, etag)
+        if response is not None:
+            return set_validators(response, etag)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        else:
+            response = Response(self.get_serializer(queryset, many=True).data)
+        return set_validators(response, etag)
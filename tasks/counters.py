@@ -0,0 +1,169 @@
+from collections import Counter
+
+from django.apps import apps
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# SQLite ограничивает число параметров в запросе, поэтому id обрабатываем пачками
+ID_CHUNK_SIZE = 500
+
+
+# ==============================================
+# СЧЕТЧИКИ ПОДЗАДАЧ У ЗАДАЧИ
+# ==============================================
+
+def _subtask_count_subquery(**filters):
+    SubTask = apps.get_model('tasks', 'SubTask')
+    counts = (
+        SubTask.objects.filter(task=OuterRef('pk'), **filters)
+        .order_by()
+        .values('task')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def refresh_subtask_counters(task_ids, using='default'):
+    """
+    Пересчитывает subtask_count и subtask_done_count по реальным данным.
+    Один UPDATE с подзапросами на каждую пачку задач
+    """
+    Task = apps.get_model('tasks', 'Task')
+    task_ids = sorted(task_id for task_id in task_ids if task_id is not None)
+    updated = 0
+
+    for start in range(0, len(task_ids), ID_CHUNK_SIZE):
+        chunk = task_ids[start:start + ID_CHUNK_SIZE]
+        updated += Task.objects.using(using).filter(pk__in=chunk).update(
+            subtask_count=_subtask_count_subquery(),
+            subtask_done_count=_subtask_count_subquery(status='done'),
+        )
+    return updated
+
+
+def apply_subtask_delta(task_id, total=0, done=0, using='default'):
+    """Инкрементально сдвигает счетчики одной задачи"""
+    if not task_id or not (total or done):
+        return
+    Task = apps.get_model('tasks', 'Task')
+    Task.objects.using(using).filter(pk=task_id).update(
+        subtask_count=F('subtask_count') + total,
+        subtask_done_count=F('subtask_done_count') + done,
+    )
+
+
+def subtask_counter_drift(task_ids=None, using='default'):
+    """Возвращает queryset задач, у которых счетчики разошлись с данными"""
+    Task = apps.get_model('tasks', 'Task')
+    queryset = Task.objects.using(using).annotate(
+        real_count=Count('subtasks'),
+        real_done=Count('subtasks', filter=Q(subtasks__status='done')),
+    ).exclude(subtask_count=F('real_count'), subtask_done_count=F('real_done'))
+    if task_ids is not None:
+        queryset = queryset.filter(pk__in=task_ids)
+    return queryset
+
+
+# ==============================================
+# СЧЕТЧИКИ ЗАДАЧ ПО СТАТУСАМ
+# ==============================================
+
+def count_by_owner_and_status(task_ids, using='default'):
+    """Counter {(owner_id, status): количество} по указанным задачам"""
+    Task = apps.get_model('tasks', 'Task')
+    task_ids = list(task_ids)
+    counts = Counter()
+
+    for start in range(0, len(task_ids), ID_CHUNK_SIZE):
+        rows = (
+            Task.objects.using(using)
+            .filter(pk__in=task_ids[start:start + ID_CHUNK_SIZE])
+            .order_by()
+            .values_list('owner_id', 'status')
+            .annotate(total=Count('pk'))
+        )
+        for owner_id, status, total in rows:
+            counts[(owner_id, status)] += total
+    return counts
+
+
+def _bump_status_counter(owner_id, status, delta, using):
+    TaskStatusCounter = apps.get_model('tasks', 'TaskStatusCounter')
+    counters = TaskStatusCounter.objects.using(using).filter(owner_id=owner_id, status=status)
+
+    if counters.update(count=F('count') + delta):
+        return
+    if delta < 0:
+        # Вычитать не из чего: строку уже удалили (каскад от владельца) - отрицательный
+        # счетчик не создаем, расхождение при необходимости поправит rebuild_status_counters
+        return
+    try:
+        with transaction.atomic(using=using):
+            TaskStatusCounter.objects.using(using).create(owner_id=owner_id, status=status, count=delta)
+    except IntegrityError:
+        # Строку успел создать параллельный запрос - просто прибавляем
+        counters.update(count=F('count') + delta)
+
+
+def apply_status_deltas(deltas, using='default', skip_owners=()):
+    """
+    Применяет изменения {(owner_id, status): delta} к счетчикам владельцев
+    и к общим счетчикам (owner = NULL). Счетчики владельцев из skip_owners
+    не трогаются (они удаляются вместе с владельцем), общие - учитываются
+    """
+    totals = Counter()
+    for (owner_id, status), delta in deltas.items():
+        if delta:
+            if owner_id not in skip_owners:
+                _bump_status_counter(owner_id, status, delta, using)
+            totals[status] += delta
+
+    for status, delta in totals.items():
+        if delta:
+            _bump_status_counter(None, status, delta, using)
+
+
+def actual_status_counts(using='default'):
+    """Настоящий агрегат по таблице задач: {(owner_id | None, status): количество}"""
+    Task = apps.get_model('tasks', 'Task')
+    counts = Counter()
+    rows = Task.objects.using(using).order_by().values_list('owner_id', 'status').annotate(total=Count('pk'))
+    for owner_id, status, total in rows:
+        counts[(owner_id, status)] += total
+        counts[(None, status)] += total
+    return counts
+
+
+def status_counter_drift(using='default'):
+    """Список (owner_id, status, в счетчике, на самом деле) для разошедшихся счетчиков"""
+    TaskStatusCounter = apps.get_model('tasks', 'TaskStatusCounter')
+    actual = actual_status_counts(using=using)
+    stored = {
+        (owner_id, status): count
+        for owner_id, status, count in TaskStatusCounter.objects.using(using).values_list('owner_id', 'status', 'count')
+    }
+    return [
+        (owner_id, status, stored.get((owner_id, status), 0), actual.get((owner_id, status), 0))
+        for owner_id, status in sorted(stored.keys() | actual.keys(), key=lambda key: (key[0] or 0, key[1]))
+        if stored.get((owner_id, status), 0) != actual.get((owner_id, status), 0)
+    ]
+
+
+def rebuild_status_counters(using='default'):
+    """Полностью пересобирает таблицу счетчиков из агрегата по задачам"""
+    Task = apps.get_model('tasks', 'Task')
+    TaskStatusCounter = apps.get_model('tasks', 'TaskStatusCounter')
+    actual = actual_status_counts(using=using)
+    # Общие строки есть для каждого статуса, даже нулевые
+    for status, _ in Task.STATUS_CHOICES:
+        actual.setdefault((None, status), 0)
+
+    with transaction.atomic(using=using):
+        TaskStatusCounter.objects.using(using).all().delete()
+        TaskStatusCounter.objects.using(using).bulk_create(
+            TaskStatusCounter(owner_id=owner_id, status=status, count=count)
+            for (owner_id, status), count in actual.items()
+        )
+    return len(actual)
@@ -0,0 +1,227 @@
+import random
+from contextvars import ContextVar
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .middleware import HookMiddleware
+
+# Методы, чтение в которых может идти с реплики
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Была запись в последние DATABASE_REPLICA_STICKY_SECONDS секунд (любым клиентом)
+RECENT_WRITE_KEY = 'db-router:recent-write'
+
+
+def get_config():
+    return {
+        'replicas': getattr(settings, 'DATABASE_REPLICAS', []),
+        'sticky_seconds': getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 5),
+        'alias': getattr(settings, 'DATABASE_ROUTER_CACHE_ALIAS', 'default'),
+    }
+
+
+def get_cache():
+    return caches[get_config()['alias']]
+
+
+# ==============================================
+# СОСТОЯНИЕ МАРШРУТИЗАЦИИ ЗАПРОСА
+# ==============================================
+
+class RoutingState:
+    """
+    Куда идет чтение в рамках одного HTTP-запроса. Реплика выбирается один раз на запрос,
+    чтобы все чтения видели один снимок; после первой записи чтение переходит на основную базу
+    """
+    __slots__ = ('use_replica', 'replica', 'wrote', 'used_replica', 'user_id')
+
+    def __init__(self, use_replica, user_id=None):
+        self.use_replica = use_replica
+        self.replica = None
+        self.wrote = False
+        self.used_replica = False
+        # Чей это запрос - за ним закрепляется основная база после записи
+        self.user_id = user_id
+
+
+current_routing = ContextVar('db_routing', default=None)
+
+
+def _pin_key(user_id):
+    return f'db-router:pin:{user_id}'
+
+
+def _token_user_id(request):
+    """
+    Пользователь из JWT запроса: (есть ли токен, user_id). Закрепление за основной базой идет
+    по пользователю, а не по учетным данным: токен меняется при обновлении и новом входе.
+    Токен разбирается без запросов к базе (подпись и срок)
+    """
+    scheme, _, raw = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if scheme not in api_settings.AUTH_HEADER_TYPES or not raw:
+        return False, None
+    try:
+        return True, str(AccessToken(raw)[api_settings.USER_ID_CLAIM])
+    except (TokenError, KeyError):
+        return True, None
+
+
+def _session(request):
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    return import_module(settings.SESSION_ENGINE).SessionStore(session_key) if session_key else None
+
+
+def _request_user_id(request):
+    """Пользователь запроса до аутентификации: из JWT, без него - из сессии"""
+    has_token, user_id = _token_user_id(request)
+    session = None if has_token else _session(request)
+    if session is not None:
+        user_id = session.get(SESSION_KEY)
+    return str(user_id) if user_id is not None else None
+
+
+async def _arequest_user_id(request):
+    has_token, user_id = _token_user_id(request)
+    session = None if has_token else _session(request)
+    if session is not None:
+        user_id = await session.aget(SESSION_KEY)
+    return str(user_id) if user_id is not None else None
+
+
+def _authenticated_id(user):
+    return str(user.pk) if user is not None and user.is_authenticated else None
+
+
+def remember_writer(user_id):
+    """
+    Запись сделана для user_id в неаутентифицированном запросе (регистрация, вход,
+    обновление токена): следующие чтения этого пользователя идут с основной базы
+    """
+    state = current_routing.get()
+    if state is not None:
+        state.user_id = str(user_id)
+
+
+def replica_may_be_stale():
+    """
+    Чтение этого запроса шло с реплики, а недавно была запись: реплика могла ее еще не получить.
+    Такие данные не должны попадать в кэши, ключи которых уже сдвинуты записью
+    (кэш ответов, кэш пользователей JWT)
+    """
+    state = current_routing.get()
+    return state is not None and state.used_replica and get_cache().get(RECENT_WRITE_KEY) is not None
+
+
+async def areplica_may_be_stale():
+    state = current_routing.get()
+    return state is not None and state.used_replica and await get_cache().aget(RECENT_WRITE_KEY) is not None
+
+
+# ==============================================
+# MIDDLEWARE И РОУТЕР
+# ==============================================
+
+class ReplicaRoutingMiddleware(HookMiddleware):
+    """
+    Решает, может ли запрос читать с реплик: только безопасные методы и только если
+    этот же пользователь не писал в последние DATABASE_REPLICA_STICKY_SECONDS секунд.
+    После запроса с записью закрепляет пользователя за основной базой на это окно.
+    Анонимные GET (основной трафик) не обращаются к кэшу закреплений.
+    Под ASGI кэш и сессия читаются асинхронным API, без перехода в поток
+    """
+
+    def start(self, request, user_id, pinned):
+        # Пишущий запрос читает с основной базы; пользователь сессии известен после аутентификации
+        request.db_routing = RoutingState(request.method in SAFE_METHODS and not pinned, user_id)
+        current_routing.set(request.db_routing)
+
+    def finish(self, request):
+        """Состояние запроса, если после него нужно закрепить пользователя за основной базой"""
+        state = getattr(request, 'db_routing', None)
+        if state is None:
+            return None
+        current_routing.set(None)
+        return state if state.wrote else None
+
+    def marks(self, user_id):
+        marks = {RECENT_WRITE_KEY: True}
+        if user_id:
+            marks[_pin_key(user_id)] = True
+        return marks
+
+    def process_request(self, request):
+        if not get_config()['replicas']:
+            return None
+        if request.method in SAFE_METHODS:
+            user_id = _request_user_id(request)
+            self.start(request, user_id, user_id and get_cache().get(_pin_key(user_id)))
+        else:
+            self.start(request, _token_user_id(request)[1], pinned=False)
+        return None
+
+    async def aprocess_request(self, request):
+        if not get_config()['replicas']:
+            return None
+        if request.method in SAFE_METHODS:
+            user_id = await _arequest_user_id(request)
+            self.start(request, user_id, user_id and await get_cache().aget(_pin_key(user_id)))
+        else:
+            self.start(request, _token_user_id(request)[1], pinned=False)
+        return None
+
+    def process_response(self, request, response):
+        state = self.finish(request)
+        if state is not None:
+            user_id = state.user_id or _authenticated_id(getattr(request, 'user', None))
+            get_cache().set_many(self.marks(user_id), get_config()['sticky_seconds'])
+        return response
+
+    async def aprocess_response(self, request, response):
+        state = self.finish(request)
+        if state is not None:
+            user_id = state.user_id
+            if not user_id and hasattr(request, 'auser'):
+                user_id = _authenticated_id(await request.auser())
+            await get_cache().aset_many(self.marks(user_id), get_config()['sticky_seconds'])
+        return response
+
+
+class ReplicaRouter:
+    """
+    Запись и миграции - на основную базу, чтение безопасных запросов - на реплику
+    из DATABASE_REPLICAS (см. ReplicaRoutingMiddleware). Вне HTTP-запросов
+    (команды, сигналы после ответа) все идет на основную базу
+    """
+
+    def db_for_read(self, model, **hints):
+        state = current_routing.get()
+        if state is None or not state.use_replica or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if state.replica is None:
+            state.replica = random.choice(get_config()['replicas'])
+        state.used_replica = True
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = current_routing.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики - копии основной базы, связи между ними допустимы
+        databases = {DEFAULT_DB_ALIAS, *get_config()['replicas']}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_config()['replicas']:
+            return False
+        return None
@@ -0,0 +1,115 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from .models import Task, SubTask
+
+# Сколько задач читается из курсора за раз (и сколько попадает в один prefetch)
+EXPORT_CHUNK_SIZE = 500
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+# Плоский CSV: строка задачи (record_type=task), за ней строки ее подзадач (record_type=subtask)
+CSV_COLUMNS = [
+    'record_type', 'id', 'task_id', 'owner', 'title', 'description',
+    'status', 'deadline', 'created_at', 'categories',
+]
+CSV_CATEGORY_SEPARATOR = ';'
+
+TASK_FIELDS = ('id', 'owner_id', 'title', 'description', 'status', 'deadline', 'created_at')
+SUBTASK_FIELDS = ('id', 'task_id', 'owner__username', 'title', 'description', 'status', 'deadline', 'created_at')
+
+
+def export_queryset(user):
+    """
+    Задачи пользователя с подзадачами и категориями. Читаются через iterator():
+    в памяти одновременно только одна пачка, prefetch выполняется на каждую пачку
+    """
+    subtasks = SubTask.objects.select_related('owner').only(*SUBTASK_FIELDS).order_by('pk')
+    return (
+        Task.objects.filter(owner=user)
+        .only(*TASK_FIELDS)
+        .order_by('pk')
+        .prefetch_related(Prefetch('subtasks', queryset=subtasks), 'categories')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def task_record(task, owner_username):
+    return {
+        'id': task.pk,
+        'owner': owner_username,
+        'title': task.title,
+        'description': task.description,
+        'status': task.status,
+        'deadline': _isoformat(task.deadline),
+        'created_at': _isoformat(task.created_at),
+        'categories': [category.name for category in task.categories.all()],
+        'subtasks': [subtask_record(subtask) for subtask in task.subtasks.all()],
+    }
+
+
+def subtask_record(subtask):
+    return {
+        'id': subtask.pk,
+        'task_id': subtask.task_id,
+        'owner': subtask.owner.username,
+        'title': subtask.title,
+        'description': subtask.description,
+        'status': subtask.status,
+        'deadline': _isoformat(subtask.deadline),
+        'created_at': _isoformat(subtask.created_at),
+    }
+
+
+# ==============================================
+# ФОРМАТЫ
+# ==============================================
+
+def _ndjson_lines(user):
+    for task in export_queryset(user):
+        record = task_record(task, user.username)
+        yield json.dumps(record, ensure_ascii=False, cls=DjangoJSONEncoder) + '\n'
+
+
+class _Echo:
+    """Буфер для csv.writer: writerow сразу возвращает готовую строку"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(user):
+    writer = csv.writer(_Echo())
+    # Заголовок уходит клиенту до первого запроса к базе
+    yield writer.writerow(CSV_COLUMNS)
+
+    for task in export_queryset(user):
+        record = task_record(task, user.username)
+        yield writer.writerow([
+            'task', record['id'], '', record['owner'], record['title'], record['description'],
+            record['status'], record['deadline'] or '', record['created_at'] or '',
+            CSV_CATEGORY_SEPARATOR.join(record['categories']),
+        ])
+        for subtask in record['subtasks']:
+            yield writer.writerow([
+                'subtask', subtask['id'], subtask['task_id'], subtask['owner'], subtask['title'],
+                subtask['description'], subtask['status'], subtask['deadline'] or '',
+                subtask['created_at'] or '', '',
+            ])
+
+
+def stream_export(user, export_format):
+    """Генератор строк экспорта в формате ndjson или csv"""
+    if export_format == 'csv':
+        return _csv_lines(user)
+    return _ndjson_lines(user)
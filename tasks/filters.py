@@ -0,0 +1,27 @@
+from django.db.models.functions import Lower
+from rest_framework import filters
+
+
+class CaseInsensitiveOrderingFilter(filters.OrderingFilter):
+    """
+    Сортировка, в которой текстовые поля сравниваются без учета регистра.
+    ordering=title превращается в ORDER BY LOWER(title) и использует
+    функциональный индекс *_title_lower_idx вместо временного B-дерева.
+    """
+    case_insensitive_fields = ('title',)
+
+    def get_ordering_expression(self, field):
+        descending = field.startswith('-')
+        name = field.lstrip('-')
+        if name not in self.case_insensitive_fields:
+            return field
+        expression = Lower(name)
+        return expression.desc() if descending else expression.asc()
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = self.get_ordering(request, queryset, view)
+
+        if ordering:
+            return queryset.order_by(*[self.get_ordering_expression(field) for field in ordering])
+
+        return queryset
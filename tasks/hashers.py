@@ -0,0 +1,119 @@
+import json
+import os
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+def get_config():
+    return {
+        'file': getattr(settings, 'PASSWORD_HASHER_CALIBRATION_FILE', None),
+        # По умолчанию нижняя граница - число итераций Django: калибровка не ослабляет хэши
+        'min_iterations': getattr(settings, 'PASSWORD_HASHER_MIN_ITERATIONS', PBKDF2PasswordHasher.iterations),
+        'target_ms': getattr(settings, 'PASSWORD_HASHER_TARGET_MS', 250),
+    }
+
+
+# ==============================================
+# ФАЙЛ КАЛИБРОВКИ
+# ==============================================
+
+class CalibrationStore:
+    """
+    Результаты calibrate_password_hasher в JSON: алгоритм -> {'iterations': ..., ...}.
+    Файл перечитывается при смене mtime, так что работающие воркеры подхватывают
+    новую калибровку без перезапуска
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = None
+        self.data = {}
+
+    def _read(self):
+        path = get_config()['file']
+        if not path:
+            return {}
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return {}
+        with self.lock:
+            if self.loaded != (path, mtime):
+                try:
+                    with open(path, encoding='utf-8') as calibration_file:
+                        self.data = json.load(calibration_file)
+                except (OSError, ValueError):
+                    self.data = {}
+                self.loaded = (path, mtime)
+            return self.data
+
+    def get(self, algorithm):
+        return self._read().get(algorithm)
+
+    def _write(self, data):
+        path = get_config()['file']
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as calibration_file:
+            json.dump(data, calibration_file, indent=2)
+        os.replace(tmp_path, path)
+
+    def save(self, algorithm, entry):
+        data = dict(self._read())
+        data[algorithm] = entry
+        self._write(data)
+
+    def remove(self, algorithm):
+        data = dict(self._read())
+        if data.pop(algorithm, None) is None:
+            return False
+        self._write(data)
+        return True
+
+
+calibration = CalibrationStore()
+
+
+# ==============================================
+# ХЭШЕР
+# ==============================================
+
+class CalibratedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 с числом итераций из калибровки под железо хоста вместо константы Django
+    (не ниже PASSWORD_HASHER_MIN_ITERATIONS). Алгоритм тот же - pbkdf2_sha256, поэтому
+    существующие хэши проверяются как раньше; хэш с другим числом итераций пересчитывается
+    при следующем успешном входе (must_update -> check_password сохраняет новый хэш)
+    """
+
+    @property
+    def iterations(self):
+        entry = calibration.get(self.algorithm)
+        if entry is None:
+            return PBKDF2PasswordHasher.iterations
+        return max(int(entry['iterations']), get_config()['min_iterations'])
+
+
+def measure_hasher(hasher, iterations, samples=5):
+    """Медиана времени одного encode при заданном числе итераций, в секундах"""
+    salt = hasher.salt()
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hasher.encode('calibration-password', salt, iterations)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def calibrate_iterations(hasher, target_seconds, sample_iterations=100000, samples=5, step=10000):
+    """
+    Число итераций, при котором хэш считается примерно target_seconds: время PBKDF2
+    линейно по итерациям, поэтому замер на sample_iterations масштабируется.
+    Округляется вниз до step
+    """
+    per_iteration = measure_hasher(hasher, sample_iterations, samples) / sample_iterations
+    return max(step, int(target_seconds / per_iteration) // step * step)
@@ -0,0 +1,98 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError
+from django.db.models import Case, DateTimeField, F, Q, Value, When
+
+from .authentication import invalidate_user
+
+logger = logging.getLogger('tasks')
+
+
+def get_config():
+    return {
+        'flush_interval': getattr(settings, 'LAST_LOGIN_FLUSH_INTERVAL', 30),
+        'batch_size': getattr(settings, 'LAST_LOGIN_BATCH_SIZE', 500),
+    }
+
+
+class LastLoginBuffer:
+    """
+    last_login пользователей, вошедших после последнего сброса: user_id -> время входа.
+    Повторные входы одного пользователя схлопываются в одну запись. Сброс - один
+    UPDATE ... CASE на пачку из LAST_LOGIN_BATCH_SIZE пользователей; выполняется после
+    ответа (сигнал request_finished), когда прошло LAST_LOGIN_FLUSH_INTERVAL секунд
+    или набралась пачка. В базе last_login отстает не больше чем на интервал;
+    входы, не сброшенные до остановки процесса, теряются. Буферы воркеров независимы:
+    запись не заменяет более позднее время, записанное другим воркером
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.flushed_at = time.monotonic()
+
+    def touch(self, user_id, when):
+        with self.lock:
+            self.pending[user_id] = when
+
+    def is_due(self):
+        config = get_config()
+        with self.lock:
+            return bool(self.pending) and (
+                len(self.pending) >= config['batch_size']
+                or time.monotonic() - self.flushed_at >= config['flush_interval']
+            )
+
+    def flush(self, using=None):
+        """Пишет накопленное в базу, возвращает число обновленных пользователей"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.flushed_at = time.monotonic()
+        items = list(pending.items())
+        batch_size = get_config()['batch_size']
+        users = get_user_model()._default_manager.db_manager(using)
+
+        start = 0
+        try:
+            while start < len(items):
+                batch = items[start:start + batch_size]
+                # Только более позднее время: воркер, сбросивший буфер позже, не откатывает last_login
+                users.filter(pk__in=[user_id for user_id, _ in batch]).update(last_login=Case(
+                    *[When(Q(pk=user_id) & (Q(last_login__lt=when) | Q(last_login__isnull=True)), then=Value(when))
+                      for user_id, when in batch],
+                    default=F('last_login'),
+                    output_field=DateTimeField(),
+                ))
+                start += len(batch)
+        except DatabaseError:
+            # Несохраненное возвращается в буфер, не затирая более поздние входы
+            with self.lock:
+                for user_id, when in items[start:]:
+                    self.pending.setdefault(user_id, when)
+            raise
+
+        # UPDATE идет мимо post_save - сбрасываем кэш пользователей сами
+        for user_id, _ in items:
+            invalidate_user(user_id, using)
+        return len(items)
+
+    def clear(self):
+        with self.lock:
+            self.pending.clear()
+
+
+last_login_buffer = LastLoginBuffer()
+
+
+def flush_last_login_if_due(sender=None, **kwargs):
+    """Обработчик request_finished: ошибка записи не должна ломать закрытие ответа"""
+    if not last_login_buffer.is_due():
+        return
+    try:
+        last_login_buffer.flush()
+    except DatabaseError:
+        logger.warning('Не удалось записать last_login, повтор при следующем сбросе', exc_info=True)
@@ -0,0 +1,257 @@
+import csv
+import json
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .export import CSV_CATEGORY_SEPARATOR
+from .models import Task, SubTask, Category
+
+STATUSES = {status for status, _ in Task.STATUS_CHOICES}
+TITLE_MAX_LENGTH = Task._meta.get_field('title').max_length
+
+
+class RowError(ValueError):
+    """Ошибка в одной записи источника - запись пропускается, импорт продолжается"""
+
+
+@contextmanager
+def keep_created_at(*models):
+    """
+    Временно отключает auto_now_add у created_at, чтобы bulk_create сохранил
+    даты из источника. Только для management-команд: меняет поле модели на весь процесс
+    """
+    fields = [model._meta.get_field('created_at') for model in models]
+    previous = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(fields, previous):
+            field.auto_now_add = value
+
+
+@contextmanager
+def without_query_log(using=DEFAULT_DB_ALIAS):
+    """
+    При DEBUG=True каждый запрос идет через CursorDebugWrapper: SQL с подставленными параметрами
+    собирается для connection.queries и лога django.db.backends; для многомегабайтных INSERT
+    это дороже самой вставки. Отключает обертку только у соединения загрузки (соединения
+    свои у каждого потока); settings.DEBUG не меняется
+    """
+    connection = connections[using]
+    connection.make_debug_cursor = connection.make_cursor
+    try:
+        yield
+    finally:
+        del connection.make_debug_cursor
+
+
+# ==============================================
+# ЧТЕНИЕ ИСТОЧНИКА
+# ==============================================
+# Источник читается потоково и превращается в единицы импорта:
+# (номер строки, {'task': {...}, 'subtasks': [...], 'categories': [...]} или None, ошибка или None)
+
+def read_ndjson(stream):
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            yield line_no, None, f'некорректный JSON: {error}'
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, 'ожидается объект задачи'
+            continue
+        yield line_no, {
+            'task': record,
+            'subtasks': record.get('subtasks') or [],
+            'categories': record.get('categories') or [],
+        }, None
+
+
+def read_csv(stream):
+    """CSV в формате экспорта: строка задачи, за ней строки ее подзадач"""
+    reader = csv.DictReader(stream)
+    current = None
+    current_line = None
+
+    for row in reader:
+        record_type = (row.get('record_type') or 'task').strip()
+        if record_type == 'task':
+            if current is not None:
+                yield current_line, current, None
+            categories = [name.strip() for name in (row.get('categories') or '').split(CSV_CATEGORY_SEPARATOR)]
+            current = {'task': row, 'subtasks': [], 'categories': [name for name in categories if name]}
+            current_line = reader.line_num
+        elif record_type == 'subtask':
+            task_id = (row.get('task_id') or '').strip()
+            if current is None or (task_id and task_id != (current['task'].get('id') or '').strip()):
+                yield reader.line_num, None, 'подзадача не следует за своей задачей'
+                continue
+            current['subtasks'].append(row)
+        else:
+            yield reader.line_num, None, f'неизвестный record_type "{record_type}"'
+
+    if current is not None:
+        yield current_line, current, None
+
+
+READERS = {
+    'csv': read_csv,
+    'ndjson': read_ndjson,
+}
+
+
+# ==============================================
+# ЗАГРУЗКА ПАЧКАМИ
+# ==============================================
+
+class TaskLoader:
+    """
+    Пакетная вставка задач, подзадач и связей с категориями.
+    Владельцы и категории разрешаются через словари в памяти: один запрос
+    на все новые имена пачки, а не get_or_create на каждую строку
+    """
+
+    def __init__(self, default_owner=None, batch_size=1000, dry_run=False, using='default'):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.using = using
+        self.owners = {}
+        self.categories = {}
+        self.default_owner_id = None
+        if default_owner:
+            self.default_owner_id = self.resolve_owners([default_owner]).get(default_owner)
+            if self.default_owner_id is None:
+                raise RowError(f'пользователь "{default_owner}" не найден')
+
+    # Справочники
+
+    def resolve_owners(self, usernames):
+        missing = {name for name in usernames if name and name not in self.owners}
+        if missing:
+            self.owners.update(
+                User.objects.using(self.using).filter(username__in=missing).values_list('username', 'pk')
+            )
+        return self.owners
+
+    def resolve_categories(self, names):
+        missing = {name for name in names if name and name not in self.categories}
+        if not missing:
+            return self.categories
+
+        # Удаленные категории тоже занимают имя (unique), поэтому ищем через all_objects
+        categories = Category.all_objects.using(self.using)
+        self.categories.update(categories.filter(name__in=missing).values_list('name', 'pk'))
+        missing -= self.categories.keys()
+        if missing and not self.dry_run:
+            categories.bulk_create([Category(name=name) for name in missing], ignore_conflicts=True)
+            self.categories.update(categories.filter(name__in=missing).values_list('name', 'pk'))
+        elif missing:
+            # В пробном прогоне категории не создаются, но запись считается корректной
+            self.categories.update((name, None) for name in missing)
+        return self.categories
+
+    # Разбор записей
+
+    @staticmethod
+    def _datetime(value, field, default=None):
+        if value in (None, ''):
+            return default
+        parsed = parse_datetime(value) if isinstance(value, str) else None
+        if parsed is None:
+            raise RowError(f'{field}: некорректная дата "{value}"')
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    def _common_fields(self, record, now):
+        title = (record.get('title') or '').strip()
+        if not title:
+            raise RowError('title: обязательное поле')
+        if len(title) > TITLE_MAX_LENGTH:
+            raise RowError(f'title: длиннее {TITLE_MAX_LENGTH} символов')
+        status = (record.get('status') or 'new').strip()
+        if status not in STATUSES:
+            raise RowError(f'status: недопустимое значение "{status}"')
+        return {
+            'title': title,
+            'description': record.get('description') or '',
+            'status': status,
+            'deadline': self._datetime(record.get('deadline'), 'deadline'),
+            'created_at': self._datetime(record.get('created_at'), 'created_at', default=now),
+        }
+
+    def _owner_id(self, username, fallback=None):
+        owner_id = self.owners.get(username) if username else None
+        if owner_id is None:
+            owner_id = fallback or self.default_owner_id
+        if owner_id is None:
+            raise RowError(f'owner: пользователь "{username or ""}" не найден')
+        return owner_id
+
+    def build(self, unit, now):
+        """Возвращает (задача, [подзадачи], [id категорий]) без сохранения"""
+        record = unit['task']
+        task = Task(owner_id=self._owner_id(record.get('owner')), **self._common_fields(record, now))
+        subtasks = [
+            SubTask(
+                owner_id=self._owner_id(subtask.get('owner'), fallback=task.owner_id),
+                **self._common_fields(subtask, now),
+            )
+            for subtask in unit['subtasks']
+        ]
+        category_ids = [self.categories[name] for name in dict.fromkeys(unit['categories'])]
+        return task, subtasks, category_ids
+
+    # Вставка
+
+    def load(self, units):
+        """
+        Загружает пачку единиц импорта одной транзакцией.
+        Возвращает (задач, подзадач, [(номер строки, ошибка)])
+        """
+        self.resolve_owners(
+            [unit['task'].get('owner') for _, unit in units]
+            + [subtask.get('owner') for _, unit in units for subtask in unit['subtasks']]
+        )
+        self.resolve_categories([name for _, unit in units for name in unit['categories']])
+
+        now = timezone.now()
+        built = []
+        errors = []
+        for line_no, unit in units:
+            try:
+                built.append(self.build(unit, now))
+            except RowError as error:
+                errors.append((line_no, str(error)))
+
+        subtask_total = sum(len(subtasks) for _, subtasks, _ in built)
+        if self.dry_run or not built:
+            return len(built), subtask_total, errors
+
+        through = Task.categories.through
+        with transaction.atomic(using=self.using), keep_created_at(Task, SubTask):
+            tasks = Task.objects.using(self.using).bulk_create(
+                [task for task, _, _ in built], batch_size=self.batch_size
+            )
+            subtasks = []
+            links = []
+            for task, (_, task_subtasks, category_ids) in zip(tasks, built):
+                for subtask in task_subtasks:
+                    subtask.task_id = task.pk
+                    subtasks.append(subtask)
+                links.extend(through(task_id=task.pk, category_id=category_id) for category_id in category_ids)
+
+            SubTask.objects.using(self.using).bulk_create(subtasks, batch_size=self.batch_size)
+            through.objects.using(self.using).bulk_create(links, batch_size=self.batch_size, ignore_conflicts=True)
+
+        return len(tasks), len(subtasks), errors
@@ -0,0 +1,218 @@
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка между процессами недоступна, работает в одном процессе
+    fcntl = None
+
+# Атрибуты, которые есть у любого LogRecord; все остальные пришли через extra=
+RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON: время, уровень, логгер, сообщение и все поля из extra"""
+
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'process': record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+# ==============================================
+# ОЧЕРЕДЬ И ФОНОВЫЙ ЗАПИСЫВАЮЩИЙ ПОТОК
+# ==============================================
+
+class QueuedHandler(logging.Handler):
+    """
+    Обработчик, у которого в потоке запроса только put_nowait в ограниченную очередь.
+    Форматирование и запись делает фоновый поток пачками до batch_size записей.
+    При переполнении запись отбрасывается и учитывается в dropped; о потерях
+    фоновый поток пишет отдельной записью
+    """
+
+    def __init__(self, queue_size=10000, batch_size=500, flush_interval=0.5, level=logging.NOTSET):
+        super().__init__(level)
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._pid = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        with self._start_lock:
+            # После fork поток родителя в дочернем процессе не существует - создаем свой
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.queue_size)
+            self._thread = threading.Thread(target=self._run, name=f'log-writer-{self.name or id(self)}', daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def handle(self, record):
+        # Без блокировки обработчика: очередь потокобезопасна сама по себе
+        if self.filter(record):
+            self.emit(record)
+        return True
+
+    def _run(self):
+        while True:
+            try:
+                records = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                records = []
+            while records and len(records) < self.batch_size:
+                try:
+                    records.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in records
+            self._write_records([record for record in records if record is not None])
+            for _ in records:
+                self.queue.task_done()
+            if stop:
+                return
+
+    def _write_records(self, records):
+        dropped = self.dropped - self._reported_dropped
+        if dropped:
+            self._reported_dropped += dropped
+            records.append(logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': 'Очередь логов переполнена, отброшено записей: %d', 'args': (dropped,),
+                'dropped': dropped,
+            }))
+        if not records:
+            return
+
+        lines = []
+        for record in records:
+            try:
+                lines.append(self.format(record) + '\n')
+            except Exception:
+                self.handleError(record)
+        try:
+            self.write_batch(''.join(lines))
+        except Exception:
+            self.handleError(records[-1])
+
+    def write_batch(self, data):
+        raise NotImplementedError
+
+    def flush(self):
+        """Ждет, пока фоновый поток запишет все, что уже в очереди"""
+        if self._pid == os.getpid() and self._thread.is_alive():
+            self.queue.join()
+
+    def close(self):
+        if self._pid == os.getpid() and self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join(timeout=5)
+        super().close()
+
+
+class QueuedStreamHandler(QueuedHandler):
+    """Запись в stderr (или другой поток) из фонового потока"""
+
+    def __init__(self, stream=None, **kwargs):
+        super().__init__(**kwargs)
+        self.stream = stream
+
+    def write_batch(self, data):
+        stream = self.stream or sys.stderr
+        stream.write(data)
+        stream.flush()
+
+
+class QueuedRotatingFileHandler(QueuedHandler):
+    """
+    Файл с ротацией по размеру, безопасной для нескольких процессов (воркеров gunicorn).
+    Каждая пачка пишется под flock на соседнем .lock-файле: процесс проверяет, не ротировал
+    ли файл другой воркер (сменился inode), при необходимости переоткрывает его
+    и ротирует сам, затем дописывает пачку одним write в режиме append
+    """
+
+    def __init__(self, filename, maxBytes=0, backupCount=0, encoding='utf-8', **kwargs):
+        super().__init__(**kwargs)
+        self.baseFilename = os.path.abspath(filename)
+        self.maxBytes = maxBytes
+        self.backupCount = backupCount
+        self.encoding = encoding
+        self.stream = None
+
+    def _open(self):
+        if self.stream is not None:
+            self.stream.close()
+        self.stream = open(self.baseFilename, 'a', encoding=self.encoding)
+
+    def _is_stale(self):
+        """Файл по нашему пути уже не тот, что открыт у нас (его ротировал другой процесс)"""
+        try:
+            on_disk = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            return True
+        opened = os.fstat(self.stream.fileno())
+        return (on_disk.st_dev, on_disk.st_ino) != (opened.st_dev, opened.st_ino)
+
+    def _rotate(self):
+        self.stream.close()
+        self.stream = None
+        if self.backupCount > 0:
+            for index in range(self.backupCount - 1, 0, -1):
+                source = f'{self.baseFilename}.{index}'
+                if os.path.exists(source):
+                    os.replace(source, f'{self.baseFilename}.{index + 1}')
+            os.replace(self.baseFilename, f'{self.baseFilename}.1')
+        else:
+            os.truncate(self.baseFilename, 0)
+        self._open()
+
+    def write_batch(self, data):
+        with open(f'{self.baseFilename}.lock', 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                if self.stream is None or self._is_stale():
+                    self._open()
+                size = os.fstat(self.stream.fileno()).st_size
+                if self.maxBytes and size and size + len(data.encode(self.encoding)) > self.maxBytes:
+                    self._rotate()
+                self.stream.write(data)
+                self.stream.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def close(self):
+        super().close()
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
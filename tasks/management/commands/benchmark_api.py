@@ -0,0 +1,202 @@
+import json
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+
+from tasks.benchmark import (
+    DEFAULT_MIX, READ_MIX, VIEW_PREFIXES, BenchmarkError, compare_databases, compare_reports, make_transport,
+    parse_mix,
+    run_benchmark, run_capacity,
+)
+from tasks.sqlite_tuning import STOCK_PRAGMAS
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон API: взвешенная смесь эндпоинтов конкурентными клиентами, '
+        'p50/p95/p99, запросы в секунду и SQL-запросы на запрос по каждому эндпоинту. '
+        'Данные для прогона готовит generate_dataset. СУБД выбирается переменной DB_ENGINE; '
+        '--baseline с отчетом другой СУБД или других PRAGMA SQLite выводит сравнение '
+        'вместо проверки регрессий'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', default='wsgi',
+                            help='wsgi или asgi - приложение в этом процессе, '
+                                 'либо URL запущенного сервера (http://127.0.0.1:8000)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Число одновременных клиентов')
+        parser.add_argument('--duration', type=float, default=10, help='Длительность прогона в секундах')
+        parser.add_argument('--mix', help='Веса эндпоинтов, например "task_list=3,stats=1" '
+                                          '(по умолчанию обычная смесь, для --capacity - только чтение)')
+        parser.add_argument('--views', choices=list(VIEW_PREFIXES), default='sync',
+                            help='Представления для эндпоинтов чтения: синхронные или асинхронные (/api/async/)')
+        parser.add_argument('--capacity',
+                            help='Сравнить емкость sync и async представлений при конкурентности, '
+                                 'например "8,32,128"; --concurrency и --views не используются. '
+                                 'Смысл имеет только против ASGI-сервера (--target http://...): '
+                                 'asgi в этом процессе гоняет каждого клиента в своем потоке')
+        parser.add_argument('--max-p95', type=float, default=500,
+                            help='Порог p95 в мс, при котором конкурентность считается выдержанной (--capacity)')
+        parser.add_argument('--sqlite-pragmas', choices=['settings', 'stock'], default='settings',
+                            help='PRAGMA соединений SQLite: из SQLITE_PRAGMAS или настройки SQLite '
+                                 'по умолчанию (замер "до"); только для wsgi/asgi в этом процессе')
+        parser.add_argument('--username', default='bench_000000',
+                            help='Пользователь, от имени которого работают клиенты')
+        parser.add_argument('--password', default='Bench-pass-123')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Куда записать отчет в JSON')
+        parser.add_argument('--baseline', help='Отчет предыдущего прогона для сравнения')
+        parser.add_argument('--max-latency-increase', type=float, default=0.2,
+                            help='Допустимый рост p95 относительно --baseline (доля)')
+        parser.add_argument('--max-throughput-drop', type=float, default=0.2,
+                            help='Допустимое падение rps относительно --baseline (доля)')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['duration'] <= 0:
+            raise CommandError('--concurrency и --duration должны быть положительными')
+
+        if options['capacity']:
+            return self.handle_capacity(options)
+
+        try:
+            transport = make_transport(options['target'])
+            mix = parse_mix(options['mix'] or DEFAULT_MIX)
+            with self.sqlite_pragmas(options['sqlite_pragmas']):
+                report = run_benchmark(
+                    transport, mix, options['username'], options['password'],
+                    concurrency=options['concurrency'], duration=options['duration'], seed=options['seed'],
+                    views=options['views'],
+                )
+        except BenchmarkError as error:
+            raise CommandError(str(error))
+        report['target'] = options['target']
+        if report['database'] == 'sqlite' and options['target'] in ('wsgi', 'asgi'):
+            report['sqlite_pragmas'] = options['sqlite_pragmas']
+
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Отчет записан в {options["output"]}')
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as baseline_file:
+                baseline = json.load(baseline_file)
+            if _setup(baseline, report) != _setup(report, report):
+                # Разные СУБД или PRAGMA - это сравнение, а не регрессия
+                return self.print_comparison(baseline, report)
+            regressions = compare_reports(
+                baseline, report, options['max_latency_increase'], options['max_throughput_drop']
+            )
+            if regressions:
+                for regression in regressions:
+                    self.stderr.write(self.style.ERROR(f'  {regression}'))
+                raise CommandError(f'Регрессия производительности относительно {options["baseline"]}')
+            self.stdout.write(self.style.SUCCESS('✓ Регрессий относительно базового прогона нет'))
+
+    def handle_capacity(self, options):
+        try:
+            levels = [int(level) for level in options['capacity'].split(',')]
+        except ValueError:
+            raise CommandError('--capacity: ожидается список чисел через запятую, например "8,32,128"')
+        if not levels or min(levels) < 1:
+            raise CommandError('--capacity: конкурентность должна быть положительной')
+
+        try:
+            result = run_capacity(
+                make_transport(options['target']), parse_mix(options['mix'] or READ_MIX),
+                options['username'], options['password'], levels,
+                duration=options['duration'], seed=options['seed'], max_p95_ms=options['max_p95'],
+            )
+        except BenchmarkError as error:
+            raise CommandError(str(error))
+        result['target'] = options['target']
+
+        self.stdout.write(f'{"представления":<15}{"клиентов":>10}{"rps":>10}{"p95, мс":>10}{"ошибок":>8}')
+        for views, summary in result['views'].items():
+            for run in summary['runs']:
+                self.stdout.write(
+                    f'{views:<15}{run["concurrency"]:>10}{run["rps"]:>10}'
+                    f'{_format(run["p95_ms"]):>10}{run["errors"]:>8}'
+                )
+        for views, summary in result['views'].items():
+            self.stdout.write(self.style.SUCCESS(
+                f'{views}: выдерживает {summary["capacity"]} одновременных клиентов '
+                f'(p95 <= {result["max_p95_ms"]} мс, без ошибок)'
+            ))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(result, output, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Отчет записан в {options["output"]}')
+
+    @contextmanager
+    def sqlite_pragmas(self, mode):
+        """
+        stock: соединения открываются заново с PRAGMA SQLite по умолчанию (журнал DELETE),
+        после прогона закрываются, и следующие снова получают SQLITE_PRAGMAS
+        """
+        if mode != 'stock':
+            yield
+            return
+        connections.close_all()
+        with override_settings(SQLITE_PRAGMAS=STOCK_PRAGMAS, SQLITE_TUNING_ENABLED=True):
+            try:
+                yield
+            finally:
+                connections.close_all()
+
+    def print_comparison(self, baseline, report):
+        self.stdout.write(f'Сравнение: {_label(baseline)} -> {_label(report)}')
+        self.stdout.write(
+            f'{"эндпоинт":<14}{"rps":>10}{"rps":>10}{"x":>7}{"p95, мс":>10}{"p95, мс":>10}{"x":>7}'
+        )
+        for row in compare_databases(baseline, report):
+            self.stdout.write(
+                f'{row["endpoint"]:<14}{row["baseline_rps"]:>10}{row["rps"]:>10}{_format(row["rps_ratio"]):>7}'
+                f'{_format(row["baseline_p95_ms"]):>10}{_format(row["p95_ms"]):>10}{_format(row["p95_ratio"]):>7}'
+            )
+        for key, title in (('read_rps', 'чтение'), ('write_rps', 'запись')):
+            if key in baseline:
+                self.stdout.write(f'{title}: {baseline[key]} -> {report[key]} запросов/с')
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего: {baseline["rps"]} rps -> {report["rps"]} rps, p95 {baseline["p95_ms"]} мс -> {report["p95_ms"]} мс'
+        ))
+
+    def print_report(self, report):
+        self.stdout.write(
+            f'СУБД: {_label(report)}, представления: {report["views"]}, клиентов: {report["concurrency"]}'
+        )
+        self.stdout.write(
+            f'{"эндпоинт":<14}{"запросов":>10}{"ошибок":>8}{"rps":>10}'
+            f'{"p50, мс":>10}{"p95, мс":>10}{"p99, мс":>10}{"SQL":>8}'
+        )
+        for name, endpoint in report['endpoints'].items():
+            queries = endpoint['queries_per_request']
+            self.stdout.write(
+                f'{name:<14}{endpoint["requests"]:>10}{endpoint["errors"]:>8}{endpoint["rps"]:>10}'
+                f'{_format(endpoint["p50_ms"]):>10}{_format(endpoint["p95_ms"]):>10}'
+                f'{_format(endpoint["p99_ms"]):>10}{_format(queries):>8}'
+            )
+        for failure in report['client_failures']:
+            self.stderr.write(self.style.WARNING(f'  клиент остановлен: {failure}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего запросов: {report["requests"]} за {report["duration_s"]} с ({report["rps"]} rps: '
+            f'чтение {report["read_rps"]}, запись {report["write_rps"]})'
+        ))
+
+
+def _format(value):
+    return '-' if value is None else value
+
+
+def _setup(report, current):
+    """СУБД и PRAGMA прогона; в старых отчетах их нет - считаем, что как у текущего"""
+    return report.get('database', current['database']), report.get('sqlite_pragmas', current.get('sqlite_pragmas'))
+
+
+def _label(report):
+    database, pragmas = _setup(report, report)
+    return f'{database} ({pragmas})' if pragmas else database
@@ -0,0 +1,74 @@
+from django.contrib.auth.hashers import get_hasher
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tasks.hashers import (
+    CalibratedPBKDF2PasswordHasher, calibrate_iterations, calibration, get_config, measure_hasher,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет PBKDF2 на этом хосте и подбирает число итераций под целевое время хэша. '
+        'Результат пишется в PASSWORD_HASHER_CALIBRATION_FILE; воркеры подхватывают его без перезапуска, '
+        'хэши паролей пересчитываются при следующем входе. При нескольких хостах откалибруйте один '
+        'и разложите этот файл на все: с разным числом итераций хэш пересчитывается при каждом входе '
+        'на другой хост'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=get_config()['target_ms'],
+                            help='Целевое время одного хэша в миллисекундах')
+        parser.add_argument('--sample-iterations', type=int, default=100000,
+                            help='Итераций в одном замере')
+        parser.add_argument('--samples', type=int, default=5, help='Число замеров (берется медиана)')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать результат, не сохраняя')
+        parser.add_argument('--reset', action='store_true',
+                            help='Удалить калибровку: вернуться к числу итераций Django по умолчанию')
+
+    def handle(self, *args, **options):
+        hasher = get_hasher('default')
+        if not isinstance(hasher, CalibratedPBKDF2PasswordHasher):
+            raise CommandError(
+                'Первым в PASSWORD_HASHERS должен быть tasks.hashers.CalibratedPBKDF2PasswordHasher, '
+                f'сейчас - {type(hasher).__module__}.{type(hasher).__qualname__}'
+            )
+        if not get_config()['file']:
+            raise CommandError('Не задан PASSWORD_HASHER_CALIBRATION_FILE')
+
+        if options['reset']:
+            removed = calibration.remove(hasher.algorithm)
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Калибровка удалена, итераций: {hasher.iterations}' if removed else 'Калибровки не было'
+            ))
+            return
+
+        if options['target_ms'] <= 0 or options['sample_iterations'] < 1 or options['samples'] < 1:
+            raise CommandError('--target-ms, --sample-iterations и --samples должны быть положительными')
+
+        calibrated = calibrate_iterations(
+            hasher, options['target_ms'] / 1000, options['sample_iterations'], options['samples'],
+        )
+        min_iterations = get_config()['min_iterations']
+        iterations = max(calibrated, min_iterations)
+        measured_ms = measure_hasher(hasher, iterations, options['samples']) * 1000
+
+        self.stdout.write(
+            f'{hasher.algorithm}: {iterations} итераций, хэш ~{measured_ms:.1f} мс '
+            f'(цель {options["target_ms"]:g} мс, было {hasher.iterations})'
+        )
+        if calibrated < min_iterations:
+            self.stderr.write(self.style.WARNING(
+                f'  цель дает {calibrated} итераций - меньше PASSWORD_HASHER_MIN_ITERATIONS '
+                f'({min_iterations}), взят минимум'
+            ))
+
+        if options['dry_run']:
+            return
+        calibration.save(hasher.algorithm, {
+            'iterations': iterations,
+            'target_ms': options['target_ms'],
+            'measured_ms': round(measured_ms, 1),
+            'calibrated_at': timezone.now().isoformat(),
+        })
+        self.stdout.write(self.style.SUCCESS(f'✓ Сохранено в {get_config()["file"]}'))
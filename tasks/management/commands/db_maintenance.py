@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from tasks.sqlite_tuning import CHECKPOINT_MODES, MAINTENANCE_STEPS, enable_incremental_vacuum, run_maintenance
+
+
+class Command(BaseCommand):
+    help = (
+        'Обслуживание базы SQLite: ANALYZE, PRAGMA optimize, incremental vacuum и checkpoint WAL. '
+        'Запускается по расписанию (cron/systemd timer) или сам повторяется с --interval'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--steps', default=','.join(MAINTENANCE_STEPS),
+                            help=f'Шаги через запятую, по умолчанию все: {",".join(MAINTENANCE_STEPS)}')
+        parser.add_argument('--vacuum-pages', type=int, default=0,
+                            help='Сколько свободных страниц вернуть за раз (0 - все)')
+        parser.add_argument('--checkpoint-mode', choices=CHECKPOINT_MODES, default='TRUNCATE')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Повторять каждые N секунд до остановки (0 - один раз)')
+        parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                            help='Перевести существующую базу на auto_vacuum=INCREMENTAL (полный VACUUM, '
+                                 'база блокируется на время перезаписи)')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('db_maintenance рассчитана на SQLite')
+
+        steps = [step.strip() for step in options['steps'].split(',') if step.strip()]
+        unknown = set(steps) - set(MAINTENANCE_STEPS)
+        if unknown or not steps:
+            raise CommandError(f'--steps: ожидаются шаги из {", ".join(MAINTENANCE_STEPS)}')
+        if options['vacuum_pages'] < 0 or options['interval'] < 0:
+            raise CommandError('--vacuum-pages и --interval не могут быть отрицательными')
+
+        if options['enable_incremental_vacuum']:
+            with connection.cursor() as cursor:
+                enable_incremental_vacuum(cursor)
+            self.stdout.write('auto_vacuum=INCREMENTAL включен, база перезаписана VACUUM')
+
+        while True:
+            results = run_maintenance(
+                connection, steps, vacuum_pages=options['vacuum_pages'],
+                checkpoint_mode=options['checkpoint_mode'],
+            )
+            for step, result in results.items():
+                details = ', '.join(f'{key}={value}' for key, value in result.items() if key != 'ms')
+                self.stdout.write(f'  {step:<11}{result["ms"]:>10} мс  {details}')
+            self.stdout.write(self.style.SUCCESS(f'✓ Обслуживание выполнено: {", ".join(results)}'))
+
+            if not options['interval']:
+                break
+            # Между прогонами соединение не держим: WAL-checkpoint не ждет наших читателей
+            connection.close()
+            time.sleep(options['interval'])
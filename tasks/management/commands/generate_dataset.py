@@ -0,0 +1,234 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from tasks.loading import keep_created_at, without_query_log
+from tasks.models import Task, SubTask, Category
+
+DEFAULT_STATUS_MIX = 'new=30,in_progress=25,pending=10,blocked=5,done=30'
+
+VERBS = ['Подготовить', 'Проверить', 'Обновить', 'Согласовать', 'Исправить', 'Написать',
+         'Протестировать', 'Развернуть', 'Описать', 'Оптимизировать', 'Review', 'Deploy', 'Refactor']
+NOUNS = ['отчет', 'презентацию', 'договор', 'релиз', 'документацию', 'миграцию', 'бюджет',
+         'дизайн', 'API', 'dashboard', 'backlog', 'invoice', 'roadmap', 'интеграцию', 'тесты']
+WORDS = ['клиент', 'срок', 'команда', 'данные', 'сервер', 'задача', 'проект', 'встреча', 'метрики',
+         'performance', 'database', 'index', 'query', 'cache', 'release', 'feedback', 'план', 'риски']
+
+
+def parse_mix(value):
+    """'new=30,done=70' -> ([статусы], [веса])"""
+    statuses = {status for status, _ in Task.STATUS_CHOICES}
+    mix = {}
+    try:
+        for part in value.split(','):
+            status, weight = part.split('=')
+            mix[status.strip()] = float(weight)
+    except ValueError:
+        raise CommandError(f'Некорректный --status-mix "{value}", ожидается status=вес,...')
+    unknown = mix.keys() - statuses
+    if unknown:
+        raise CommandError(f'Неизвестные статусы в --status-mix: {", ".join(sorted(unknown))}')
+    return list(mix), list(mix.values())
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерация воспроизводимого синтетического набора данных для нагрузочных тестов: '
+        'пользователи, задачи (со скошенным распределением по пользователям), подзадачи и категории'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--tasks-per-user', type=float, default=100,
+                            help='Среднее число задач на пользователя')
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Показатель Ципфа для распределения задач по пользователям (0 - поровну)')
+        parser.add_argument('--subtasks-per-task', type=float, default=3,
+                            help='Среднее число подзадач на задачу')
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--categories-per-task', type=int, default=2,
+                            help='Максимум категорий у задачи')
+        parser.add_argument('--status-mix', default=DEFAULT_STATUS_MIX,
+                            help='Доли статусов, например "new=30,done=70"')
+        parser.add_argument('--overdue-ratio', type=float, default=0.15,
+                            help='Доля задач с прошедшим дедлайном')
+        parser.add_argument('--no-deadline-ratio', type=float, default=0.2,
+                            help='Доля задач без дедлайна')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней до --anchor распределяются даты создания')
+        parser.add_argument('--anchor', default=None,
+                            help='Опорная дата YYYY-MM-DD (по умолчанию сегодня); с тем же seed и anchor '
+                                 'набор данных получается тем же')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='bench',
+                            help='Префикс имен пользователей и категорий')
+        parser.add_argument('--password', default='Bench-pass-123',
+                            help='Пароль всех сгенерированных пользователей')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Сколько задач вставлять в одной транзакции')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        for name in ('users', 'batch_size'):
+            if options[name] < 1:
+                raise CommandError(f'--{name.replace("_", "-")} должен быть положительным')
+        for name in ('tasks_per_user', 'subtasks_per_task', 'skew', 'categories', 'categories_per_task', 'days'):
+            if options[name] < 0:
+                raise CommandError(f'--{name.replace("_", "-")} не может быть отрицательным')
+        if options['overdue_ratio'] + options['no_deadline_ratio'] > 1:
+            raise CommandError('Сумма --overdue-ratio и --no-deadline-ratio не может быть больше 1')
+
+        self.using = options['database']
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.statuses, self.status_weights = parse_mix(options['status_mix'])
+
+        anchor = options['anchor'] or datetime.now(dt_timezone.utc).date().isoformat()
+        try:
+            anchor_date = datetime.strptime(anchor, '%Y-%m-%d')
+        except ValueError:
+            raise CommandError(f'Некорректная --anchor "{anchor}", ожидается YYYY-MM-DD')
+        self.anchor = anchor_date.replace(tzinfo=dt_timezone.utc)
+
+        prefix = options['prefix']
+        if User.objects.using(self.using).filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f'Пользователи с префиксом "{prefix}_" уже есть, укажите другой --prefix')
+
+        started = time.monotonic()
+        with without_query_log(self.using):
+            user_ids = self.create_users(prefix, options['users'], options['password'])
+            category_ids = self.create_categories(prefix, options['categories'])
+            self.stdout.write(f'Создано пользователей: {len(user_ids)}, категорий: {len(category_ids)}')
+
+            quotas = self.task_quotas(len(user_ids), options['tasks_per_user'], options['skew'])
+            totals = self.create_tasks(user_ids, quotas, category_ids)
+
+        elapsed = time.monotonic() - started
+        rows = sum(totals) + len(user_ids) + len(category_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Сгенерировано задач: {totals[0]}, подзадач: {totals[1]}, связей с категориями: {totals[2]} '
+            f'за {elapsed:.1f} с ({rows / elapsed if elapsed else 0:.0f} строк/с)'
+        ))
+
+    # ==============================================
+    # ПОЛЬЗОВАТЕЛИ И КАТЕГОРИИ
+    # ==============================================
+
+    def create_users(self, prefix, count, password):
+        # Хэш пароля считается один раз: PBKDF2 на каждого пользователя занял бы минуты
+        password_hash = make_password(password)
+        users = [
+            User(username=f'{prefix}_{index:06d}', email=f'{prefix}_{index:06d}@example.com',
+                 password=password_hash)
+            for index in range(count)
+        ]
+        User.objects.using(self.using).bulk_create(users, batch_size=self.options['batch_size'])
+        return list(
+            User.objects.using(self.using)
+            .filter(username__startswith=f'{prefix}_')
+            .order_by('username')
+            .values_list('pk', flat=True)
+        )
+
+    def create_categories(self, prefix, count):
+        names = [f'{prefix}-{index:03d}' for index in range(count)]
+        categories = Category.all_objects.using(self.using)
+        categories.bulk_create([Category(name=name) for name in names], ignore_conflicts=True)
+        return list(categories.filter(name__in=names).order_by('name').values_list('pk', flat=True))
+
+    # ==============================================
+    # ЗАДАЧИ
+    # ==============================================
+
+    def task_quotas(self, users, mean, skew):
+        """Число задач каждого пользователя: закон Ципфа, в сумме users * mean"""
+        if not users:
+            return []
+        weights = [1 / (rank ** skew) for rank in range(1, users + 1)]
+        scale = users * mean / sum(weights)
+        quotas = [int(round(weight * scale)) for weight in weights]
+        # Чтобы «тяжелые» пользователи не шли подряд по id
+        self.rng.shuffle(quotas)
+        return quotas
+
+    def random_text(self, words):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(words))
+
+    def random_fields(self, created_at):
+        options = self.options
+        status = self.rng.choices(self.statuses, self.status_weights)[0]
+        roll = self.rng.random()
+        if roll < options['no_deadline_ratio']:
+            deadline = None
+        elif roll < options['no_deadline_ratio'] + options['overdue_ratio']:
+            deadline = self.anchor - timedelta(hours=self.rng.randint(1, 24 * 60))
+        else:
+            deadline = self.anchor + timedelta(hours=self.rng.randint(1, 24 * 90))
+        return {
+            'title': f'{self.rng.choice(VERBS)} {self.rng.choice(NOUNS)} #{self.rng.randint(1, 99999)}',
+            'description': self.random_text(self.rng.randint(0, 12)),
+            'status': status,
+            'deadline': deadline,
+            'created_at': created_at,
+        }
+
+    def task_stream(self, user_ids, quotas):
+        """
+        Задачи в порядке генерации вместе с полями подзадач и категориями.
+        Все случайные значения берутся здесь, поэтому результат не зависит от --batch-size
+        """
+        options = self.options
+        seconds = options['days'] * 24 * 60 * 60
+        subtask_mean = options['subtasks_per_task']
+        max_categories = min(options['categories_per_task'], len(self.category_ids))
+
+        for user_id, quota in zip(user_ids, quotas):
+            for _ in range(quota):
+                created_at = self.anchor - timedelta(seconds=self.rng.randint(0, seconds))
+                task = Task(owner_id=user_id, **self.random_fields(created_at))
+                subtask_count = self.rng.randint(0, int(round(subtask_mean * 2))) if subtask_mean else 0
+                subtasks = [
+                    self.random_fields(created_at + timedelta(minutes=self.rng.randint(0, 60 * 24 * 7)))
+                    for _ in range(subtask_count)
+                ]
+                categories = self.rng.sample(self.category_ids, self.rng.randint(0, max_categories))
+                yield task, subtasks, categories
+
+    def create_tasks(self, user_ids, quotas, category_ids):
+        self.category_ids = category_ids
+        batch_size = self.options['batch_size']
+        through = Task.categories.through
+        totals = [0, 0, 0]
+        batch = []
+
+        def flush():
+            with transaction.atomic(using=self.using), keep_created_at(Task, SubTask):
+                tasks = Task.objects.using(self.using).bulk_create([task for task, _, _ in batch])
+                subtasks = []
+                links = []
+                for task, (_, subtask_fields, categories) in zip(tasks, batch):
+                    subtasks.extend(
+                        SubTask(owner_id=task.owner_id, task_id=task.pk, **fields) for fields in subtask_fields
+                    )
+                    links.extend(through(task_id=task.pk, category_id=category_id) for category_id in categories)
+                SubTask.objects.using(self.using).bulk_create(subtasks, batch_size=batch_size)
+                through.objects.using(self.using).bulk_create(links, batch_size=batch_size)
+
+            totals[0] += len(tasks)
+            totals[1] += len(subtasks)
+            totals[2] += len(links)
+            self.stdout.write(f'  задач: {totals[0]}, подзадач: {totals[1]}')
+            batch.clear()
+
+        for item in self.task_stream(user_ids, quotas):
+            batch.append(item)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        return totals
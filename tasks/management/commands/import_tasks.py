@@ -0,0 +1,144 @@
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.loading import READERS, RowError, TaskLoader, without_query_log
+
+# Сколько ошибок печатать построчно; остальные только считаются
+MAX_PRINTED_ERRORS = 20
+
+
+class Command(BaseCommand):
+    help = 'Массовый импорт задач с подзадачами и категориями из CSV или NDJSON (формат экспорта)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл для импорта ("-" - стандартный ввод)')
+        parser.add_argument('--format', dest='input_format', choices=sorted(READERS),
+                            help='Формат файла; по умолчанию определяется по расширению')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Сколько задач вставлять в одной транзакции')
+        parser.add_argument('--default-owner',
+                            help='Владелец для записей без owner или с неизвестным пользователем')
+        parser.add_argument('--checkpoint',
+                            help='Файл контрольной точки: после каждой пачки туда пишется прогресс, '
+                                 'повторный запуск продолжает с места остановки')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только прочитать и проверить данные, ничего не записывая')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['input_format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if input_format not in READERS:
+            raise CommandError('Не удалось определить формат файла, укажите --format csv или --format ndjson')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+
+        dry_run = options['dry_run']
+        checkpoint_path = None if dry_run else options['checkpoint']
+        checkpoint = self.read_checkpoint(checkpoint_path, path)
+        skip = checkpoint.get('units', 0)
+        if skip:
+            self.stdout.write(f'Продолжаем с контрольной точки: пропускаем {skip} уже обработанных задач')
+
+        try:
+            loader = TaskLoader(
+                default_owner=options['default_owner'],
+                batch_size=options['batch_size'],
+                dry_run=dry_run,
+                using=options['database'],
+            )
+        except RowError as error:
+            raise CommandError(str(error))
+
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+        try:
+            with without_query_log(options['database']):
+                totals = self.run(loader, READERS[input_format](stream), skip, checkpoint, checkpoint_path, options)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        tasks, subtasks, errors, elapsed = totals
+        rate = (tasks + subtasks) / elapsed if elapsed else 0
+        prefix = 'Пробный прогон: проверено' if dry_run else '✓ Импортировано'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} задач: {tasks}, подзадач: {subtasks}, ошибок: {errors} '
+            f'за {elapsed:.1f} с ({rate:.0f} строк/с)'
+        ))
+
+    def run(self, loader, units, skip, checkpoint, checkpoint_path, options):
+        batch_size = options['batch_size']
+        processed = skip
+        tasks = subtasks = errors = 0
+        started = time.monotonic()
+        units = islice(units, skip, None)
+
+        while True:
+            batch = list(islice(units, batch_size))
+            if not batch:
+                break
+
+            valid = []
+            for line_no, unit, error in batch:
+                if error:
+                    errors = self.report_error(errors, line_no, error)
+                else:
+                    valid.append((line_no, unit))
+
+            loaded_tasks, loaded_subtasks, row_errors = loader.load(valid)
+            for line_no, error in row_errors:
+                errors = self.report_error(errors, line_no, error)
+
+            tasks += loaded_tasks
+            subtasks += loaded_subtasks
+            processed += len(batch)
+            # Контрольная точка пишется только после коммита пачки
+            self.write_checkpoint(checkpoint_path, checkpoint, processed)
+
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'  обработано задач: {processed} '
+                f'({(tasks + subtasks) / elapsed if elapsed else 0:.0f} строк/с)'
+            )
+
+        return tasks, subtasks, errors, time.monotonic() - started
+
+    def report_error(self, errors, line_no, error):
+        if errors < MAX_PRINTED_ERRORS:
+            self.stderr.write(self.style.WARNING(f'  строка {line_no}: {error}'))
+        elif errors == MAX_PRINTED_ERRORS:
+            self.stderr.write(self.style.WARNING('  ... остальные ошибки не выводятся'))
+        return errors + 1
+
+    # ==============================================
+    # КОНТРОЛЬНАЯ ТОЧКА
+    # ==============================================
+
+    @staticmethod
+    def read_checkpoint(checkpoint_path, source):
+        source = os.path.abspath(source) if source != '-' else source
+        if not checkpoint_path or not os.path.exists(checkpoint_path):
+            return {'source': source, 'units': 0}
+
+        with open(checkpoint_path, encoding='utf-8') as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+        if checkpoint.get('source') != source:
+            raise CommandError(
+                f'Контрольная точка {checkpoint_path} относится к другому файлу ({checkpoint.get("source")})'
+            )
+        return checkpoint
+
+    @staticmethod
+    def write_checkpoint(checkpoint_path, checkpoint, processed):
+        if not checkpoint_path:
+            return
+        checkpoint['units'] = processed
+        tmp_path = f'{checkpoint_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+        os.replace(tmp_path, checkpoint_path)
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаление истекших OutstandingToken и их BlacklistedToken пачками: каждая пачка - '
+        'короткая транзакция, блокировка на запись не держится на все удаление'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Сколько токенов удалять в одной транзакции')
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help='Пауза между пачками в секундах, чтобы пропускать другие записи')
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--check', action='store_true',
+                            help='Только показать число истекших токенов, ничего не удаляя')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        batch_size = options['batch_size']
+        if batch_size < 1 or options['sleep'] < 0:
+            raise CommandError('--batch-size должен быть положительным, --sleep - неотрицательным')
+
+        now = aware_utcnow()
+        expired = OutstandingToken.objects.using(using).filter(expires_at__lte=now)
+
+        if options['check']:
+            self.stdout.write(
+                f'Истекших токенов: {expired.count()}, '
+                f'из них в blacklist: {BlacklistedToken.objects.using(using).filter(token__in=expired).count()}'
+            )
+            return
+
+        last_id = 0
+        deleted = blacklisted = 0
+
+        # Идем по первичному ключу, без OFFSET и без одного большого DELETE
+        while True:
+            ids = list(
+                expired.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            with transaction.atomic(using=using):
+                blacklisted += BlacklistedToken.objects.using(using).filter(token_id__in=ids).delete()[0]
+                deleted += OutstandingToken.objects.using(using).filter(pk__in=ids).delete()[0]
+
+            last_id = ids[-1]
+            self.stdout.write(f'  удалено токенов: {deleted}')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Удалено истекших токенов: {deleted}, записей blacklist: {blacklisted}'
+        ))
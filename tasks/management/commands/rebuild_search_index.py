@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from tasks.search import ensure_search_index, rebuild_search_index, search_index_supported
+
+
+class Command(BaseCommand):
+    help = 'Создание и полная перестройка полнотекстового индекса (FTS5) задач и подзадач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if not search_index_supported(connection):
+            raise CommandError('Полнотекстовый индекс FTS5 доступен только для SQLite')
+
+        ensure_search_index(connection)
+        tables = rebuild_search_index(connection)
+        self.stdout.write(self.style.SUCCESS(f'✓ Индекс перестроен: {", ".join(tables)}'))
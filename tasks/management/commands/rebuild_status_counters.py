@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.counters import rebuild_status_counters, status_counter_drift
+
+
+class Command(BaseCommand):
+    help = 'Пересборка счетчиков задач по статусам (TaskStatusCounter) и проверка расхождений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--check', action='store_true',
+                            help='Только сравнить счетчики с реальным агрегатом, ничего не меняя')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        drift = status_counter_drift(using=using)
+
+        if drift:
+            self.stdout.write(self.style.WARNING(f'Расхождений в счетчиках: {len(drift)}'))
+            for owner_id, status, stored, actual in drift:
+                scope = f'владелец {owner_id}' if owner_id else 'все задачи'
+                self.stdout.write(f'  {scope}, {status}: в счетчике {stored}, на самом деле {actual}')
+        else:
+            self.stdout.write(self.style.SUCCESS('✓ Счетчики совпадают с данными'))
+
+        if options['check']:
+            if drift:
+                raise CommandError('Счетчики разошлись с данными, запустите команду без --check')
+            return
+
+        rows = rebuild_status_counters(using=using)
+        self.stdout.write(self.style.SUCCESS(f'✓ Счетчики пересобраны, строк: {rows}'))
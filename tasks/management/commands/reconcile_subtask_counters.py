@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from tasks.counters import refresh_subtask_counters, subtask_counter_drift
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Пересчет денормализованных счетчиков подзадач (subtask_count, subtask_done_count) пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Сколько задач пересчитывать в одной транзакции')
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--check', action='store_true',
+                            help='Только показать число задач с расхождениями, ничего не меняя')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        batch_size = options['batch_size']
+
+        if options['check']:
+            drift = subtask_counter_drift(using=using).count()
+            style = self.style.WARNING if drift else self.style.SUCCESS
+            self.stdout.write(style(f'Задач с расхождением счетчиков: {drift}'))
+            return
+
+        last_id = 0
+        processed = 0
+
+        # Идем по первичному ключу, чтобы не держать длинную транзакцию и не делать OFFSET
+        while True:
+            ids = list(
+                Task.objects.using(using)
+                .filter(pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+
+            with transaction.atomic(using=using):
+                refresh_subtask_counters(ids, using=using)
+
+            processed += len(ids)
+            last_id = ids[-1]
+            self.stdout.write(f'  пересчитано задач: {processed}')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Счетчики подзадач пересчитаны для {processed} задач'))
@@ -0,0 +1,39 @@
+import os
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копия базы SQLite для локальной проверки реплик чтения (DB_REPLICAS=путь). '
+        'Копируется через backup API: снимок согласован даже при записи в WAL. '
+        'Реплика не обновляется сама - запустите команду снова, чтобы догнать основную базу'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Файлы реплик')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('sqlite_replica копирует только базу SQLite')
+
+        connection.ensure_connection()
+        for path in options['paths']:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            # Пишем во временный файл: читатели старой копии не видят наполовину записанную
+            tmp_path = f'{path}.tmp'
+            started = time.perf_counter()
+            target = sqlite3.connect(tmp_path)
+            try:
+                connection.connection.backup(target)
+            finally:
+                target.close()
+            os.replace(tmp_path, path)
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Реплика {path}: {os.path.getsize(path)} байт за {time.perf_counter() - started:.2f} с'
+            ))
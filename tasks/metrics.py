@@ -0,0 +1,269 @@
+import json
+import math
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Описание метрик: имя -> (тип, help, границы корзин для гистограмм)
+METRICS = {
+    'http_requests_total': ('counter', 'HTTP-запросы по представлению, методу и статусу', None),
+    'http_request_duration_seconds': ('histogram', 'Время обработки запроса', LATENCY_BUCKETS),
+    'http_request_db_queries': ('histogram', 'SQL-запросов на один HTTP-запрос', QUERY_COUNT_BUCKETS),
+    'db_queries_total': ('counter', 'SQL-запросы, выполненные при обработке запросов', None),
+    'db_query_duration_seconds_total': ('counter', 'Суммарное время SQL-запросов', None),
+    'render_duration_seconds': ('histogram', 'Время рендеринга ответа DRF (JSON)', LATENCY_BUCKETS),
+    'response_cache_requests_total': ('counter', 'Обращения к кэшу ответов (result: hit/miss)', None),
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class RequestStats:
+    """Наблюдения одного запроса; пишутся без блокировок, в реестр попадают разом в конце"""
+    __slots__ = ('queries', 'query_seconds', 'render_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.render_seconds = None
+
+
+# Наблюдения текущего запроса (выставляет MetricsMiddleware)
+current_stats = ContextVar('current_request_stats', default=None)
+
+
+# ==============================================
+# РЕЕСТР
+# ==============================================
+
+class Registry:
+    """
+    Счетчики и гистограммы процесса. Запрос берет блокировку один раз - в observe_request.
+    Для нескольких воркеров каждый процесс раз в METRICS_FLUSH_INTERVAL секунд сбрасывает снимок
+    в METRICS_DIR/metrics-<pid>.json (атомарно через os.replace); /metrics складывает снимки
+    всех процессов хоста. Файлы завершившихся процессов удаляются при сборе: после перезапуска
+    счетчики начинаются заново (для Prometheus это обычный сброс счетчика)
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.last_dump = time.monotonic()
+
+    def _inc(self, name, labels, value=1):
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def _observe(self, name, labels, value):
+        key = (name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            # корзины, +Inf, sum, count; корзины не накопительные - сумма считается при экспорте
+            histogram = self.histograms[key] = [0] * (len(METRICS[name][2]) + 3)
+        buckets = METRICS[name][2]
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                histogram[index] += 1
+                break
+        else:
+            histogram[len(buckets)] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+    def inc(self, name, labels, value=1):
+        with self.lock:
+            self._inc(name, labels, value)
+
+    def observe_request(self, view, method, status, duration, stats):
+        labels = (('view', view), ('method', method))
+        with self.lock:
+            self._inc('http_requests_total', labels + (('status', str(status)),))
+            self._observe('http_request_duration_seconds', labels, duration)
+            self._observe('http_request_db_queries', labels, stats.queries)
+            self._inc('db_queries_total', labels, stats.queries)
+            self._inc('db_query_duration_seconds_total', labels, stats.query_seconds)
+            if stats.render_seconds is not None:
+                self._observe('render_duration_seconds', labels, stats.render_seconds)
+            dump = time.monotonic() - self.last_dump >= get_flush_interval()
+            if dump:
+                self.last_dump = time.monotonic()
+        if dump:
+            self.dump()
+
+    # Снимки
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [[name, dict(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, dict(labels), list(values)]
+                               for (name, labels), values in self.histograms.items()],
+            }
+
+    def dump(self):
+        directory = get_metrics_dir()
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as snapshot_file:
+            json.dump(self.snapshot(), snapshot_file)
+        os.replace(tmp_path, path)
+
+    def collect(self):
+        """Снимки всех процессов хоста (свой - актуальный), сложенные по метрикам и меткам"""
+        snapshots = {os.getpid(): self.snapshot()}
+        directory = get_metrics_dir()
+        if directory and os.path.isdir(directory):
+            for filename in os.listdir(directory):
+                if not (filename.startswith('metrics-') and filename.endswith('.json')):
+                    continue
+                try:
+                    pid = int(filename[len('metrics-'):-len('.json')])
+                except ValueError:
+                    continue
+                if pid in snapshots:
+                    continue
+                path = os.path.join(directory, filename)
+                if not process_alive(pid):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                try:
+                    with open(path, encoding='utf-8') as snapshot_file:
+                        snapshots[pid] = json.load(snapshot_file)
+                except (OSError, ValueError):
+                    continue
+
+        counters, histograms = {}, {}
+        for snapshot in snapshots.values():
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(sorted(labels.items())))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, values in snapshot['histograms']:
+                key = (name, tuple(sorted(labels.items())))
+                merged = histograms.setdefault(key, [0] * len(values))
+                for index, value in enumerate(values):
+                    merged[index] += value
+        return counters, histograms
+
+
+registry = Registry()
+
+
+def get_metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None)
+
+
+def get_flush_interval():
+    return getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+
+
+def process_alive(pid):
+    """Жив ли процесс с этим PID (сигнал 0 ничего не посылает, только проверяет)"""
+    if os.name == 'nt':
+        # os.kill на Windows завершает процесс - проверки нет, снимки удаляются вручную
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но чужой - PID занят не воркером; его снимок тоже устарел
+        return False
+    return True
+
+
+# ==============================================
+# ИСТОЧНИКИ НАБЛЮДЕНИЙ
+# ==============================================
+
+def count_query(execute, sql, params, many, context):
+    """Execute wrapper: число и время SQL-запросов текущего HTTP-запроса"""
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_seconds += time.perf_counter() - started
+
+
+def install_query_counter(sender, connection, **kwargs):
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer, который отдает время рендеринга в метрики запроса"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        started = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            stats = current_stats.get()
+            if stats is not None:
+                stats.render_seconds = (stats.render_seconds or 0) + time.perf_counter() - started
+
+
+# ==============================================
+# ЭКСПОРТ В ФОРМАТЕ PROMETHEUS
+# ==============================================
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for key, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(counters, histograms):
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+            continue
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + (math.inf,), values):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, [("le", _number(bound))])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(values[-2])}')
+            lines.append(f'{name}_count{_labels(labels)} {values[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """GET /metrics - метрики всех воркеров хоста в текстовом формате Prometheus"""
+    return HttpResponse(render_prometheus(*registry.collect()), content_type=CONTENT_TYPE)
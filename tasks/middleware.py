@@ -1,6 +1,10 @@
 import logging
 import time
-from django.utils.deprecation import MiddlewareMixin
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .metrics import RequestStats, current_stats, registry
+from .sql_monitor import current_view
 
 # Получаем логгер для HTTP запросов
 http_logger = logging.getLogger('django.request')
@@ -8,21 +12,82 @@ http_logger = logging.getLogger('django.request')
 app_logger = logging.getLogger('tasks')
 
 
-class RequestLoggingMiddleware(MiddlewareMixin):
+class HookMiddleware:
+    """
+    Основа middleware проекта: хуки process_request/process_response, как у MiddlewareMixin,
+    но под ASGI без переходов в поток. MiddlewareMixin в асинхронной цепочке вызывает каждый хук
+    через sync_to_async(thread_sensitive=True) - запрос к /api/async/ несколько раз проходил
+    бы через общий синхронный поток. Хуки без ввода-вывода вызываются прямо из корутины;
+    хуки, которым нужны кэш или база, переопределяют aprocess_request/aprocess_response
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.process_request(request)
+        if response is None:
+            response = self.get_response(request)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        response = await self.aprocess_request(request)
+        if response is None:
+            response = await self.get_response(request)
+        return await self.aprocess_response(request, response)
+
+    def process_request(self, request):
+        return None
+
+    def process_response(self, request, response):
+        return response
+
+    async def aprocess_request(self, request):
+        return self.process_request(request)
+
+    async def aprocess_response(self, request, response):
+        return self.process_response(request, response)
+
+
+class RequestLoggingMiddleware(HookMiddleware):
     """
-    Middleware для детального логирования HTTP запросов
+    Middleware для детального логирования HTTP запросов.
+    Сообщения передаются с аргументами, а не готовой строкой: форматирование и запись
+    выполняет фоновый поток обработчиков tasks.log_pipeline, запрос платит только за постановку в очередь
     """
 
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if self.async_mode:
+            # Обработчик берет process_view с экземпляра: корутину он вызывает без перехода в поток
+            self.process_view = self.aprocess_view
+
     def process_request(self, request):
         """Засекаем время начала обработки запроса"""
-        request.start_time = time.time()
+        request.start_time = time.monotonic()
         return None
 
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """Запоминаем представление: монитор SQL пишет его в записи о медленных запросах"""
+        match = request.resolver_match
+        current_view.set(match.view_name if match else request.path)
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return RequestLoggingMiddleware.process_view(self, request, view_func, view_args, view_kwargs)
+
     def process_response(self, request, response):
         """Логируем информацию о запросе и ответе"""
         # Вычисляем время выполнения
         if hasattr(request, 'start_time'):
-            duration = time.time() - request.start_time
+            duration = time.monotonic() - request.start_time
         else:
             duration = 0
 
@@ -38,20 +103,54 @@ class RequestLoggingMiddleware(MiddlewareMixin):
 
         # Логируем в HTTP логгер
         http_logger.info(
-            f"{request.method} {request.path} {response.status_code} {duration}s",
+            '%s %s %s %.4fs', request.method, request.path, response.status_code, duration,
             extra=log_data
         )
 
+        # Не reset(token): под ASGI process_view и process_response работают в разных контекстах
+        current_view.set(None)
+
         # Логируем в логгер приложения для дополнительной информации
         if response.status_code >= 400:
-            app_logger.warning(f"HTTP Error {response.status_code}: {request.method} {request.path}")
+            app_logger.warning(
+                'HTTP Error %s: %s %s', response.status_code, request.method, request.path,
+                extra=log_data
+            )
 
         return response
 
     def process_exception(self, request, exception):
         """Логируем исключения"""
         app_logger.error(
-            f"Exception in {request.method} {request.path}: {str(exception)}",
+            'Exception in %s %s: %s', request.method, request.path, exception,
             exc_info=True
         )
-        return None
\ No newline at end of file
+        return None
+
+
+class MetricsMiddleware(HookMiddleware):
+    """
+    Метрики запросов для /metrics: время по представлению и методу, статусы,
+    число и время SQL-запросов, время рендеринга ответа. Наблюдения копятся в RequestStats
+    запроса и попадают в реестр одной операцией в process_response
+    """
+
+    def process_request(self, request):
+        request.metrics_start = time.monotonic()
+        request.metrics_stats = RequestStats()
+        current_stats.set(request.metrics_stats)
+        return None
+
+    def process_response(self, request, response):
+        stats = getattr(request, 'metrics_stats', None)
+        if stats is None:
+            return response
+        current_stats.set(None)
+
+        # Метка - имя маршрута, а не путь: число рядов не растет с числом id
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match._func_path) if match else 'unresolved'
+        registry.observe_request(
+            view, request.method, response.status_code, time.monotonic() - request.metrics_start, stats
+        )
+        return response
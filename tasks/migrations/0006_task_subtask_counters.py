@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:39
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_subtask_counters(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    SubTask = apps.get_model('tasks', 'SubTask')
+    db_alias = schema_editor.connection.alias
+
+    def count_subquery(**filters):
+        counts = (
+            SubTask.objects.using(db_alias).filter(task=OuterRef('pk'), **filters)
+            .order_by().values('task').annotate(total=Count('pk')).values('total')
+        )
+        return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+    Task.objects.using(db_alias).update(
+        subtask_count=count_subquery(),
+        subtask_done_count=count_subquery(status='done'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_task_subtask_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='subtask_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='subtask_done_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_subtask_counters, migrations.RunPython.noop),
+    ]
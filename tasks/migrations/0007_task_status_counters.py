@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_status_counters(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    TaskStatusCounter = apps.get_model('tasks', 'TaskStatusCounter')
+    db_alias = schema_editor.connection.alias
+
+    totals = {status: 0 for status, _ in Task._meta.get_field('status').choices}
+    counters = []
+    rows = Task.objects.using(db_alias).order_by().values_list('owner_id', 'status').annotate(total=Count('pk'))
+    for owner_id, status, total in rows:
+        counters.append(TaskStatusCounter(owner_id=owner_id, status=status, count=total))
+        totals[status] = totals.get(status, 0) + total
+    counters.extend(TaskStatusCounter(owner_id=None, status=status, count=total) for status, total in totals.items())
+    TaskStatusCounter.objects.using(db_alias).bulk_create(counters, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_task_subtask_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('new', 'New'), ('in_progress', 'In Progress'), ('pending', 'Pending'), ('blocked', 'Blocked'), ('done', 'Done')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Task status counter',
+                'verbose_name_plural': 'Task status counters',
+                'db_table': 'task_manager_status_counter',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['owner', 'deadline'], name='task_owner_deadline_idx'),
+        ),
+        migrations.AddField(
+            model_name='taskstatuscounter',
+            name='owner',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='task_status_counters', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='taskstatuscounter',
+            constraint=models.UniqueConstraint(condition=models.Q(('owner__isnull', False)), fields=('owner', 'status'), name='status_counter_owner_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='taskstatuscounter',
+            constraint=models.UniqueConstraint(condition=models.Q(('owner__isnull', True)), fields=('status',), name='status_counter_global_uniq'),
+        ),
+        migrations.RunPython(backfill_status_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+# Выражение поиска - то же, что PG_SEARCH_VECTOR в tasks/search.py
+SEARCH_VECTOR = (
+    "(setweight(to_tsvector('simple'::regconfig, title), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, description), 'B'))"
+)
+
+POSTGRES_INDEXES = [
+    # Полнотекстовый поиск (FullTextSearchFilter)
+    ('task_search_gin_idx', 'task_manager_task', f'USING gin ({SEARCH_VECTOR})'),
+    ('subtask_search_gin_idx', 'task_manager_subtask', f'USING gin ({SEARCH_VECTOR})'),
+    # Keyset-пагинация по deadline идет NULLS FIRST по возрастанию (NULLS LAST по убыванию),
+    # а B-tree PostgreSQL по умолчанию хранит NULL в конце - индекс в нужном порядке
+    # читается в обе стороны без сортировки
+    ('task_deadline_keyset_idx', 'task_manager_task', '(deadline ASC NULLS FIRST, id)'),
+    ('subtask_deadline_keyset_idx', 'task_manager_subtask', '(deadline ASC NULLS FIRST, id)'),
+    # Частичный индекс для просроченных задач (TaskStatsAPIView): задачи без срока не попадают
+    ('task_overdue_idx', 'task_manager_task', '(owner_id, deadline) WHERE deadline IS NOT NULL'),
+]
+
+
+def create_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, definition in POSTGRES_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} {definition}')
+
+
+def drop_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _table, _definition in POSTGRES_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_postgres_indexes, drop_postgres_indexes),
+    ]
@@ -1,10 +1,67 @@
-from django.db import models
+from collections import Counter
+
+from django.db import models, router, transaction
+from django.db.models.functions import Lower
 from django.utils import timezone
 from django.contrib.auth.models import User
 
 
+# Базовая модель с временем последнего изменения строки (ETag/Last-Modified, tasks/conditional.py)
+class TimestampedModel(models.Model):
+    """
+    updated_at меняется при любой записи строки: save() - в том числе с update_fields,
+    QuerySet.update() и bulk_update() - через TimestampedQuerySet
+    """
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields and 'updated_at' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'updated_at']
+        super().save(*args, **kwargs)
+
+    class Meta:
+        abstract = True
+
+
+class TimestampedQuerySet(models.QuerySet):
+    """
+    Массовые операции, которые обходят save() и сигналы: ставят updated_at
+    и сбрасывают кэш ответов по модели (tasks/response_cache.py)
+    """
+
+    def _write_db(self):
+        return self._db or router.db_for_write(self.model, **self._hints)
+
+    def update(self, **kwargs):
+        from .response_cache import invalidate
+
+        # auto_now срабатывает только в save(); bulk_update тоже приходит сюда
+        kwargs.setdefault('updated_at', timezone.now())
+        rows = super().update(**kwargs)
+        invalidate(self.model, using=self._write_db())
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .response_cache import invalidate
+
+        objs = super().bulk_create(objs, *args, **kwargs)
+        invalidate(self.model, using=self._write_db())
+        return objs
+
+    def delete(self):
+        from .response_cache import cascade_models, invalidate
+
+        result = super().delete()
+        invalidate(*cascade_models(self.model), using=self._write_db())
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 # Менеджер для мягкого удаления
-class SoftDeleteManager(models.Manager):
+class SoftDeleteManager(models.Manager.from_queryset(TimestampedQuerySet)):
     def get_queryset(self):
         return super().get_queryset().filter(is_deleted=False)
 
@@ -16,14 +73,14 @@ class SoftDeleteManager(models.Manager):
 
 
 # Модель Category
-class Category(models.Model):
+class Category(TimestampedModel):
     name = models.CharField(max_length=100, unique=True)
     is_deleted = models.BooleanField(default=False)
     deleted_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     objects = SoftDeleteManager()
-    all_objects = models.Manager()
+    all_objects = TimestampedQuerySet.as_manager()
 
     def __str__(self):
         return self.name
@@ -44,8 +101,131 @@ class Category(models.Model):
         verbose_name_plural = 'Categories'
 
 
+# Базовая модель для записей, от которых зависят счетчики
+class CounterTrackedModel(TimestampedModel):
+    """
+    Запоминает значения, загруженные из базы (сигналы видят смену статуса/владельца),
+    и сохраняет запись в транзакции - счетчики обновляются в post_save атомарно с ней
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+    class Meta:
+        abstract = True
+
+
+class CounterQuerySet(TimestampedQuerySet):
+    """Базовый QuerySet моделей со счетчиками (TaskQuerySet, SubTaskQuerySet)"""
+
+
+# QuerySet задач: массовые операции поддерживают счетчики статусов
+class TaskQuerySet(CounterQuerySet):
+    counter_fields = {'status', 'owner', 'owner_id'}
+
+    def update(self, **kwargs):
+        if not self.counter_fields & kwargs.keys():
+            return super().update(**kwargs)
+
+        from .counters import apply_status_deltas, count_by_owner_and_status
+
+        using = self._write_db()
+        with transaction.atomic(using=using, savepoint=False):
+            pks = list(self.using(using).values_list('pk', flat=True))
+            before = count_by_owner_and_status(pks, using=using)
+            rows = super().update(**kwargs)
+            deltas = count_by_owner_and_status(pks, using=using)
+            deltas.subtract(before)
+            apply_status_deltas(deltas, using=using)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .counters import apply_status_deltas
+
+        using = self._write_db()
+        with transaction.atomic(using=using, savepoint=False):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            apply_status_deltas(Counter((obj.owner_id, obj.status) for obj in objs), using=using)
+        return objs
+
+    def delete(self):
+        from .counters import apply_status_deltas, count_by_owner_and_status
+
+        # Считаем удаляемые задачи одним агрегатом; post_delete для них счетчики не трогает
+        using = self._write_db()
+        with transaction.atomic(using=using, savepoint=False):
+            pks = list(self.using(using).values_list('pk', flat=True))
+            deltas = count_by_owner_and_status(pks, using=using)
+            result = super().delete()
+            apply_status_deltas({key: -count for key, count in deltas.items()}, using=using)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+# QuerySet подзадач: массовые операции поддерживают счетчики подзадач у задач
+class SubTaskQuerySet(CounterQuerySet):
+    counter_fields = {'status', 'task', 'task_id'}
+
+    def update(self, **kwargs):
+        if not self.counter_fields & kwargs.keys():
+            return super().update(**kwargs)
+
+        from .counters import refresh_subtask_counters
+
+        using = self._write_db()
+        with transaction.atomic(using=using, savepoint=False):
+            task_ids = set(self.using(using).values_list('task_id', flat=True))
+            rows = super().update(**kwargs)
+            new_task = kwargs.get('task', kwargs.get('task_id'))
+            if new_task is not None:
+                task_ids.add(getattr(new_task, 'pk', new_task))
+            refresh_subtask_counters(task_ids, using=using)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .counters import refresh_subtask_counters
+
+        using = self._write_db()
+        with transaction.atomic(using=using, savepoint=False):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            refresh_subtask_counters({obj.task_id for obj in objs}, using=using)
+        return objs
+
+    def delete(self):
+        from .counters import refresh_subtask_counters
+
+        # Счетчики затронутых задач пересчитываются один раз; post_delete их не трогает
+        using = self._write_db()
+        with transaction.atomic(using=using, savepoint=False):
+            task_ids = set(self.using(using).values_list('task_id', flat=True))
+            result = super().delete()
+            refresh_subtask_counters(task_ids, using=using)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 # Модель Task
-class Task(models.Model):
+class Task(CounterTrackedModel):
     STATUS_CHOICES = [
         ('new', 'New'),
         ('in_progress', 'In Progress'),
@@ -59,7 +239,8 @@ class Task(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='tasks',
-        verbose_name='Владелец'
+        verbose_name='Владелец',
+        db_index=False,  # покрывается составным индексом (owner, -created_at)
     )
 
     title = models.CharField(max_length=200)
@@ -69,6 +250,12 @@ class Task(models.Model):
     deadline = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Денормализованные счетчики подзадач (поддерживаются в tasks/signals.py и SubTaskQuerySet)
+    subtask_count = models.PositiveIntegerField(default=0, editable=False)
+    subtask_done_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = TaskQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
@@ -78,10 +265,21 @@ class Task(models.Model):
         verbose_name = 'Task'
         verbose_name_plural = 'Tasks'
         # Убираем unique=True из title, так теперь задачи могут быть с одинаковыми названиями у разных пользователей
+        # Индексы под фильтры и сортировки списков задач (TaskListCreateView, MyTasksView);
+        # id в конце - тай-брейкер keyset-пагинации, сортировка целиком идет по индексу
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='task_created_idx'),
+            models.Index(fields=['owner', '-created_at', '-id'], name='task_owner_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='task_status_created_idx'),
+            models.Index(fields=['status', 'deadline'], name='task_status_deadline_idx'),
+            models.Index(fields=['deadline'], name='task_deadline_idx'),
+            models.Index(fields=['owner', 'deadline'], name='task_owner_deadline_idx'),
+            models.Index(Lower('title'), name='task_title_lower_idx'),
+        ]
 
 
 # Модель SubTask
-class SubTask(models.Model):
+class SubTask(CounterTrackedModel):
     STATUS_CHOICES = [
         ('new', 'New'),
         ('in_progress', 'In Progress'),
@@ -95,16 +293,24 @@ class SubTask(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='subtasks',
-        verbose_name='Владелец'
+        verbose_name='Владелец',
+        db_index=False,  # покрывается составным индексом (owner, -created_at)
     )
 
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
-    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='subtasks')
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        related_name='subtasks',
+        db_index=False,  # покрывается составным индексом (task, -created_at)
+    )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='new')
     deadline = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = SubTaskQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.title} (задача: {self.task.title})"
 
@@ -112,4 +318,50 @@ class SubTask(models.Model):
         db_table = 'task_manager_subtask'
         ordering = ['-created_at']
         verbose_name = 'SubTask'
-        verbose_name_plural = 'SubTasks'
\ No newline at end of file
+        verbose_name_plural = 'SubTasks'
+        # Индексы под фильтры и сортировки списка подзадач (SubTaskListCreateView);
+        # id в конце - тай-брейкер keyset-пагинации
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='subtask_created_idx'),
+            models.Index(fields=['task', '-created_at', '-id'], name='subtask_task_created_idx'),
+            models.Index(fields=['owner', '-created_at', '-id'], name='subtask_owner_created_idx'),
+            models.Index(fields=['status', '-created_at', '-id'], name='subtask_status_created_idx'),
+            models.Index(fields=['status', 'deadline'], name='subtask_status_deadline_idx'),
+            models.Index(fields=['deadline'], name='subtask_deadline_idx'),
+            models.Index(Lower('title'), name='subtask_title_lower_idx'),
+        ]
+
+
+# Счетчики задач по статусам (общие и по владельцам) для TaskStatsAPIView
+class TaskStatusCounter(models.Model):
+    # owner = NULL - общий счетчик по всем задачам
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='task_status_counters',
+        db_index=False,  # покрывается уникальным индексом (owner, status)
+    )
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.owner_id or 'all'}:{self.status}={self.count}"
+
+    class Meta:
+        db_table = 'task_manager_status_counter'
+        verbose_name = 'Task status counter'
+        verbose_name_plural = 'Task status counters'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['owner', 'status'],
+                condition=models.Q(owner__isnull=False),
+                name='status_counter_owner_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['status'],
+                condition=models.Q(owner__isnull=True),
+                name='status_counter_global_uniq',
+            ),
+        ]
@@ -1,4 +1,18 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from django.db.models.functions import Lower
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .filters import CaseInsensitiveOrderingFilter
+from .search import FullTextSearchFilter
 
 
 class SafePageNumberPagination(PageNumberPagination):
@@ -29,4 +43,250 @@ class CursorPaginationSafe(CursorPagination):
 
     # Отключаем параметры в URL
     page_size_query_param = None
-    max_page_size = 6
\ No newline at end of file
+    max_page_size = 6
+
+
+class CustomPagination(PageNumberPagination):
+    """
+    Постраничная пагинация со счетчиком (COUNT(*) на каждой странице)
+    """
+    page_size = 5
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.page.paginator.count,
+            'total_pages': self.page.paginator.num_pages,
+            'current_page': self.page.number,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        })
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_scalar(value):
+    return isinstance(value, (str, int, float)) and not isinstance(value, bool)
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset-пагинация: страница выбирается условием WHERE (поле, id) < (значение, id)
+    по индексу, без OFFSET и без COUNT(*).
+    Работает с любым полем из ordering_fields представления (?ordering=), id - тай-брейкер.
+    NULL считается наименьшим значением (как в индексах SQLite).
+    Старый постраничный режим: ?pagination=page или ?page=N
+    """
+    page_size = 5
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-created_at'
+    ordering_param = 'ordering'
+    mode_query_param = 'pagination'
+    legacy_mode = 'page'
+    legacy_pagination_class = CustomPagination
+    keyset_alias = 'keyset_value'
+
+    def use_legacy(self, request):
+        legacy = self.legacy_pagination_class
+        return (
+            request.query_params.get(self.mode_query_param) == self.legacy_mode
+            or legacy.page_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.legacy = None
+        if self.use_legacy(request):
+            self.legacy = self.legacy_pagination_class()
+            return self.legacy.paginate_queryset(queryset, request, view)
+        return self.build_page(list(self.get_window(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset для асинхронных представлений: строки читаются через aiterator"""
+        self.legacy = None
+        if self.use_legacy(request):
+            # Постраничному режиму нужен синхронный Paginator.count - он идет в потоке
+            self.legacy = self.legacy_pagination_class()
+            return await sync_to_async(self.legacy.paginate_queryset)(queryset, request, view)
+        window = self.get_window(queryset, request, view)
+        return self.build_page([obj async for obj in window.aiterator()])
+
+    def get_window(self, queryset, request, view):
+        """Разбирает курсор и возвращает срез queryset: страница и еще одна строка"""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+        self.reverse = False
+
+        # Поиск без явной сортировки упорядочен по релевантности - листаем смещением
+        if self.is_ranked_search(queryset, request):
+            self.field = None
+            self.offset = min(self.cursor.get('o', 0), self.offset_cutoff) if self.cursor else 0
+            return queryset[self.offset:self.offset + self.page_size + 1]
+
+        self.field = self.get_ordering_field(request, view)
+        self.descending = self.field.startswith('-')
+        name = self.field.lstrip('-')
+        self.model_field = queryset.model._meta.get_field(name)
+        self.nullable = self.model_field.null
+        self.is_datetime = self.model_field.get_internal_type() == 'DateTimeField'
+
+        if name in CaseInsensitiveOrderingFilter.case_insensitive_fields:
+            expression = Lower(name)
+        else:
+            expression = F(name)
+        queryset = queryset.annotate(**{self.keyset_alias: expression})
+
+        self.reverse = bool(self.cursor and self.cursor.get('r'))
+        # Назад листаем в обратном порядке и разворачиваем результат
+        descending = self.descending != self.reverse
+        if self.cursor:
+            if 'k' not in self.cursor:
+                # Курсор поиска по релевантности ({"o": ...}) к обычной сортировке не подходит
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(self.after(self.decode_value(self.cursor.get('v')), self.cursor['k'], descending))
+        return queryset.order_by(*self.order_by(descending))[:self.page_size + 1]
+
+    def build_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.field is None:
+            self.has_next, self.has_previous = has_more, self.offset > 0
+        elif self.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        return self.page
+
+    # ---------- порядок и условие keyset ----------
+
+    def get_ordering_field(self, request, view):
+        allowed = getattr(view, 'ordering_fields', None) or []
+        param = request.query_params.get(self.ordering_param, '')
+        for field in param.split(','):
+            field = field.strip()
+            if field and field.lstrip('-') in allowed:
+                return field
+
+        default = getattr(view, 'ordering', None) or self.ordering
+        if isinstance(default, (list, tuple)):
+            default = default[0]
+        return default
+
+    def order_by(self, descending):
+        value = F(self.keyset_alias)
+        if descending:
+            return [value.desc(nulls_last=True) if self.nullable else value.desc(), '-pk']
+        return [value.asc(nulls_first=True) if self.nullable else value.asc(), 'pk']
+
+    def after(self, value, pk, descending):
+        """Q для строк, идущих строго после (value, pk) в заданном направлении"""
+        alias = self.keyset_alias
+        beyond, pk_beyond = ('lt', 'lt') if descending else ('gt', 'gt')
+
+        if value is None:
+            condition = Q(**{f'{alias}__isnull': True, f'pk__{pk_beyond}': pk})
+            if not descending:
+                condition |= Q(**{f'{alias}__isnull': False})
+            return condition
+
+        condition = Q(**{f'{alias}__{beyond}': value}) | Q(**{alias: value, f'pk__{pk_beyond}': pk})
+        if descending and self.nullable:
+            condition |= Q(**{f'{alias}__isnull': True})
+        return condition
+
+    # ---------- поиск по релевантности ----------
+
+    def is_ranked_search(self, queryset, request):
+        return (
+            FullTextSearchFilter.rank_alias in queryset.query.extra_select
+            and not request.query_params.get(self.ordering_param)
+        )
+
+    # ---------- курсор ----------
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(cursor, dict) or ('k' not in cursor and 'o' not in cursor):
+            raise NotFound(self.invalid_cursor_message)
+        # Курсор приходит от клиента: неверные типы должны давать 404, а не 500 из ORM
+        valid = (
+            ('k' not in cursor or _is_int(cursor['k']))
+            and ('o' not in cursor or (_is_int(cursor['o']) and cursor['o'] >= 0))
+            # r - флаг направления: ссылки "назад" выдаются с r=1
+            and ('r' not in cursor or (isinstance(cursor['r'], int) and cursor['r'] in (0, 1)))
+            and ('v' not in cursor or cursor['v'] is None or _is_scalar(cursor['v']))
+        )
+        if not valid:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def decode_value(self, value):
+        """Значение курсора в тип поля сортировки; не подходит - курсор неверный"""
+        if value is None:
+            return None
+        try:
+            if self.is_datetime:
+                value = parse_datetime(value)
+                if value is None:
+                    raise ValueError(value)
+                return value
+            return self.model_field.to_python(value)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_value(self, value):
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    def build_link(self, cursor):
+        encoded = urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode()).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.legacy:
+            return self.legacy.get_next_link()
+        if not self.has_next:
+            return None
+        if self.field is None:
+            return self.build_link({'o': self.offset + self.page_size})
+        last = self.page[-1]
+        return self.build_link({'v': self.encode_value(getattr(last, self.keyset_alias)), 'k': last.pk})
+
+    def get_previous_link(self):
+        if self.legacy:
+            return self.legacy.get_previous_link()
+        if not self.has_previous:
+            return None
+        if self.field is None:
+            return self.build_link({'o': max(self.offset - self.page_size, 0)})
+        if not self.page:
+            return None
+        first = self.page[0]
+        return self.build_link({'v': self.encode_value(getattr(first, self.keyset_alias)), 'k': first.pk, 'r': 1})
+
+    def get_paginated_response(self, data):
+        if self.legacy:
+            return self.legacy.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.legacy:
+            return self.legacy.get_html_context()
+        return super().get_html_context()
+
+    def to_html(self):
+        if self.legacy:
+            return self.legacy.to_html()
+        return super().to_html()
@@ -12,8 +12,8 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
 
-        # Для остальных методов проверяем, что пользователь - владелец
-        return obj.owner == request.user
+        # Для остальных методов проверяем, что пользователь - владелец (по id, без запроса за owner)
+        return obj.owner_id == request.user.id
 
 
 class IsTaskOwner(permissions.BasePermission):
@@ -22,7 +22,7 @@ class IsTaskOwner(permissions.BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
-        return obj.owner == request.user
+        return obj.owner_id == request.user.id
 
 
 class IsSubTaskOwner(permissions.BasePermission):
@@ -31,4 +31,4 @@ class IsSubTaskOwner(permissions.BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
-        return obj.owner == request.user
\ No newline at end of file
+        return obj.owner_id == request.user.id
\ No newline at end of file
@@ -0,0 +1,195 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from .db_router import areplica_may_be_stale, replica_may_be_stale
+from .metrics import registry
+
+# Методы, ответы на которые кэшируются
+CACHE_METHODS = ('GET', 'HEAD')
+# Заголовки ответа, которые хранятся вместе с данными (валидаторы из tasks/conditional.py)
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+
+def get_config():
+    return {
+        'enabled': getattr(settings, 'RESPONSE_CACHE_ENABLED', False),
+        'alias': getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default'),
+        'ttl': getattr(settings, 'RESPONSE_CACHE_TTL', 300),
+    }
+
+
+def get_cache():
+    return caches[get_config()['alias']]
+
+
+# ==============================================
+# ПОКОЛЕНИЯ МОДЕЛЕЙ
+# ==============================================
+# У каждой модели в кэше лежит счетчик поколения; он входит в ключ ответа.
+# Запись в модель увеличивает счетчик - старые ответы больше не находятся по ключу
+# и вытесняются из кэша по TTL. Счетчик без срока жизни; если его вытеснили,
+# он заводится заново значением time_ns(), которое не совпадет ни с одним прежним
+
+def _generation_key(model):
+    return f'response-cache:generation:{model._meta.label_lower}'
+
+
+def get_generations(cache_models):
+    cache = get_cache()
+    keys = [_generation_key(model) for model in cache_models]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), timeout=None)
+            generations[key] = cache.get(key)
+    return tuple(generations[key] for key in keys)
+
+
+async def aget_generations(cache_models):
+    cache = get_cache()
+    keys = [_generation_key(model) for model in cache_models]
+    generations = await cache.aget_many(keys)
+    for key in keys:
+        if key not in generations:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+            generations[key] = await cache.aget(key)
+    return tuple(generations[key] for key in keys)
+
+
+def bump_generations(cache_models):
+    cache = get_cache()
+    for model in cache_models:
+        key = _generation_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def cascade_models(model):
+    """Модель и модели, строки которых удаляются вместе с ее строками (on_delete=CASCADE)"""
+    found = [model]
+    for current in found:
+        for relation in current._meta.related_objects:
+            if relation.on_delete is models.CASCADE and relation.related_model not in found:
+                found.append(relation.related_model)
+    return found
+
+
+def invalidate(*cache_models, using=None):
+    """
+    Сбрасывает кэш ответов по моделям. Поколение увеличивается сразу и еще раз после
+    коммита: ответ, закэшированный параллельным запросом до коммита (со старыми данными),
+    не переживет коммит
+    """
+    if not get_config()['enabled']:
+        return
+    bump_generations(cache_models)
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(lambda: bump_generations(cache_models), using=using)
+
+
+# ==============================================
+# МИКСИН ДЛЯ ПРЕДСТАВЛЕНИЙ
+# ==============================================
+
+class CachedResponseMixin:
+    """
+    Кэш ответов list/retrieve для анонимных GET. Ключ - представление, хост, путь,
+    нормализованные параметры (отсортированы, пустые отброшены), формат ответа
+    и поколения cache_models. Хранятся response.data, статус и валидаторы;
+    попадания и промахи идут в метрику response_cache_requests_total.
+    Ответ, прочитанный с реплики сразу после записи, не кэшируется (replica_may_be_stale)
+    """
+    cache_models = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def is_cacheable(self, request):
+        return (
+            get_config()['enabled']
+            and request.method in CACHE_METHODS
+            and not request.user.is_authenticated
+        )
+
+    def get_cache_key(self, request, action, generations=None):
+        query = sorted(
+            (key, value) for key in request.GET for value in request.GET.getlist(key) if value != ''
+        )
+        if generations is None:
+            generations = get_generations(self.cache_models)
+        parts = (
+            type(self).__qualname__, action, request.get_host(), request.path, query,
+            request.accepted_renderer.format, generations,
+        )
+        return 'response-cache:' + hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = self.get_cache_key(request, handler.__name__)
+        cached = cache.get(key)
+        if cached is not None:
+            return self.response_from_cache(request, cached)
+
+        response = handler(request, *args, **kwargs)
+        entry = self.cache_entry(request, response)
+        if entry is not None and not replica_may_be_stale():
+            cache.set(key, entry, get_config()['ttl'])
+        return response
+
+    async def acached_response(self, handler, request, *args, **kwargs):
+        """cached_response для асинхронных представлений (tasks/async_views.py): handler - корутина"""
+        if not self.is_cacheable(request):
+            return await handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = self.get_cache_key(request, handler.__name__, await aget_generations(self.cache_models))
+        cached = await cache.aget(key)
+        if cached is not None:
+            return self.response_from_cache(request, cached)
+
+        response = await handler(request, *args, **kwargs)
+        entry = self.cache_entry(request, response)
+        if entry is not None and not await areplica_may_be_stale():
+            await cache.aset(key, entry, get_config()['ttl'])
+        return response
+
+    def _count(self, request, result):
+        view = request.resolver_match.view_name if request.resolver_match else type(self).__name__
+        registry.inc('response_cache_requests_total', (('view', view), ('result', result)))
+
+    def cache_entry(self, request, response):
+        """Промах: помечает ответ и возвращает запись для кэша (None - ответ не кэшируется)"""
+        self._count(request, 'miss')
+        response['X-Cache'] = 'MISS'
+        if response.status_code != 200 or not isinstance(response, Response):
+            return None
+        headers = {header: response[header] for header in CACHED_HEADERS if response.has_header(header)}
+        return response.data, response.status_code, headers
+
+    def response_from_cache(self, request, cached):
+        self._count(request, 'hit')
+        data, status_code, headers = cached
+        response = get_conditional_response(
+            request, headers.get('ETag'), parse_http_date_safe(headers.get('Last-Modified'))
+        )
+        if response is None:
+            response = Response(data, status=status_code)
+        for header, value in headers.items():
+            response[header] = value
+        response['X-Cache'] = 'HIT'
+        return response
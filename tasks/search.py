@@ -0,0 +1,178 @@
+import re
+
+from django.db import connections
+from rest_framework import filters
+
+# Полнотекстовые индексы SQLite FTS5: таблица модели -> виртуальная таблица
+SEARCH_TABLES = {
+    'task_manager_task': 'task_manager_task_fts',
+    'task_manager_subtask': 'task_manager_subtask_fts',
+}
+SEARCH_COLUMNS = ('title', 'description')
+# Вес столбцов в BM25: совпадение в названии важнее совпадения в описании
+SEARCH_WEIGHTS = (10.0, 1.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# PostgreSQL: tsvector по тем же столбцам, название - вес A, описание - B.
+# Выражение совпадает с GIN-индексами миграции 0010, иначе индекс не используется
+PG_SEARCH_VECTOR = (
+    "(setweight(to_tsvector('simple'::regconfig, {table}.title), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, {table}.description), 'B'))"
+)
+
+
+# ==============================================
+# СХЕМА ИНДЕКСА
+# ==============================================
+
+def _schema_sql(table, fts_table):
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+    delete_old = (
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    )
+    insert_new = f"INSERT INTO {fts_table}(rowid, {columns}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+        f"{columns}, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} BEGIN {delete_old} END",
+        # Только при смене текста: обновления счетчиков и статуса индекс не трогают
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {columns} ON {table} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def search_index_supported(connection):
+    return connection.vendor == 'sqlite'
+
+
+def ensure_search_index(connection):
+    """
+    Создает FTS5-таблицы и триггеры, если их нет.
+    SQLite теряет триггеры при пересоздании таблицы в миграциях, поэтому
+    вызывается после каждого migrate; если что-то пришлось создать - индекс перестраивается
+    """
+    if not search_index_supported(connection):
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {row[0] for row in cursor.fetchall()}
+        tables = set(connection.introspection.table_names(cursor))
+        created = []
+        for table, fts_table in SEARCH_TABLES.items():
+            if table not in tables:
+                continue
+            expected = {fts_table, f'{fts_table}_ai', f'{fts_table}_ad', f'{fts_table}_au'}
+            if expected <= existing:
+                continue
+            for sql in _schema_sql(table, fts_table):
+                cursor.execute(sql)
+            created.append(fts_table)
+
+    if created:
+        rebuild_search_index(connection, created)
+    return bool(created)
+
+
+def rebuild_search_index(connection, fts_tables=None):
+    """Полная перестройка индекса по содержимому таблиц"""
+    fts_tables = fts_tables or list(SEARCH_TABLES.values())
+    with connection.cursor() as cursor:
+        for fts_table in fts_tables:
+            cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+    return fts_tables
+
+
+def ensure_search_index_after_migrate(sender, using, **kwargs):
+    ensure_search_index(connections[using])
+
+
+# ==============================================
+# ФИЛЬТР ПОИСКА
+# ==============================================
+
+def build_match_query(terms):
+    """
+    Превращает поисковые слова в запрос FTS5: каждое слово - префикс ("слово"*),
+    все слова должны встретиться (AND)
+    """
+    tokens = [token for term in terms for token in TOKEN_RE.findall(term)]
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def build_tsquery(terms):
+    """То же для to_tsquery PostgreSQL: 'слово':* & 'слово':*"""
+    tokens = [token for term in terms for token in TOKEN_RE.findall(term)]
+    return ' & '.join(f"'{token}':*" for token in tokens)
+
+
+def postgres_search(queryset, terms, rank_alias):
+    """Совпадения по tsvector (GIN-индекс) с релевантностью ts_rank_cd"""
+    tsquery = build_tsquery(terms)
+    if not tsquery:
+        return None
+    vector = PG_SEARCH_VECTOR.format(table=connections[queryset.db].ops.quote_name(queryset.model._meta.db_table))
+    query = "to_tsquery('simple'::regconfig, %s)"
+    return queryset.extra(
+        # Со знаком минус, как BM25 в SQLite: чем меньше, тем релевантнее
+        select={rank_alias: f'-ts_rank_cd({vector}, {query})'},
+        select_params=[tsquery],
+        where=[f'{vector} @@ {query}'],
+        params=[tsquery],
+    )
+
+
+def full_text_search(queryset, terms, rank_alias='search_rank'):
+    """
+    Ограничивает queryset совпадениями в FTS5-индексе и добавляет столбец
+    релевантности BM25 (на PostgreSQL - tsvector и ts_rank_cd).
+    Возвращает None, если индекс для модели/СУБД недоступен
+    """
+    model_table = queryset.model._meta.db_table
+    fts_table = SEARCH_TABLES.get(model_table)
+    if fts_table is None:
+        return None
+    if connections[queryset.db].vendor == 'postgresql':
+        return postgres_search(queryset, terms, rank_alias)
+
+    match = build_match_query(terms)
+    if not match or not search_index_supported(connections[queryset.db]):
+        return None
+
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    return queryset.extra(
+        select={rank_alias: f'bm25({fts_table}, {weights})'},
+        tables=[fts_table],
+        where=[f'{fts_table}.rowid = {model_table}.id', f'{fts_table} MATCH %s'],
+        params=[match],
+    )
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Замена SearchFilter: на SQLite ищет по FTS5-индексу с ранжированием BM25,
+    на PostgreSQL - по tsvector, в обоих случаях с префиксным совпадением.
+    Если явной сортировки (?ordering=) нет, результаты идут по релевантности.
+    На других СУБД - обычный LIKE.
+    Должен стоять после фильтра сортировки в filter_backends
+    """
+    rank_alias = 'search_rank'
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        searched = full_text_search(queryset, terms, self.rank_alias)
+        if searched is None:
+            return super().filter_queryset(request, queryset, view)
+
+        ordering_param = getattr(view, 'ordering_param', None) or filters.OrderingFilter.ordering_param
+        if not request.query_params.get(ordering_param):
+            # Релевантность отрицательная: чем меньше, тем релевантнее
+            searched = searched.order_by(self.rank_alias, '-pk')
+        return searched
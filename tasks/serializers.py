@@ -5,6 +5,7 @@ from django.contrib.auth.password_validation import validate_password
 from django.core.validators import EmailValidator, RegexValidator
 from django.core.exceptions import ValidationError
 from .models import Task, SubTask, Category
+from .bulk import PrefetchedPrimaryKeyRelatedField
 
 
 # ==============================================
@@ -178,19 +179,31 @@ class CategorySerializer(serializers.ModelSerializer):
 class TaskCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
-        fields = ['id', 'title', 'description', 'status', 'deadline', 'owner']
-        read_only_fields = ['id', 'owner']
+        fields = ['id', 'title', 'description', 'status', 'deadline', 'owner',
+                  'subtask_count', 'subtask_done_count']
+        read_only_fields = ['id', 'owner', 'subtask_count', 'subtask_done_count']
 
 
 class TaskDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Task
-        fields = ['id', 'title', 'description', 'status', 'deadline', 'owner', 'created_at']
-        read_only_fields = ['id', 'owner', 'created_at']
+        fields = ['id', 'title', 'description', 'status', 'deadline', 'owner', 'created_at',
+                  'subtask_count', 'subtask_done_count']
+        read_only_fields = ['id', 'owner', 'created_at', 'subtask_count', 'subtask_done_count']
 
 
 class SubTaskSerializer(serializers.ModelSerializer):
+    task = PrefetchedPrimaryKeyRelatedField(queryset=Task.objects.all())
+
     class Meta:
         model = SubTask
-        fields = ['id', 'title', 'description', 'status', 'owner', 'deadline', 'created_at']
-        read_only_fields = ['id', 'owner', 'created_at']
\ No newline at end of file
+        fields = ['id', 'title', 'description', 'status', 'task', 'owner', 'deadline', 'created_at']
+        read_only_fields = ['id', 'owner', 'created_at']
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # Подзадачу можно привязать только к своей задаче - как в SubTaskBulkView
+        request = self.context.get('request')
+        if request is not None and request.user.is_authenticated:
+            fields['task'].queryset = Task.objects.filter(owner=request.user)
+        return fields
\ No newline at end of file
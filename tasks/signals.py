@@ -0,0 +1,137 @@
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user
+from .counters import apply_status_deltas, apply_subtask_delta, refresh_subtask_counters
+from .models import Category, Task, SubTask, TimestampedQuerySet
+from .response_cache import cascade_models, invalidate
+
+
+def _deleted_with_task(origin):
+    """Подзадача удаляется каскадом вместе со своей задачей - счетчики трогать незачем"""
+    model = getattr(origin, 'model', type(origin))
+    return model is Task
+
+
+def _deleted_with_owner(origin, instance):
+    """Задача удаляется каскадом от своего владельца: его счетчики удаляются вместе с ним"""
+    if isinstance(origin, QuerySet):
+        # owner - единственная ссылка задачи на User, значит владелец в удаляемом наборе
+        return origin.model is User
+    return isinstance(origin, User) and origin.pk == instance.owner_id
+
+
+def _deleted_by_queryset(origin):
+    """SubTaskQuerySet.delete() сам пересчитывает счетчики затронутых задач"""
+    return isinstance(origin, QuerySet) and origin.model is SubTask
+
+
+# ==============================================
+# СЧЕТЧИКИ ПОДЗАДАЧ
+# ==============================================
+
+@receiver(post_save, sender=SubTask)
+def update_counters_on_subtask_save(sender, instance, created, using, **kwargs):
+    is_done = int(instance.status == 'done')
+
+    if created:
+        apply_subtask_delta(instance.task_id, total=1, done=is_done, using=using)
+    elif not hasattr(instance, '_loaded_values'):
+        # Объект не загружался из базы - прежнее состояние неизвестно, пересчитываем
+        refresh_subtask_counters([instance.task_id], using=using)
+    else:
+        old_task_id = instance._loaded_values.get('task_id', instance.task_id)
+        was_done = int(instance._loaded_values.get('status', instance.status) == 'done')
+
+        if old_task_id != instance.task_id:
+            apply_subtask_delta(old_task_id, total=-1, done=-was_done, using=using)
+            apply_subtask_delta(instance.task_id, total=1, done=is_done, using=using)
+        else:
+            apply_subtask_delta(instance.task_id, done=is_done - was_done, using=using)
+
+    instance._loaded_values = {'task_id': instance.task_id, 'status': instance.status}
+
+
+@receiver(post_delete, sender=SubTask)
+def update_counters_on_subtask_delete(sender, instance, using, origin=None, **kwargs):
+    if _deleted_with_task(origin) or _deleted_by_queryset(origin):
+        return
+    apply_subtask_delta(
+        instance.task_id,
+        total=-1,
+        done=-int(instance.status == 'done'),
+        using=using,
+    )
+
+
+# ==============================================
+# СЧЕТЧИКИ ЗАДАЧ ПО СТАТУСАМ
+# ==============================================
+
+@receiver(post_save, sender=Task)
+def update_status_counters_on_task_save(sender, instance, created, using, **kwargs):
+    current = (instance.owner_id, instance.status)
+
+    if created:
+        apply_status_deltas({current: 1}, using=using)
+    else:
+        loaded = getattr(instance, '_loaded_values', None)
+        if loaded is None:
+            # Прежнее состояние неизвестно (объект собран вручную) - перечитать нечего,
+            # расхождение поправит rebuild_status_counters
+            previous = current
+        else:
+            previous = (loaded.get('owner_id', instance.owner_id), loaded.get('status', instance.status))
+        if previous != current:
+            apply_status_deltas({previous: -1, current: 1}, using=using)
+
+    instance._loaded_values = {'owner_id': instance.owner_id, 'status': instance.status}
+
+
+@receiver(post_delete, sender=Task)
+def update_status_counters_on_task_delete(sender, instance, using, origin=None, **kwargs):
+    # TaskQuerySet.delete() уже учел удаляемые задачи одним агрегатом
+    if isinstance(origin, QuerySet) and origin.model is Task:
+        return
+    skip_owners = {instance.owner_id} if _deleted_with_owner(origin, instance) else ()
+    apply_status_deltas({(instance.owner_id, instance.status): -1}, using=using, skip_owners=skip_owners)
+
+
+
+# ==============================================
+# КЭШ ОТВЕТОВ
+# ==============================================
+# Массовые операции QuerySet сбрасывают кэш сами (TimestampedQuerySet)
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=SubTask)
+@receiver(post_save, sender=Category)
+def invalidate_response_cache_on_save(sender, using, **kwargs):
+    invalidate(sender, using=using)
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=SubTask)
+@receiver(post_delete, sender=Category)
+def invalidate_response_cache_on_delete(sender, using, origin=None, **kwargs):
+    if isinstance(origin, sender):
+        invalidate(*cascade_models(sender), using=using)
+        return
+    # Удаление через TimestampedQuerySet или каскадом от задачи/подзадачи/категории
+    # уже сбросило кэш вместе с каскадными моделями
+    if isinstance(origin, (TimestampedQuerySet, Task, SubTask, Category)):
+        return
+    # Каскад от модели без кэша ответов (например, удаление пользователя) - сбрасывать некому
+    invalidate(sender, using=using)
+
+
+# ==============================================
+# КЭШ ПОЛЬЗОВАТЕЛЕЙ JWT-АУТЕНТИФИКАЦИИ
+# ==============================================
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, using, **kwargs):
+    invalidate_user(instance.pk, using=using)
@@ -0,0 +1,138 @@
+import logging
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.conf import settings
+
+# Отдельные запросы (медленные и выборка) и периодические агрегаты по отпечаткам
+query_logger = logging.getLogger('tasks.sql')
+stats_logger = logging.getLogger('tasks.sql.stats')
+
+# Представление, которое обрабатывает текущий запрос (выставляет RequestLoggingMiddleware)
+current_view = ContextVar('current_view', default=None)
+
+
+def get_config():
+    return {
+        'slow_ms': getattr(settings, 'SQL_SLOW_QUERY_MS', 100),
+        'sample_rate': getattr(settings, 'SQL_QUERY_SAMPLE_RATE', 0.0),
+        'flush_interval': getattr(settings, 'SQL_STATS_FLUSH_INTERVAL', 60),
+        'top': getattr(settings, 'SQL_STATS_TOP', 50),
+    }
+
+
+# ==============================================
+# ОТПЕЧАТОК ЗАПРОСА
+# ==============================================
+
+FINGERPRINT_RULES = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),                       # строковые литералы
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),                    # числа
+    (re.compile(r'%s'), '?'),                                   # плейсхолдеры драйвера
+    (re.compile(r'\bIN \((?:\s*\?\s*,)*\s*\?\s*\)', re.I), 'IN (...)'),  # IN (?, ?, ...) любой длины
+    (re.compile(r'"s\w+_x\w+"'), '?'),                          # имена SAVEPOINT
+    (re.compile(r'\s+'), ' '),
+]
+
+
+# Django передает значения параметрами, поэтому различных текстов SQL немного, а один и тот же
+# текст повторяется на каждом запросе - отпечаток считается один раз
+@lru_cache(maxsize=512)
+def fingerprint(sql):
+    """SQL без конкретных значений: одинаковые по форме запросы дают одну строку"""
+    for pattern, replacement in FINGERPRINT_RULES:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+# ==============================================
+# EXECUTE WRAPPER
+# ==============================================
+
+class SQLMonitor:
+    """
+    Обертка выполнения запросов (connection.execute_wrapper). Каждый запрос учитывается
+    в агрегатах по отпечатку; в лог пишутся только запросы дольше slow_ms и случайная
+    выборка sample_rate. Агрегаты сбрасываются в лог не чаще раза в flush_interval секунд.
+    Без явного config настройки читаются при каждом запросе (get_config), как в остальных модулях
+    """
+
+    def __init__(self, config=None):
+        self._config = config
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.last_flush = time.monotonic()
+
+    @property
+    def config(self):
+        return self._config or get_config()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            self.record(sql, duration_ms, getattr(context.get('cursor'), 'rowcount', -1), many)
+
+    def record(self, sql, duration_ms, rowcount, many=False):
+        config = self.config
+        slow = duration_ms >= config['slow_ms']
+        sampled = not slow and config['sample_rate'] and random.random() < config['sample_rate']
+        key = fingerprint(sql)
+        rows = rowcount if rowcount is not None and rowcount >= 0 else None
+
+        with self.lock:
+            entry = self.stats.get(key)
+            if entry is None:
+                entry = self.stats[key] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'slow': 0}
+            entry['count'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            entry['rows'] += rows or 0
+            entry['slow'] += slow
+            flush = time.monotonic() - self.last_flush >= config['flush_interval']
+
+        if slow or sampled:
+            query_logger.log(
+                logging.WARNING if slow else logging.INFO,
+                '%s %.1f ms: %s', 'slow' if slow else 'sample', duration_ms, key,
+                extra={
+                    'fingerprint': key, 'duration_ms': round(duration_ms, 3), 'rows': rows,
+                    'view': current_view.get(), 'executemany': many, 'slow': slow,
+                },
+            )
+        if flush:
+            self.flush()
+
+    def flush(self):
+        """Пишет накопленные агрегаты (самые затратные по суммарному времени) и обнуляет их"""
+        with self.lock:
+            stats, self.stats = self.stats, {}
+            started, self.last_flush = self.last_flush, time.monotonic()
+        if not stats:
+            return
+        interval = round(self.last_flush - started, 1)
+        top = sorted(stats.items(), key=lambda item: -item[1]['total_ms'])[:self.config['top']]
+        for key, entry in top:
+            stats_logger.info(
+                '%d x %.1f ms: %s', entry['count'], entry['total_ms'], key,
+                extra={
+                    'fingerprint': key, 'count': entry['count'], 'total_ms': round(entry['total_ms'], 3),
+                    'avg_ms': round(entry['total_ms'] / entry['count'], 3), 'max_ms': round(entry['max_ms'], 3),
+                    'rows': entry['rows'], 'slow': entry['slow'], 'interval_s': interval,
+                },
+            )
+
+
+monitor = SQLMonitor()
+
+
+def install_monitor(sender, connection, **kwargs):
+    """connection_created: подключает монитор к новому соединению (один раз на объект соединения)"""
+    if getattr(settings, 'SQL_MONITOR_ENABLED', True) and monitor not in connection.execute_wrappers:
+        connection.execute_wrappers.append(monitor)
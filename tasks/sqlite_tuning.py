@@ -0,0 +1,139 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Порядок важен: busy_timeout первым - переключение в WAL ждет блокировку; auto_vacuum
+# до journal_mode - он действует, только пока новая база пуста (на существующей - после
+# VACUUM, см. db_maintenance --enable-incremental-vacuum), а переход в WAL записывает заголовок
+DEFAULT_PRAGMAS = {
+    'busy_timeout': 5000,
+    'auto_vacuum': 'INCREMENTAL',
+    'journal_mode': 'WAL',
+    # В WAL NORMAL не теряет целостность, fsync только на checkpoint
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение - в КиБ: 64 МБ кэша страниц на соединение
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+}
+
+# Настройки SQLite по умолчанию - точка отсчета для замеров (benchmark_api --sqlite-pragmas stock)
+STOCK_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'mmap_size': 0,
+    'cache_size': -2000,
+    'temp_store': 'DEFAULT',
+}
+
+MAINTENANCE_STEPS = ('analyze', 'optimize', 'vacuum', 'checkpoint')
+CHECKPOINT_MODES = ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE')
+
+
+def get_config():
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    return {
+        'enabled': getattr(settings, 'SQLITE_TUNING_ENABLED', True),
+        'pragmas': DEFAULT_PRAGMAS if pragmas is None else pragmas,
+    }
+
+
+# ==============================================
+# PRAGMA НА КАЖДОМ СОЕДИНЕНИИ
+# ==============================================
+
+def apply_pragmas(connection, pragmas):
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            if name not in DEFAULT_PRAGMAS:
+                raise ImproperlyConfigured(f'SQLITE_PRAGMAS: неизвестный PRAGMA {name!r}')
+            cursor.execute(f'PRAGMA {name} = {value}')
+            if name == 'journal_mode':
+                # journal_mode возвращает итоговый режим; результат нужно дочитать
+                cursor.fetchall()
+
+
+def read_pragmas(connection, names=tuple(DEFAULT_PRAGMAS)):
+    """Текущие значения PRAGMA соединения - для отчетов и проверок"""
+    values = {}
+    with connection.cursor() as cursor:
+        for name in names:
+            cursor.execute(f'PRAGMA {name}')
+            values[name] = cursor.fetchone()[0]
+    return values
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """connection_created: PRAGMA из SQLITE_PRAGMAS для каждого нового соединения SQLite"""
+    config = get_config()
+    if connection.vendor == 'sqlite' and config['enabled']:
+        apply_pragmas(connection, config['pragmas'])
+
+
+# ==============================================
+# ОБСЛУЖИВАНИЕ
+# ==============================================
+
+def _pragma_value(cursor, name):
+    cursor.execute(f'PRAGMA {name}')
+    return cursor.fetchone()[0]
+
+
+def analyze(cursor):
+    cursor.execute('ANALYZE')
+    return {}
+
+
+def optimize(cursor):
+    cursor.execute('PRAGMA optimize')
+    cursor.fetchall()
+    return {}
+
+
+def incremental_vacuum(cursor, pages=0):
+    """Возвращает в ФС свободные страницы (pages=0 - все). Нужен auto_vacuum=INCREMENTAL"""
+    # 2 - INCREMENTAL
+    if _pragma_value(cursor, 'auto_vacuum') != 2:
+        return {'skipped': 'auto_vacuum не INCREMENTAL (включается db_maintenance --enable-incremental-vacuum)'}
+    before = _pragma_value(cursor, 'freelist_count')
+    # Каждая страница освобождается отдельным шагом, а execute модуля sqlite3 делает один шаг
+    # у команд без результата; executescript выполняет PRAGMA до конца
+    cursor.executescript(f'PRAGMA incremental_vacuum({int(pages)});')
+    return {'freed_pages': before - _pragma_value(cursor, 'freelist_count')}
+
+
+def checkpoint(cursor, mode='TRUNCATE'):
+    """Переносит WAL в основной файл; TRUNCATE еще и обрезает -wal до нуля"""
+    if mode not in CHECKPOINT_MODES:
+        raise ValueError(f'Неизвестный режим checkpoint: {mode}')
+    if _pragma_value(cursor, 'journal_mode') != 'wal':
+        return {'skipped': 'база не в режиме WAL'}
+    cursor.execute(f'PRAGMA wal_checkpoint({mode})')
+    busy, log_frames, checkpointed = cursor.fetchone()
+    return {'busy': bool(busy), 'wal_frames': log_frames, 'checkpointed_frames': checkpointed}
+
+
+def enable_incremental_vacuum(cursor):
+    """auto_vacuum=INCREMENTAL для существующей базы: вступает в силу только после полного VACUUM"""
+    cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    cursor.execute('VACUUM')
+
+
+def run_maintenance(connection, steps=MAINTENANCE_STEPS, vacuum_pages=0, checkpoint_mode='TRUNCATE'):
+    """Выполняет шаги обслуживания по порядку, возвращает шаг -> результат и время в мс"""
+    actions = {
+        'analyze': analyze,
+        'optimize': optimize,
+        'vacuum': lambda cursor: incremental_vacuum(cursor, vacuum_pages),
+        'checkpoint': lambda cursor: checkpoint(cursor, checkpoint_mode),
+    }
+    results = {}
+    with connection.cursor() as cursor:
+        for step in steps:
+            started = time.perf_counter()
+            result = actions[step](cursor)
+            result['ms'] = round((time.perf_counter() - started) * 1000, 2)
+            results[step] = result
+    return results
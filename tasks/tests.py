@@ -1,3 +1,2240 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import logging
+import os
+import tempfile
+import re
+import threading
+import time
+import traceback
+from base64 import urlsafe_b64encode
+from io import StringIO
+from urllib.parse import urlsplit
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from asgiref.sync import SyncToAsync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, models
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import urls as tasks_urls
+from .admin import EstimatedCountPaginator
+from .benchmark import ENDPOINTS, compare_databases, compare_reports, percentile
+from .coalescing import SingleFlight, coalesce_response, single_flight
+from .db_router import ReplicaRouter, ReplicaRoutingMiddleware, RoutingState, current_routing
+from .hashers import calibration
+from .counters import status_counter_drift, subtask_counter_drift
+from .last_login import last_login_buffer
+from .loading import without_query_log
+from .log_pipeline import JSONFormatter, QueuedRotatingFileHandler
+from .metrics import Registry, RequestStats, registry, render_prometheus
+from .middleware import MetricsMiddleware, RequestLoggingMiddleware
+from .models import Task, SubTask, Category, TaskStatusCounter
+from .sql_monitor import SQLMonitor, fingerprint
+from .sqlite_tuning import read_pragmas, run_maintenance
+from .tokens import BloomFilter, RefreshToken as FilteredRefreshToken, blacklist_filter
+
+
+# ==============================================
+# ПЛАНЫ ЗАПРОСОВ СПИСКОВ ЗАДАЧ И ПОДЗАДАЧ
+# ==============================================
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN есть только в SQLite')
+class QueryPlanTests(APITestCase):
+    """
+    Каждый запрос списков задач/подзадач должен идти по индексу,
+    без полного SCAN таблицы
+    """
+    # "SCAN task_manager_task" без "USING ... INDEX" - полный проход по таблице
+    full_scan = re.compile(r'\bSCAN task_manager_\w+$')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='planner', password='Secret-pass-123')
+        other = User.objects.create_user(username='other', password='Secret-pass-123')
+        now = timezone.now()
+        for i in range(20):
+            owner = cls.user if i % 2 else other
+            task = Task.objects.create(
+                owner=owner,
+                title=f'Task {i}',
+                status=['new', 'done'][i % 2],
+                deadline=now + timedelta(days=i),
+            )
+            SubTask.objects.create(owner=owner, task=task, title=f'Sub {i}', deadline=now)
+        cls.task = task
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertNoFullScan(self, url, params=None, allow_sort=True):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+
+        for query in ctx.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or 'task_manager_' not in sql:
+                continue
+            plan = self.explain(sql)
+            for line in plan:
+                self.assertIsNone(
+                    self.full_scan.search(line),
+                    f'{url} {params}: полный скан\n{sql}\n' + '\n'.join(plan)
+                )
+                if not allow_sort:
+                    self.assertNotIn('TEMP B-TREE', line, f'{url} {params}: сортировка не по индексу\n{sql}')
+
+    def test_task_list(self):
+        url = reverse('task-list-create')
+        deadline = self.task.deadline.isoformat()
+        for params in [
+            {},
+            {'status': 'new'},
+            {'deadline': deadline},
+            {'status': 'done', 'deadline': deadline},
+            {'ordering': 'deadline'},
+            {'ordering': '-deadline'},
+            {'ordering': 'title'},
+            {'ordering': '-title'},
+            {'ordering': 'created_at'},
+            {'search': 'task'},
+            {'search': 'task', 'status': 'new'},
+        ]:
+            self.assertNoFullScan(url, params)
+
+    def test_keyset_pages_sorted_by_index(self):
+        url = reverse('task-list-create')
+        for params in [
+            {},
+            {'status': 'new'},
+            {'ordering': 'created_at'},
+            {'ordering': 'deadline'},
+            {'ordering': '-title'},
+        ]:
+            response = self.client.get(url, {'page_size': 3, **params})
+            self.assertNoFullScan(url, params, allow_sort=False)
+            self.assertNoFullScan(response.data['next'], allow_sort=False)
+
+        self.client.force_authenticate(self.user)
+        self.assertNoFullScan(reverse('my-tasks'), allow_sort=False)
+        self.assertNoFullScan(reverse('subtask-list-create'), {'task': self.task.id}, allow_sort=False)
+
+    def test_task_list_my_tasks(self):
+        self.client.force_authenticate(self.user)
+        self.assertNoFullScan(reverse('task-list-create'), {'my_tasks': 'true'})
+
+    def test_my_tasks(self):
+        self.client.force_authenticate(self.user)
+        self.assertNoFullScan(reverse('my-tasks'))
+
+    def test_subtask_list(self):
+        url = reverse('subtask-list-create')
+        for params in [
+            {},
+            {'task': self.task.id},
+            {'status': 'new'},
+            {'deadline': self.task.deadline.isoformat()},
+            {'ordering': 'title'},
+            {'ordering': 'deadline'},
+        ]:
+            self.assertNoFullScan(url, params)
+
+
+# ==============================================
+# СЧЕТЧИКИ ПОДЗАДАЧ
+# ==============================================
+
+class SubTaskCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(username='admin', password='Secret-pass-123')
+
+    def setUp(self):
+        self.task = Task.objects.create(owner=self.user, title='Parent')
+        self.other_task = Task.objects.create(owner=self.user, title='Other')
+
+    def make_subtask(self, task=None, status='new'):
+        return SubTask.objects.create(owner=self.user, task=task or self.task, title='Sub', status=status)
+
+    def assertCounters(self, task, total, done):
+        task.refresh_from_db()
+        self.assertEqual((task.subtask_count, task.subtask_done_count), (total, done))
+
+    def test_create_and_delete(self):
+        first = self.make_subtask()
+        self.make_subtask(status='done')
+        self.assertCounters(self.task, 2, 1)
+
+        first.delete()
+        self.assertCounters(self.task, 1, 1)
+
+        SubTask.objects.filter(task=self.task).delete()
+        self.assertCounters(self.task, 0, 0)
+
+    def test_status_change_and_move(self):
+        subtask = self.make_subtask()
+        subtask.status = 'done'
+        subtask.save()
+        self.assertCounters(self.task, 1, 1)
+
+        subtask = SubTask.objects.get(pk=subtask.pk)
+        subtask.task = self.other_task
+        subtask.save()
+        self.assertCounters(self.task, 0, 0)
+        self.assertCounters(self.other_task, 1, 1)
+
+    def test_queryset_update_and_bulk_create(self):
+        SubTask.objects.bulk_create([
+            SubTask(owner=self.user, task=self.task, title=f'Bulk {i}') for i in range(3)
+        ])
+        self.assertCounters(self.task, 3, 0)
+
+        SubTask.objects.filter(task=self.task).update(status='done')
+        self.assertCounters(self.task, 3, 3)
+
+    def test_admin_mark_as_done(self):
+        subtasks = [self.make_subtask(), self.make_subtask(task=self.other_task)]
+        self.client.force_login(self.user)
+        self.client.post(reverse('admin:tasks_subtask_changelist'), {
+            'action': 'mark_as_done',
+            '_selected_action': [subtask.pk for subtask in subtasks],
+        })
+        self.assertCounters(self.task, 1, 1)
+        self.assertCounters(self.other_task, 1, 1)
+
+    def test_reconcile_command(self):
+        self.make_subtask(status='done')
+        Task.objects.filter(pk=self.task.pk).update(subtask_count=42, subtask_done_count=0)
+
+        call_command('reconcile_subtask_counters', batch_size=1, stdout=StringIO())
+        self.assertCounters(self.task, 1, 1)
+
+    def test_serializer_exposes_counters_without_queries_per_row(self):
+        for _ in range(3):
+            self.make_subtask()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('task-list-create'), {'page_size': 100})
+        result = next(item for item in response.json()['results'] if item['id'] == self.task.id)
+        self.assertEqual((result['subtask_count'], result['subtask_done_count']), (3, 0))
+        self.assertEqual(len(ctx.captured_queries), 1)  # только SELECT страницы
+
+
+# ==============================================
+# СЧЕТЧИКИ СТАТУСОВ И СТАТИСТИКА
+# ==============================================
+
+class TaskStatusCounterTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='stats', password='Secret-pass-123')
+        cls.other = User.objects.create_user(username='stats2', password='Secret-pass-123')
+
+    def setUp(self):
+        single_flight.clear()
+
+    def counts(self, owner=None):
+        return dict(TaskStatusCounter.objects.filter(owner=owner, count__gt=0).values_list('status', 'count'))
+
+    def test_counters_follow_every_write_path(self):
+        task = Task.objects.create(owner=self.user, title='One')
+        Task.objects.bulk_create([Task(owner=self.other, title=f'Bulk {i}', status='done') for i in range(2)])
+        self.assertEqual(self.counts(), {'new': 1, 'done': 2})
+
+        task.status = 'blocked'
+        task.save()
+        Task.objects.filter(owner=self.other).update(status='pending')
+        self.assertEqual(self.counts(), {'blocked': 1, 'pending': 2})
+        self.assertEqual(self.counts(self.other), {'pending': 2})
+
+        task.delete()
+        Task.objects.filter(owner=self.other)[:1].get().delete()
+        Task.objects.filter(owner=self.other).delete()
+        self.assertEqual(self.counts(), {})
+        self.assertEqual(status_counter_drift(), [])
+
+    def test_stats_endpoint_reads_counters(self):
+        Task.objects.create(owner=self.user, title='Late', status='done', deadline=timezone.now() - timedelta(days=1))
+        Task.objects.create(owner=self.other, title='Open')
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('task-stats'))
+        self.assertEqual(response.data['total_tasks'], 2)
+        self.assertEqual(response.data['total_overdue'], 1)
+        self.assertEqual(response.data['by_status']['done'], 1)
+        self.assertEqual(response.data['completion_rate'], 50.0)
+
+        self.client.force_authenticate(self.other)
+        response = self.client.get(reverse('task-stats'), {'my_tasks': 'true'})
+        self.assertEqual(response.data['total_tasks'], 1)
+        self.assertEqual(response.data['total_overdue'], 0)
+
+    def test_rebuild_command_fixes_drift(self):
+        Task.objects.create(owner=self.user, title='One')
+        TaskStatusCounter.objects.filter(owner=None, status='new').update(count=10)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_status_counters', check=True, stdout=StringIO())
+        call_command('rebuild_status_counters', stdout=StringIO())
+        self.assertEqual(status_counter_drift(), [])
+
+
+class OwnerDeleteStatusCounterTests(TransactionTestCase):
+    """Внешние ключи SQLite проверяются при коммите - нужен настоящий коммит, а не откат теста"""
+
+    def counts(self, owner=None):
+        return dict(TaskStatusCounter.objects.filter(owner=owner, count__gt=0).values_list('status', 'count'))
+
+    def test_deleting_owner_keeps_global_counters(self):
+        owner = User.objects.create_user(username='leaving', password='Secret-pass-123')
+        other = User.objects.create_user(username='staying', password='Secret-pass-123')
+        for status in ['new', 'new', 'done', 'blocked']:
+            Task.objects.create(owner=owner, title=status, status=status)
+        Task.objects.create(owner=other, title='Other', status='new')
+
+        owner_id = owner.pk
+        owner.delete()
+        self.assertFalse(User.objects.filter(pk=owner_id).exists())
+        self.assertFalse(TaskStatusCounter.objects.filter(owner_id=owner_id).exists())
+        self.assertEqual(self.counts(), {'new': 1})
+        self.assertEqual(self.counts(other), {'new': 1})
+        self.assertEqual(status_counter_drift(), [])
+
+        # Удаление пользователей через QuerySet
+        Task.objects.create(owner=other, title='Done', status='done')
+        User.objects.filter(pk=other.pk).delete()
+        self.assertEqual(self.counts(), {})
+        self.assertEqual(status_counter_drift(), [])
+
+
+# ==============================================
+# ОБЪЕДИНЕНИЕ ОДИНАКОВЫХ ЗАПРОСОВ
+# ==============================================
+
+class SingleFlightTests(APITestCase):
+
+    def setUp(self):
+        single_flight.clear()
+
+    def test_concurrent_threads_share_one_computation(self):
+        flight = SingleFlight()
+        calls = []
+        started = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.2)
+            return 'result'
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do('key', compute, ttl=0)))
+        leader.start()
+        started.wait()
+        waiters = [
+            threading.Thread(target=lambda: results.append(flight.do('key', compute, ttl=0)))
+            for _ in range(4)
+        ]
+        for thread in waiters:
+            thread.start()
+        for thread in [leader, *waiters]:
+            thread.join()
+
+        self.assertEqual(results, ['result'] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.stats()['misses'], 1)
+        self.assertEqual(flight.stats()['waits'], 4)
+
+    def test_async_tasks_share_one_computation(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 42
+
+        async def run():
+            return await asyncio.gather(*[flight.ado('key', compute, ttl=0) for _ in range(5)])
+
+        self.assertEqual(asyncio.run(run()), [42] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_ttl_and_errors(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do('key', lambda: 1, ttl=60), 1)
+        self.assertEqual(flight.do('key', lambda: 2, ttl=60), 1)
+        self.assertEqual(flight.stats()['hits'], 1)
+
+        def fail():
+            raise ValueError('boom')
+
+        with self.assertRaises(ValueError):
+            flight.do('other', fail, ttl=60)
+        # Ошибки не кешируются
+        self.assertEqual(flight.do('other', lambda: 3, ttl=60), 3)
+
+    def test_results_bounded_within_ttl(self):
+        flight = SingleFlight()
+        flight.max_results = 3
+        for i in range(5):
+            flight.do(f'key{i}', lambda i=i: i, ttl=60)
+        # Все еще живы по TTL, но старейшие вытеснены
+        self.assertEqual(flight.stats()['cached'], 3)
+        self.assertEqual(flight.do('key4', lambda: 'again', ttl=60), 4)
+        self.assertEqual(flight.do('key0', lambda: 'again', ttl=60), 'again')
+
+    def test_coalesced_response_keeps_headers(self):
+        calls = []
+
+        class View:
+            @coalesce_response(ttl=60)
+            def get(self, request):
+                calls.append(1)
+                return Response({'ok': True}, headers={'Cache-Control': 'max-age=5'})
+
+        request = APIRequestFactory().get('/coalesced/')
+        for _ in range(2):
+            response = View().get(request)
+            self.assertEqual((response.data, response['Cache-Control']), ({'ok': True}, 'max-age=5'))
+        self.assertEqual(len(calls), 1)
+
+    def test_stats_endpoint_is_coalesced(self):
+        url = reverse('task-stats')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_count_tasks_is_coalesced(self):
+        category = Category.objects.create(name='Work')
+        url = reverse('category-count-tasks', args=[category.id])
+        self.assertEqual(self.client.get(url).data['total_tasks'], 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).data['total_tasks'], 0)
+
+
+# ==============================================
+# ПОЛНОТЕКСТОВЫЙ ПОИСК
+# ==============================================
+
+@skipUnless(connection.vendor == 'sqlite', 'FTS5-индекс есть только в SQLite')
+class FullTextSearchTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='searcher', password='Secret-pass-123')
+        cls.other = User.objects.create_user(username='stranger', password='Secret-pass-123')
+        cls.in_title = Task.objects.create(owner=cls.user, title='Prepare presentation', status='new')
+        cls.in_description = Task.objects.create(
+            owner=cls.other, title='Slides', description='Notes for the presentation', status='done'
+        )
+        Task.objects.create(owner=cls.user, title='Unrelated')
+
+    def search(self, url_name='task-list-create', **params):
+        response = self.client.get(reverse(url_name), params)
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_prefix_match_ranked_by_bm25(self):
+        self.assertEqual(self.search(search='presen'), [self.in_title.id, self.in_description.id])
+
+    def test_respects_filters_ordering_and_scoping(self):
+        self.assertEqual(self.search(search='presentation', status='done'), [self.in_description.id])
+        self.assertEqual(
+            self.search(search='presentation', ordering='-title'),
+            [self.in_description.id, self.in_title.id],
+        )
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.search(search='presentation', my_tasks='true'), [self.in_title.id])
+
+    def test_index_follows_writes(self):
+        task = Task.objects.create(owner=self.user, title='Quarterly report')
+        self.assertEqual(self.search(search='quarterly'), [task.id])
+
+        Task.objects.filter(pk=task.pk).update(title='Annual report')
+        self.assertEqual(self.search(search='quarterly'), [])
+        self.assertEqual(self.search(search='annual'), [task.id])
+
+        task.delete()
+        self.assertEqual(self.search(search='annual'), [])
+
+    def test_subtasks_and_rebuild_command(self):
+        subtask = SubTask.objects.create(owner=self.user, task=self.in_title, title='Gather information')
+        self.assertEqual(self.search('subtask-list-create', search='gath'), [subtask.id])
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('subtask-list-create', search='information'), [subtask.id])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'tsvector-поиск только в PostgreSQL')
+class PostgresSearchTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='searcher', password='Secret-pass-123')
+        cls.in_title = Task.objects.create(owner=cls.user, title='Prepare presentation')
+        cls.in_description = Task.objects.create(
+            owner=cls.user, title='Slides', description='Notes for the presentation'
+        )
+        Task.objects.create(owner=cls.user, title='Unrelated')
+
+    def search(self, **params):
+        response = self.client.get(reverse('task-list-create'), params)
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_prefix_match_ranked_by_weight(self):
+        self.assertEqual(self.search(search='presen'), [self.in_title.id, self.in_description.id])
+        self.assertEqual(self.search(search='notes presen'), [self.in_description.id])
+
+    def test_search_uses_gin_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            with CaptureQueriesContext(connection) as queries:
+                self.search(search='presentation')
+            sql = next(query['sql'] for query in queries.captured_queries if 'to_tsquery' in query['sql'])
+            cursor.execute(f'EXPLAIN {sql}')
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+        self.assertIn('task_search_gin_idx', plan)
+
+
+# ==============================================
+# KEYSET-ПАГИНАЦИЯ
+# ==============================================
+
+class KeysetPaginationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='pager', password='Secret-pass-123')
+        now = timezone.now()
+        titles = ['alpha', 'Bravo', 'charlie', 'Delta', 'echo', 'Foxtrot', 'golf']
+        cls.tasks = []
+        for i, title in enumerate(titles):
+            cls.tasks.append(Task.objects.create(
+                owner=cls.user,
+                title=title,
+                # Дубликаты и NULL - чтобы проверить тай-брейкер по id
+                deadline=None if i % 3 == 0 else now + timedelta(days=i // 2),
+            ))
+        # Одинаковое время создания у всех - порядок задает только id
+        Task.objects.update(created_at=now)
+
+    def collect(self, url, params, backwards=False):
+        ids = []
+        response = self.client.get(url, params)
+        self.assertNotIn('count', response.data)
+        while True:
+            ids.extend(item['id'] for item in response.data['results'])
+            link = response.data['next']
+            if not link:
+                break
+            response = self.client.get(link)
+        if backwards:
+            back = []
+            while True:
+                back = [item['id'] for item in response.data['results']] + back
+                link = response.data['previous']
+                if not link:
+                    break
+                response = self.client.get(link)
+            self.assertEqual(back, ids)
+        return ids
+
+    def expected(self, ordering):
+        queryset = Task.objects.order_by('id')
+        tasks = list(queryset)
+        name = ordering.lstrip('-')
+        descending = ordering.startswith('-')
+
+        def key(task):
+            value = getattr(task, name)
+            if name == 'title':
+                value = value.lower()
+            # NULL - наименьшее значение
+            return (value is not None, value if value is not None else 0, task.id)
+
+        return [task.id for task in sorted(tasks, key=key, reverse=descending)]
+
+    def test_every_ordering_field_both_directions(self):
+        url = reverse('task-list-create')
+        for ordering in ['created_at', '-created_at', 'deadline', '-deadline', 'title', '-title']:
+            with self.subTest(ordering=ordering):
+                ids = self.collect(url, {'ordering': ordering, 'page_size': 2}, backwards=True)
+                self.assertEqual(ids, self.expected(ordering))
+
+    def test_no_count_and_page_size_cap(self):
+        url = reverse('task-list-create')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {'page_size': 1000})
+        self.assertEqual(len(response.data['results']), 7)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in ctx.captured_queries))
+
+        response = self.client.get(url, {'page_size': 3})
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_my_tasks_and_subtasks(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.collect(reverse('my-tasks'), {'page_size': 3}), self.expected('-created_at'))
+
+        for task in self.tasks[:3]:
+            SubTask.objects.create(owner=self.user, task=task, title=task.title)
+        ids = self.collect(reverse('subtask-list-create'), {'page_size': 2, 'ordering': 'title'})
+        self.assertEqual(len(ids), 3)
+
+    def test_legacy_page_number_mode(self):
+        url = reverse('task-list-create')
+        response = self.client.get(url, {'pagination': 'page', 'page_size': 5})
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual(response.data['total_pages'], 2)
+
+        response = self.client.get(url, {'page': 2, 'page_size': 5})
+        self.assertEqual(response.data['current_page'], 2)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('task-list-create'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor(self):
+        # Корректный base64/JSON с неверными типами - 404, а не 500
+        cases = [
+            ({'k': 'abc'}, {}),
+            ({'k': True, 'v': None}, {}),
+            ({'k': 1, 'v': 5}, {}),
+            ({'k': 1, 'v': 'not-a-date'}, {}),
+            ({'k': [1], 'v': 'x'}, {}),
+            ({'k': 1, 'v': 'x', 'r': 'yes'}, {}),
+            ({'k': 1, 'v': {'x': 1}}, {'ordering': 'title'}),
+            ({'o': 1}, {}),
+            ({'o': 'x'}, {'search': 'alpha'}),
+            ({'o': -5}, {'search': 'alpha'}),
+        ]
+        for cursor, params in cases:
+            with self.subTest(cursor=cursor, params=params):
+                encoded = urlsafe_b64encode(json.dumps(cursor).encode()).decode('ascii')
+                response = self.client.get(reverse('task-list-create'), {**params, 'cursor': encoded})
+                self.assertEqual(response.status_code, 404)
+
+
+# ==============================================
+# АДМИНКА НА БОЛЬШИХ ТАБЛИЦАХ
+# ==============================================
+
+class AdminScalingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='root', password='Secret-pass-123')
+        cls.category = Category.objects.create(name='Work')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def seed(self, count):
+        for i in range(count):
+            task = Task.objects.create(owner=self.admin, title=f'Task {i}')
+            task.categories.add(self.category)
+            SubTask.objects.create(owner=self.admin, task=task, title=f'Sub {i}')
+
+    def changelist_queries(self, url_name, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(url_name), params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_changelist_query_count_is_flat(self):
+        self.seed(3)
+        small = {name: self.changelist_queries(name) for name in ['admin:tasks_task_changelist', 'admin:tasks_subtask_changelist']}
+        self.seed(40)
+        large = {name: self.changelist_queries(name) for name in small}
+        self.assertEqual(small, large)
+
+        self.assertEqual(
+            self.changelist_queries('admin:tasks_subtask_changelist', {'q': 'sub'}),
+            self.changelist_queries('admin:tasks_subtask_changelist', {'q': 'sub 1'}),
+        )
+
+    def test_no_exact_count_on_unfiltered_changelist(self):
+        self.seed(3)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('admin:tasks_task_changelist'))
+        self.assertFalse(any('COUNT(' in query['sql'] for query in ctx.captured_queries))
+        self.assertEqual(response.context['cl'].result_count, 3)
+
+    def test_stale_statistics_do_not_hide_rows(self):
+        self.seed(5)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Task.objects.bulk_create([Task(owner=self.admin, title=f'Bulk {i}') for i in range(300)])
+
+        paginator = EstimatedCountPaginator(Task.objects.order_by('pk'), 100)
+        self.assertGreaterEqual(paginator.count, 305)
+        self.assertEqual(len(paginator.page(4).object_list), 5)
+
+        response = self.client.get(reverse('admin:tasks_task_changelist'), {'p': 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['cl'].result_list), 5)
+
+    def test_filtered_count_extends_past_limit(self):
+        Task.objects.bulk_create([Task(owner=self.admin, title=f'Bulk {i}', status='new') for i in range(30)])
+        queryset = Task.objects.filter(status='new').order_by('pk')
+        with mock.patch.object(EstimatedCountPaginator, 'count_limit', 10):
+            # Строк больше окна - на одну больше, чтобы следующая страница была видна
+            self.assertEqual(EstimatedCountPaginator(queryset, 5).count, 11)
+            paginator = EstimatedCountPaginator(queryset, 5, current_page=3)
+            self.assertEqual(paginator.num_pages, 5)
+            self.assertTrue(paginator.page(5).object_list)
+            self.assertEqual(EstimatedCountPaginator(queryset, 5, current_page=6).count, 30)
+
+    def test_task_filter_is_bounded(self):
+        self.seed(30)
+        selected = Task.objects.order_by('pk').first()
+        response = self.client.get(
+            reverse('admin:tasks_subtask_changelist'), {'task__id__exact': selected.pk}
+        )
+        task_filter = next(spec for spec in response.context['cl'].filter_specs if spec.field.name == 'task')
+        self.assertEqual(len(task_filter.lookup_choices), 21)
+        self.assertIn(selected.pk, [pk for pk, _ in task_filter.lookup_choices])
+
+    def test_subtask_form_uses_autocomplete(self):
+        response = self.client.get(reverse('admin:tasks_subtask_add'))
+        widget = response.context['adminform'].form.fields['task'].widget
+        self.assertEqual(type(widget.widget).__name__, 'AutocompleteSelect')
+
+
+# ==============================================
+# МАССОВЫЕ ОПЕРАЦИИ
+# ==============================================
+
+class BulkEndpointTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='bulk', password='Secret-pass-123')
+        cls.other = User.objects.create_user(username='stranger', password='Secret-pass-123')
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def request_queries(self, method, url_name, payload):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(reverse(url_name), payload, format='json')
+        return response, len(ctx.captured_queries)
+
+    def test_create_reports_each_item(self):
+        payload = [{'title': 'A'}, {'title': ''}, {'title': 'C', 'status': 'done'}]
+        response = self.client.post(reverse('task-bulk'), payload, format='json')
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.data['succeeded'], response.data['failed']), (2, 1))
+        self.assertEqual([r['status'] for r in response.data['results']], ['created', 'error', 'created'])
+        self.assertIn('title', response.data['results'][1]['errors'])
+        self.assertEqual(Task.objects.filter(owner=self.user).count(), 2)
+        self.assertEqual(status_counter_drift(), [])
+
+    def test_query_count_does_not_grow_with_items(self):
+        # Первый запрос создает строки счетчиков статусов
+        self.request_queries('post', 'task-bulk', [{'title': 'warm-up'}])
+        _, small = self.request_queries('post', 'task-bulk', [{'title': f'T{i}'} for i in range(3)])
+        _, large = self.request_queries('post', 'task-bulk', [{'title': f'T{i}'} for i in range(60)])
+        self.assertEqual(small, large)
+
+        task = Task.objects.filter(owner=self.user).first()
+        _, small = self.request_queries('post', 'subtask-bulk', [{'title': 's', 'task': task.pk}] * 3)
+        _, large = self.request_queries('post', 'subtask-bulk', [{'title': 's', 'task': task.pk}] * 60)
+        self.assertEqual(small, large)
+        task.refresh_from_db()
+        self.assertEqual(task.subtask_count, 63)
+
+    def test_update_checks_ownership_in_one_query(self):
+        mine = Task.objects.create(owner=self.user, title='Mine')
+        foreign = Task.objects.create(owner=self.other, title='Foreign')
+
+        response = self.client.patch(reverse('task-bulk'), [
+            {'id': mine.pk, 'status': 'done'},
+            {'id': foreign.pk, 'status': 'done'},
+            {'id': 999999, 'title': 'Nope'},
+            {'title': 'No id'},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([r['status'] for r in response.data['results']], ['updated', 'error', 'error', 'error'])
+        mine.refresh_from_db()
+        foreign.refresh_from_db()
+        self.assertEqual((mine.status, foreign.status), ('done', 'new'))
+        self.assertEqual(status_counter_drift(), [])
+
+    def test_subtasks_only_under_own_tasks(self):
+        mine = Task.objects.create(owner=self.user, title='Mine')
+        foreign = Task.objects.create(owner=self.other, title='Foreign')
+
+        response = self.client.post(reverse('subtask-bulk'), {'items': [
+            {'title': 'ok', 'task': mine.pk, 'status': 'done'},
+            {'title': 'bad', 'task': foreign.pk},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 207)
+        self.assertIn('task', response.data['results'][1]['errors'])
+        mine.refresh_from_db()
+        self.assertEqual((mine.subtask_count, mine.subtask_done_count), (1, 1))
+        self.assertFalse(foreign.subtasks.exists())
+
+    def test_single_endpoints_reject_foreign_task(self):
+        mine = Task.objects.create(owner=self.user, title='Mine')
+        foreign = Task.objects.create(owner=self.other, title='Foreign')
+
+        response = self.client.post(reverse('subtask-list-create'), {'title': 'bad', 'task': foreign.pk}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('task', response.data)
+
+        subtask = SubTask.objects.create(owner=self.user, task=mine, title='Mine')
+        response = self.client.patch(
+            reverse('subtask-detail-update-delete', kwargs={'id': subtask.pk}), {'task': foreign.pk}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        subtask.refresh_from_db()
+        foreign.refresh_from_db()
+        self.assertEqual((subtask.task_id, foreign.subtask_count), (mine.pk, 0))
+
+        response = self.client.post(reverse('subtask-list-create'), {'title': 'ok', 'task': mine.pk}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_delete_keeps_counters(self):
+        task = Task.objects.create(owner=self.user, title='Parent')
+        subtasks = [SubTask.objects.create(owner=self.user, task=task, title=f'S{i}') for i in range(3)]
+        foreign = Task.objects.create(owner=self.other, title='Foreign')
+
+        response = self.client.delete(
+            reverse('subtask-bulk'), {'ids': [subtasks[0].pk, subtasks[1].pk]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        task.refresh_from_db()
+        self.assertEqual(task.subtask_count, 1)
+
+        response = self.client.delete(reverse('task-bulk'), {'ids': [task.pk, foreign.pk]}, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([r['status'] for r in response.data['results']], ['deleted', 'error'])
+        self.assertTrue(Task.objects.filter(pk=foreign.pk).exists())
+        self.assertEqual(status_counter_drift(), [])
+
+    def test_rejects_non_list_payload(self):
+        response = self.client.post(reverse('task-bulk'), {'title': 'single'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+# ==============================================
+# ПОТОКОВЫЙ ЭКСПОРТ
+# ==============================================
+
+class TaskExportTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='exporter', password='Secret-pass-123')
+        cls.other = User.objects.create_user(username='stranger', password='Secret-pass-123')
+        cls.category = Category.objects.create(name='Работа')
+        for i in range(5):
+            task = Task.objects.create(owner=cls.user, title=f'Задача {i}', status='new')
+            task.categories.add(cls.category)
+            SubTask.objects.create(owner=cls.user, task=task, title=f'Шаг {i}', status='done')
+        Task.objects.create(owner=cls.other, title='Чужая')
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def export(self, **params):
+        response = self.client.get(reverse('task-export'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        response, body = self.export()
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        records = [json.loads(line) for line in body.splitlines()]
+
+        self.assertEqual([record['title'] for record in records], [f'Задача {i}' for i in range(5)])
+        self.assertEqual(records[0]['owner'], 'exporter')
+        self.assertEqual(records[0]['categories'], ['Работа'])
+        self.assertEqual(records[0]['subtasks'][0]['title'], 'Шаг 0')
+
+    def test_csv(self):
+        response, body = self.export(export_format='csv')
+        self.assertIn('filename="tasks-exporter.csv"', response['Content-Disposition'])
+        rows = list(csv.DictReader(body.splitlines()))
+
+        self.assertEqual([row['record_type'] for row in rows[:2]], ['task', 'subtask'])
+        self.assertEqual(rows[1]['task_id'], rows[0]['id'])
+        self.assertEqual(sum(row['record_type'] == 'task' for row in rows), 5)
+
+    def test_queries_per_chunk(self):
+        with mock.patch('tasks.export.EXPORT_CHUNK_SIZE', 2):
+            with CaptureQueriesContext(connection) as ctx:
+                self.export()
+        # Основной курсор + по два prefetch (подзадачи, категории) на каждую из трех пачек
+        self.assertEqual(len(ctx.captured_queries), 1 + 2 * 3)
+
+    def test_unknown_format(self):
+        response = self.client.get(reverse('task-export'), {'export_format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+
+# ==============================================
+# МАССОВЫЙ ИМПОРТ
+# ==============================================
+
+class ImportTasksTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='importer', password='Secret-pass-123')
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def ndjson(self, count):
+        lines = [
+            json.dumps({
+                'owner': 'importer',
+                'title': f'Задача {i}',
+                'status': 'done' if i % 2 else 'new',
+                'created_at': '2024-01-0%dT10:00:00+00:00' % (i % 9 + 1),
+                'categories': ['Импорт', 'Работа'],
+                'subtasks': [{'title': f'Шаг {i}', 'status': 'done'}],
+            }, ensure_ascii=False)
+            for i in range(count)
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def run_import(self, *args, **options):
+        out, err = StringIO(), StringIO()
+        call_command('import_tasks', *args, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_ndjson_import(self):
+        path = self.write('tasks.ndjson', self.ndjson(4) + '{"title": ""}\nnot json\n')
+        out, err = self.run_import(path, batch_size=3)
+
+        self.assertIn('задач: 4, подзадач: 4, ошибок: 2', out)
+        self.assertIn('строка 5', err)
+        task = Task.objects.get(title='Задача 1')
+        self.assertEqual(task.created_at.day, 2)
+        self.assertEqual(sorted(task.categories.values_list('name', flat=True)), ['Импорт', 'Работа'])
+        self.assertEqual((task.subtask_count, task.subtask_done_count), (1, 1))
+        self.assertEqual(status_counter_drift(), [])
+
+    def test_csv_round_trip_with_export(self):
+        self.run_import(self.write('seed.ndjson', self.ndjson(3)))
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('task-export'), {'export_format': 'csv'})
+        exported = b''.join(response.streaming_content).decode()
+
+        self.run_import(self.write('export.csv', exported))
+        self.assertEqual(Task.objects.count(), 6)
+        self.assertEqual(SubTask.objects.count(), 6)
+        self.assertEqual(Category.objects.count(), 2)
+
+    def test_dry_run_writes_nothing(self):
+        out, _ = self.run_import(self.write('tasks.ndjson', self.ndjson(3)), dry_run=True)
+        self.assertIn('Пробный прогон', out)
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(Category.objects.exists())
+
+    def test_resume_from_checkpoint(self):
+        path = self.write('tasks.ndjson', self.ndjson(5))
+        checkpoint = self.write('tasks.checkpoint', json.dumps({'source': os.path.abspath(path), 'units': 3}))
+
+        self.run_import(path, checkpoint=checkpoint, batch_size=1)
+        self.assertEqual(sorted(Task.objects.values_list('title', flat=True)), ['Задача 3', 'Задача 4'])
+        with open(checkpoint, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['units'], 5)
+
+        self.run_import(path, checkpoint=checkpoint)
+        self.assertEqual(Task.objects.count(), 2)
+
+    @override_settings(DEBUG=True)
+    def test_query_log_disabled_on_connection_only(self):
+        connection.queries_log.clear()
+        with without_query_log():
+            Task.objects.count()
+            self.assertEqual(connection.queries, [])
+            self.assertTrue(settings.DEBUG)
+        Task.objects.count()
+        self.assertEqual(len(connection.queries), 1)
+
+    def test_unknown_owner_needs_default(self):
+        path = self.write('tasks.ndjson', json.dumps({'owner': 'ghost', 'title': 'Чья-то'}) + '\n')
+        _, err = self.run_import(path)
+        self.assertIn('ghost', err)
+
+        self.run_import(path, default_owner='importer')
+        self.assertEqual(Task.objects.get().owner, self.user)
+
+
+# ==============================================
+# ГЕНЕРАТОР СИНТЕТИЧЕСКИХ ДАННЫХ
+# ==============================================
+
+class GenerateDatasetTests(TestCase):
+
+    def generate(self, **options):
+        options = {'users': 5, 'tasks_per_user': 8, 'subtasks_per_task': 2, 'categories': 4,
+                   'anchor': '2025-01-01', **options}
+        call_command('generate_dataset', stdout=StringIO(), **options)
+
+    def snapshot(self):
+        return list(
+            Task.objects.order_by('owner__username', 'created_at', 'title')
+            .values_list('owner__username', 'title', 'status', 'deadline', 'created_at',
+                         'subtask_count', 'subtask_done_count')
+        )
+
+    def test_counts_and_counters(self):
+        self.generate()
+
+        self.assertEqual(User.objects.filter(username__startswith='bench_').count(), 5)
+        self.assertEqual(Category.objects.filter(name__startswith='bench-').count(), 4)
+        self.assertAlmostEqual(Task.objects.count(), 40, delta=3)
+        self.assertEqual(SubTask.objects.exclude(owner_id=models.F('task__owner_id')).count(), 0)
+        self.assertEqual(status_counter_drift(), [])
+        self.assertFalse(subtask_counter_drift().exists())
+
+    def test_same_seed_same_dataset_regardless_of_batch_size(self):
+        self.generate(batch_size=7)
+        first = self.snapshot()
+        Task.objects.all().delete()
+        User.objects.filter(username__startswith='bench_').delete()
+
+        self.generate(batch_size=1000)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_skewed_distribution(self):
+        self.generate(users=20, tasks_per_user=10, skew=1.5)
+        per_user = sorted(
+            Task.objects.values('owner').annotate(n=models.Count('id')).values_list('n', flat=True)
+        )
+        self.assertGreater(per_user[-1], per_user[len(per_user) // 2] * 3)
+
+    def test_rejects_bad_options(self):
+        with self.assertRaises(CommandError):
+            self.generate(status_mix='new=1,unknown=2')
+        with self.assertRaises(CommandError):
+            self.generate(overdue_ratio=0.7, no_deadline_ratio=0.5)
+        self.generate(users=1)
+        with self.assertRaises(CommandError):
+            self.generate(users=1)
+
+
+# ==============================================
+# НАГРУЗОЧНЫЙ ПРОГОН API
+# ==============================================
+
+class BenchmarkTests(TransactionTestCase):
+
+    def setUp(self):
+        user = User.objects.create_user(username='bench_000000', password='Bench-pass-123')
+        Task.objects.create(owner=user, title='Подготовить отчет')
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def run_benchmark(self, *args, **options):
+        out, err = StringIO(), StringIO()
+        call_command('benchmark_api', *args, concurrency=1, duration=0.5, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_report_covers_every_endpoint(self):
+        output = os.path.join(self.tmpdir.name, 'report.json')
+        self.run_benchmark(output=output)
+
+        with open(output, encoding='utf-8') as f:
+            report = json.load(f)
+        self.assertEqual(set(report['endpoints']), set(ENDPOINTS))
+        self.assertEqual(report['client_failures'], [])
+        stats = report['endpoints']['stats']
+        self.assertGreater(stats['requests'], 0)
+        self.assertEqual(stats['errors'], 0)
+        self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+        self.assertGreater(stats['queries_per_request'], 0)
+
+    def test_asgi_target(self):
+        out, _ = self.run_benchmark(target='asgi', mix='stats=1,task_detail=1')
+        self.assertIn('task_detail', out)
+
+    def test_capacity_compares_views(self):
+        output = os.path.join(self.tmpdir.name, 'capacity.json')
+        self.run_benchmark(capacity='1,2', output=output)
+
+        with open(output, encoding='utf-8') as f:
+            result = json.load(f)
+        self.assertEqual(set(result['views']), {'sync', 'async'})
+        for summary in result['views'].values():
+            self.assertEqual([run['concurrency'] for run in summary['runs']], [1, 2])
+            self.assertEqual([run['errors'] for run in summary['runs']], [0, 0])
+            self.assertIn(summary['capacity'], (0, 1, 2))
+
+    def test_fails_on_regression(self):
+        baseline = os.path.join(self.tmpdir.name, 'baseline.json')
+        with open(baseline, 'w', encoding='utf-8') as f:
+            json.dump({'endpoints': {'stats': {'p95_ms': 0.001, 'rps': 10 ** 6}}}, f)
+
+        with self.assertRaises(CommandError):
+            self.run_benchmark(mix='stats=1', baseline=baseline)
+
+    def test_baseline_from_other_database_is_compared(self):
+        baseline = os.path.join(self.tmpdir.name, 'baseline.json')
+        with open(baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'database': 'other', 'rps': 10 ** 6, 'p95_ms': 0.001,
+                'endpoints': {'stats': {'p95_ms': 0.001, 'rps': 10 ** 6}},
+            }, f)
+
+        out, _ = self.run_benchmark(mix='stats=1', baseline=baseline)
+        self.assertIn(f'Сравнение: other -> {connection.vendor}', out)
+
+        rows = compare_databases(
+            {'endpoints': {'stats': {'rps': 100.0, 'p95_ms': 10.0}}},
+            {'endpoints': {'stats': {'rps': 250.0, 'p95_ms': 5.0}}},
+        )
+        self.assertEqual((rows[0]['rps_ratio'], rows[0]['p95_ratio']), (2.5, 0.5))
+
+    def test_stock_sqlite_pragmas_baseline(self):
+        baseline = os.path.join(self.tmpdir.name, 'stock.json')
+        self.run_benchmark(mix='stats=1,task_create=1', sqlite_pragmas='stock', output=baseline)
+        with open(baseline, encoding='utf-8') as f:
+            report = json.load(f)
+        self.assertEqual(report['sqlite_pragmas'], 'stock')
+        self.assertGreater(report['read_rps'], 0)
+        self.assertGreater(report['write_rps'], 0)
+
+        out, _ = self.run_benchmark(mix='stats=1,task_create=1', baseline=baseline)
+        self.assertIn('Сравнение: sqlite (stock) -> sqlite (settings)', out)
+        self.assertIn('запись:', out)
+
+    def test_compare_reports(self):
+        baseline = {'endpoints': {'task_list': {'p95_ms': 10.0, 'rps': 100.0}}}
+        current = {'endpoints': {'task_list': {'requests': 5, 'p95_ms': 11.0, 'rps': 90.0}}}
+        self.assertEqual(compare_reports(baseline, current), [])
+        current['endpoints']['task_list'].update(p95_ms=13.0, rps=70.0)
+        self.assertEqual(len(compare_reports(baseline, current)), 2)
+        self.assertEqual(percentile([1, 2, 3, 4], 0.5), 2)
+
+
+# ==============================================
+# БЮДЖЕТЫ SQL-ЗАПРОСОВ ЭНДПОИНТОВ
+# ==============================================
+
+class QueryLog:
+    """Собирает запросы вместе с местом вызова в коде проекта"""
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # Файлы тестов и execute wrapper'ов проекта - не место вызова
+    skip_files = ('tests.py', 'manage.py', 'sql_monitor.py', 'metrics.py')
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql, self.call_site()))
+        return execute(sql, params, many, context)
+
+    def call_site(self):
+        """
+        Ближайший кадр кода проекта и ближайший кадр библиотеки вне django.db:
+        'tasks/views.py:120 get <- rest_framework/generics.py:99 get_object'
+        """
+        project = library = None
+        for frame in reversed(traceback.extract_stack()[:-2]):
+            filename = frame.filename
+            if filename.startswith(self.project_dir):
+                if project is None and not filename.endswith(self.skip_files):
+                    project = frame
+            elif library is None and project is None and f'django{os.sep}db{os.sep}' not in filename:
+                library = frame
+        sites = []
+        for frame in (project, library):
+            if frame is not None:
+                path = frame.filename.split('site-packages' + os.sep)[-1]
+                sites.append(f'{os.path.relpath(path, self.project_dir) if path == frame.filename else path}'
+                             f':{frame.lineno} {frame.name}')
+        return ' <- '.join(sites) or 'неизвестно'
+
+    def report(self):
+        by_site = {}
+        for sql, site in self.queries:
+            by_site.setdefault(site, []).append(sql)
+        lines = []
+        for site, queries in sorted(by_site.items(), key=lambda item: -len(item[1])):
+            lines.append(f'  {site}: {len(queries)}')
+            lines.extend(f'      {sql[:300]}' for sql in dict.fromkeys(queries))
+        return '\n'.join(lines)
+
+
+# Фильтр отозванных токенов не перечитывается и буфер last_login не сбрасывается посреди замера
+@override_settings(TOKEN_BLACKLIST_REFRESH_INTERVAL=3600, TOKEN_BLACKLIST_REBUILD_INTERVAL=3600,
+                   LAST_LOGIN_FLUSH_INTERVAL=3600)
+class QueryBudgetTests(APITestCase):
+    """
+    Каждый URL из tasks/urls.py укладывается в фиксированное число SQL-запросов,
+    и это число не растет ни с количеством строк, ни с размером страницы.
+    Данные засеваются дважды: sizes[0] и sizes[1] задач (с подзадачами) на пользователя
+    """
+    sizes = (3, 30)
+    page_sizes = (5, 50)
+
+    # эндпоинт: максимум запросов, включая SAVEPOINT транзакций; пользователя JWT-аутентификации
+    # берет из кэша (его прогревает первый вызов в measure)
+    budgets = {
+        'category-list': 3,  # + агрегат для ETag
+        'category-detail': 1,
+        'category-create': 2,
+        'category-update': 3,
+        'category-delete': 2,
+        'category-count-tasks': 2,
+        'register': 4,
+        'login': 2,  # пользователь и OutstandingToken; last_login - в буфере
+        'logout': 4,
+        'token_refresh': 4,
+        'profile': 0,
+        'profile-update': 2,
+        'change_password': 2,
+        'task-list-create': 1,
+        'task-list-filtered': 1,
+        'task-search': 1,
+        'task-create': 5,
+        'task-detail-update-delete': 1,
+        'task-update': 4,
+        'task-delete': 7,
+        'my-tasks': 2,  # + агрегат для ETag
+        'task-stats': 2,  # счетчики статусов и просроченные
+        'task-export': 3,  # задачи, подзадачи и категории на пачку EXPORT_CHUNK_SIZE
+        'task-bulk-create': 5,
+        'task-bulk-update': 7,
+        'task-bulk-delete': 12,
+        'subtask-list-create': 1,
+        'subtask-list-by-task': 2,
+        'subtask-create': 5,
+        'subtask-detail-update-delete': 1,
+        'subtask-update': 4,
+        'subtask-delete': 3,
+        'subtask-bulk-create': 5,
+        'async-task-list': 1,
+        'async-task-detail': 1,
+        'async-my-tasks': 2,
+        'async-task-stats': 2,
+        'async-subtask-list': 2,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='budget', password='Secret-pass-123')
+        cls.category = Category.objects.create(name='Работа')
+
+    def setUp(self):
+        self.seeded = 0
+        self.calls = 0
+        self.covered = set()
+        # Токен выпускается заранее: в бюджет входит JWT-аутентификация, но не выдача токена
+        self.token = RefreshToken.for_user(self.user)
+        self.authenticate()
+
+    def authenticate(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token.access_token}')
+
+    def seed(self, size):
+        """Доводит число задач пользователя до size, у каждой две подзадачи и категория"""
+        tasks = Task.objects.bulk_create([
+            Task(owner=self.user, title=f'Задача {i}', status='done' if i % 2 else 'new',
+                 deadline=timezone.now() + timedelta(days=i - 2))
+            for i in range(self.seeded, size)
+        ])
+        SubTask.objects.bulk_create([
+            SubTask(owner=self.user, task=task, title=f'{task.title}: шаг {j}', status='new')
+            for task in tasks for j in range(2)
+        ])
+        Task.categories.through.objects.bulk_create([
+            Task.categories.through(task_id=task.pk, category_id=self.category.pk) for task in tasks
+        ])
+        self.seeded = size
+
+    # Запросы к эндпоинтам. Каждый вызов самодостаточен: пишущие создают себе свежие объекты
+
+    def fresh_task(self):
+        task = Task.objects.create(owner=self.user, title='Свежая задача')
+        SubTask.objects.create(owner=self.user, task=task, title='Свежая подзадача')
+        return task
+
+    def call(self, name, page_size):
+        """Готовит данные для запроса, затем выполняет сам запрос и возвращает (ответ, QueryLog)"""
+        task = Task.objects.filter(owner=self.user).first()
+        subtask = SubTask.objects.filter(owner=self.user).first()
+        page = {'page_size': page_size}
+        self.calls += 1
+        unique = f'{name.replace("-", "_")}_{self.calls}'
+        new_category = lambda: reverse('category-detail', args=[Category.objects.create(name=unique).pk])  # noqa: E731
+        new_refresh = lambda: {'refresh': str(RefreshToken.for_user(self.user))}  # noqa: E731
+        password = {'old_password': 'Secret-pass-123', 'new_password': 'Secret-pass-123',
+                    'new_password2': 'Secret-pass-123'}
+
+        # эндпоинт: () -> (метод, url[, данные]); подготовка выполняется до замера
+        requests = {
+            'category-list': lambda: ('get', reverse('category-list')),
+            'category-detail': lambda: ('get', reverse('category-detail', args=[self.category.pk])),
+            'category-create': lambda: ('post', reverse('category-list'), {'name': unique}),
+            'category-update': lambda: ('patch', new_category(), {'name': unique + '!'}),
+            'category-delete': lambda: ('delete', new_category()),
+            'category-count-tasks': lambda: ('get', reverse('category-count-tasks', args=[self.category.pk])),
+            'register': lambda: ('post', reverse('register'), {
+                'username': unique, 'email': f'{unique}@example.com',
+                'password': 'Budget-pass-123', 'password2': 'Budget-pass-123',
+            }),
+            'login': lambda: ('post', reverse('login'), {'username': 'budget', 'password': 'Secret-pass-123'}),
+            'logout': lambda: ('post', reverse('logout'), new_refresh()),
+            'token_refresh': lambda: ('post', reverse('token_refresh'), new_refresh()),
+            'profile': lambda: ('get', reverse('profile')),
+            'profile-update': lambda: ('patch', reverse('profile'), {'first_name': 'Бюджет'}),
+            'change_password': lambda: ('put', reverse('change_password'), password),
+            'task-list-create': lambda: ('get', reverse('task-list-create'), page),
+            'task-list-filtered': lambda: (
+                'get', reverse('task-list-create'), {**page, 'status': 'done', 'ordering': 'deadline'}
+            ),
+            'task-search': lambda: ('get', reverse('task-list-create'), {**page, 'search': 'задача'}),
+            'task-create': lambda: (
+                'post', reverse('task-list-create'), {'title': unique, 'categories': [self.category.pk]}
+            ),
+            'task-detail-update-delete': lambda: ('get', reverse('task-detail-update-delete', args=[task.pk])),
+            'task-update': lambda: (
+                'patch', reverse('task-detail-update-delete', args=[task.pk]), {'status': 'pending'}
+            ),
+            'task-delete': lambda: ('delete', reverse('task-detail-update-delete', args=[self.fresh_task().pk])),
+            'my-tasks': lambda: ('get', reverse('my-tasks'), page),
+            'task-stats': lambda: ('get', reverse('task-stats'), {'my_tasks': 'true'}),
+            'task-export': lambda: ('get', reverse('task-export')),
+            'task-bulk-create': lambda: (
+                'post', reverse('task-bulk'), [{'title': f'{unique} {i}'} for i in range(page_size)]
+            ),
+            'task-bulk-update': lambda: ('patch', reverse('task-bulk'), [
+                {'id': pk, 'status': 'blocked'}
+                for pk in Task.objects.filter(owner=self.user).values_list('pk', flat=True)[:page_size]
+            ]),
+            'task-bulk-delete': lambda: (
+                'delete', reverse('task-bulk'), {'ids': [self.fresh_task().pk for _ in range(3)]}
+            ),
+            'subtask-list-create': lambda: ('get', reverse('subtask-list-create'), page),
+            'subtask-list-by-task': lambda: ('get', reverse('subtask-list-create'), {**page, 'task': task.pk}),
+            'subtask-create': lambda: ('post', reverse('subtask-list-create'), {'title': unique, 'task': task.pk}),
+            'subtask-detail-update-delete': lambda: (
+                'get', reverse('subtask-detail-update-delete', args=[subtask.pk])
+            ),
+            'subtask-update': lambda: (
+                'patch', reverse('subtask-detail-update-delete', args=[subtask.pk]), {'status': 'done'}
+            ),
+            'subtask-delete': lambda: (
+                'delete', reverse('subtask-detail-update-delete', args=[self.fresh_task().subtasks.get().pk])
+            ),
+            'subtask-bulk-create': lambda: ('post', reverse('subtask-bulk'), [
+                {'title': f'{unique} {i}', 'task': task.pk} for i in range(page_size)
+            ]),
+            'async-task-list': lambda: ('get', reverse('async-task-list'), {**page, 'status': 'done'}),
+            'async-task-detail': lambda: ('get', reverse('async-task-detail', args=[task.pk])),
+            'async-my-tasks': lambda: ('get', reverse('async-my-tasks'), page),
+            'async-task-stats': lambda: ('get', reverse('async-task-stats'), {'my_tasks': 'true'}),
+            'async-subtask-list': lambda: ('get', reverse('async-subtask-list'), {**page, 'task': task.pk}),
+        }
+        method, url, *data = requests[name]()
+        self.covered.add(resolve(urlsplit(url).path).url_name)
+        # Замеряется само вычисление, а не повтор из памяти single-flight (SINGLE_FLIGHT_TTL)
+        single_flight.clear()
+        log = QueryLog()
+        with connection.execute_wrapper(log):
+            response = getattr(self.client, method)(url, *data, format='json')
+            if response.streaming:
+                # Потоковый ответ читает строки при отдаче тела - дочитываем его внутри замера
+                b''.join(response.streaming_content)
+        return response, log
+
+    def measure(self, name, page_size):
+        # Первый вызов прогревает кэши (ContentType и т.п.), считается второй
+        self.call(name, page_size)
+        self.authenticate()
+        response, log = self.call(name, page_size)
+        self.authenticate()
+        self.assertLess(response.status_code, 400, f'{name}: {response.status_code} {getattr(response, "data", "")}')
+        return len(log.queries), log
+
+    def test_query_budgets(self):
+        counts = {}
+        for size in self.sizes:
+            self.seed(size)
+            for page_size in self.page_sizes:
+                for name, budget in self.budgets.items():
+                    with self.subTest(endpoint=name, rows=size, page_size=page_size):
+                        count, log = self.measure(name, page_size)
+                        self.assertLessEqual(
+                            count, budget,
+                            f'{name}: {count} запросов при бюджете {budget}\n{log.report()}'
+                        )
+                        first = counts.setdefault(name, (count, log))
+                        self.assertEqual(
+                            count, first[0],
+                            f'{name}: число запросов растет с данными ({first[0]} -> {count}) '
+                            f'при {size} задачах и page_size={page_size}\n'
+                            f'было:\n{first[1].report()}\nстало:\n{log.report()}'
+                        )
+
+        url_names = {pattern.name for pattern in tasks_urls.urlpatterns if getattr(pattern, 'name', None)}
+        url_names |= {pattern.name for pattern in tasks_urls.router.urls} - {'api-root'}
+        self.assertEqual(url_names - self.covered, set(), 'для этих URL нет бюджета запросов')
+
+
+# ==============================================
+# НЕБЛОКИРУЮЩЕЕ ЛОГИРОВАНИЕ
+# ==============================================
+
+class LogPipelineTests(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, 'http.log')
+
+    def handler(self, **kwargs):
+        handler = QueuedRotatingFileHandler(self.path, **kwargs)
+        handler.setFormatter(JSONFormatter())
+        self.addCleanup(handler.close)
+        return handler
+
+    def record(self, message='GET /api/tasks/ 200', **extra):
+        return logging.makeLogRecord({'name': 'django.request', 'levelno': logging.INFO,
+                                      'levelname': 'INFO', 'msg': message, **extra})
+
+    def read_lines(self, path=None):
+        with open(path or self.path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_json_records_with_extra_fields(self):
+        handler = self.handler()
+        handler.handle(self.record(method='GET', status_code=200, duration=0.0123))
+        handler.flush()
+
+        [line] = self.read_lines()
+        self.assertEqual(line['message'], 'GET /api/tasks/ 200')
+        self.assertEqual((line['method'], line['status_code'], line['duration']), ('GET', 200, 0.0123))
+        self.assertEqual(line['logger'], 'django.request')
+
+    def test_overflow_drops_and_counts(self):
+        handler = self.handler(queue_size=2)
+        # Фоновый поток еще не забирает записи: очередь заполняется
+        with mock.patch.object(QueuedRotatingFileHandler, '_run'):
+            for _ in range(5):
+                handler.handle(self.record())
+        self.assertEqual(handler.dropped, 3)
+
+        handler._write_records([])
+        self.assertEqual(self.read_lines()[-1]['dropped'], 3)
+
+    def test_rotation_shared_between_handlers(self):
+        # Два обработчика на одном файле - как два воркера
+        first, second = self.handler(maxBytes=2000, backupCount=20), self.handler(maxBytes=2000, backupCount=20)
+        for i in range(100):
+            (first if i % 2 else second).handle(self.record(f'request {i}'))
+            if i % 10 == 9:
+                first.flush()
+                second.flush()
+
+        paths = [self.path] + [f'{self.path}.{n}' for n in range(1, 21) if os.path.exists(f'{self.path}.{n}')]
+        self.assertGreater(len(paths), 1)
+        messages = [line['message'] for path in paths for line in self.read_lines(path)]
+        self.assertEqual(sorted(messages), sorted(f'request {i}' for i in range(100)))
+        for path in paths:
+            self.assertLessEqual(os.path.getsize(path), 2000)
+
+
+# ==============================================
+# МОНИТОР SQL
+# ==============================================
+
+class SQLMonitorTests(APITestCase):
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint('SELECT "id" FROM "t" WHERE "id" IN (1, 2, 3) AND "name" = \'x\'  LIMIT 21'),
+            fingerprint('SELECT "id" FROM "t" WHERE "id" IN (%s, %s) AND "name" = %s LIMIT 5'),
+        )
+        self.assertEqual(fingerprint('SAVEPOINT "s1404_x6"'), fingerprint('SAVEPOINT "s1404_x12"'))
+
+    # Общий монитор читает настройки на каждом запросе
+    @override_settings(SQL_SLOW_QUERY_MS=0, SQL_QUERY_SAMPLE_RATE=0.0)
+    def test_slow_queries_logged_with_view(self):
+        with self.assertLogs('tasks.sql', 'INFO') as logs:
+            self.client.get(reverse('task-stats'))
+
+        records = [record for record in logs.records if record.name == 'tasks.sql']
+        self.assertTrue(records)
+        self.assertEqual({record.view for record in records}, {'task-stats'})
+        self.assertIn('task_manager_status_counter', records[0].fingerprint)
+
+    def test_fast_queries_only_aggregated(self):
+        sql_monitor = SQLMonitor({'slow_ms': 10 ** 6, 'sample_rate': 0.0, 'flush_interval': 3600, 'top': 10})
+        with self.assertNoLogs('tasks.sql', 'INFO'):
+            for pk in range(5):
+                sql_monitor.record(f'SELECT * FROM "t" WHERE "id" = {pk}', 1.5, 1)
+        self.assertEqual(len(sql_monitor.stats), 1)
+
+        with self.assertLogs('tasks.sql.stats', 'INFO') as logs:
+            sql_monitor.flush()
+        [record] = logs.records
+        self.assertEqual((record.count, record.total_ms, record.rows), (5, 7.5, 5))
+        self.assertEqual(sql_monitor.stats, {})
+
+
+# ==============================================
+# МЕТРИКИ
+# ==============================================
+
+class MetricsTests(APITestCase):
+
+    def test_request_observed(self):
+        labels = (('view', 'task-stats'), ('method', 'GET'))
+        before = registry.histograms.get(('http_request_db_queries', labels), [0] * 11)[:]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('task-stats'))
+        self.assertEqual(response.status_code, 200)
+
+        counters, histograms = registry.collect()
+        self.assertGreaterEqual(counters[('http_requests_total', tuple(sorted(labels + (('status', '200'),))))], 1)
+        queries = histograms[('http_request_db_queries', tuple(sorted(labels)))]
+        self.assertEqual(queries[-1] - before[-1], 1)
+        self.assertEqual(queries[-2] - before[-2], len(ctx.captured_queries))
+        self.assertIn(('render_duration_seconds', tuple(sorted(labels))), histograms)
+
+    def test_prometheus_format(self):
+        metrics = Registry()
+        stats = RequestStats()
+        stats.queries, stats.query_seconds = 3, 0.002
+        metrics.observe_request('task-list-create', 'GET', 200, 0.03, stats)
+        metrics.observe_request('task-list-create', 'GET', 200, 20.0, stats)
+        text = render_prometheus(*metrics.collect())
+
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertIn('http_requests_total{method="GET",status="200",view="task-list-create"} 2', text)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",view="task-list-create",le="0.05"} 1', text)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",view="task-list-create",le="10.0"} 1', text)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",view="task-list-create",le="+Inf"} 2', text)
+        self.assertIn('http_request_duration_seconds_count{method="GET",view="task-list-create"} 2', text)
+        self.assertIn('db_queries_total{method="GET",view="task-list-create"} 6', text)
+
+    def test_workers_merged(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            worker = Registry()
+            worker.observe_request('task-stats', 'GET', 200, 0.01, RequestStats())
+            worker.dump()
+            # Снимок другого живого процесса
+            os.rename(os.path.join(directory, f'metrics-{os.getpid()}.json'),
+                      os.path.join(directory, f'metrics-{os.getppid()}.json'))
+
+            response = self.client.get('/metrics')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response['Content-Type'].startswith('text/plain'))
+            counters, _ = registry.collect()
+
+        key = ('http_requests_total', (('method', 'GET'), ('status', '200'), ('view', 'task-stats')))
+        own = registry.counters.get(('http_requests_total', (('view', 'task-stats'), ('method', 'GET'), ('status', '200'))), 0)
+        self.assertEqual(counters[key], own + 1)
+
+    def test_stale_snapshots_dropped(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            worker = Registry()
+            worker.observe_request('task-stats', 'GET', 200, 0.01, RequestStats())
+            worker.dump()
+            stale = os.path.join(directory, f'metrics-{os.getppid()}.json')
+            os.rename(os.path.join(directory, f'metrics-{os.getpid()}.json'), stale)
+            with open(os.path.join(directory, 'metrics-backup.json'), 'w') as stray:
+                stray.write('{}')
+
+            with mock.patch('tasks.metrics.process_alive', return_value=False):
+                counters, _ = Registry().collect()
+            self.assertEqual(counters, {})
+            self.assertFalse(os.path.exists(stale))
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+# ==============================================
+# УСЛОВНЫЕ ЗАПРОСЫ (ETag / Last-Modified)
+# ==============================================
+
+class ConditionalRequestTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='etag', password='Secret-pass-123')
+        self.task = Task.objects.create(title='Опрос', owner=self.user)
+        self.url = reverse('task-detail-update-delete', kwargs={'id': self.task.id})
+        self.client.force_authenticate(self.user)
+
+    def test_detail_not_modified(self):
+        response = self.client.get(self.url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        # Счетчик подзадач меняет представление задачи - меняется и ETag
+        SubTask.objects.create(title='Шаг', task=self.task, owner=self.user)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['subtask_count'], 1)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_match_prevents_lost_update(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.patch(self.url, {'status': 'done'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        # Второй клиент пишет со старым ETag
+        response = self.client.patch(self.url, {'status': 'blocked'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'done')
+
+    def test_queryset_update_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        Task.objects.filter(pk=self.task.pk).update(title='Опрос 2')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_etags(self):
+        url = reverse('my-tasks')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertNotEqual(self.client.get(url, {'page_size': 1})['ETag'], etag)
+
+        Task.objects.filter(pk=self.task.pk).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # Мягкое удаление категории меняет ETag списка категорий
+        category = Category.objects.create(name='Архив')
+        categories_url = reverse('category-list')
+        etag = self.client.get(categories_url)['ETag']
+        category.soft_delete()
+        self.assertEqual(self.client.get(categories_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+# ==============================================
+# КЭШ ОТВЕТОВ ДЛЯ АНОНИМНЫХ GET
+# ==============================================
+
+class ResponseCacheTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cache', password='Secret-pass-123')
+        self.task = Task.objects.create(title='Кэш', owner=self.user, status='new')
+        self.url = reverse('task-list-create')
+
+    def get(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_hit_without_queries(self):
+        response, _ = self.get(self.url, {'status': 'new', 'ordering': 'title'})
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+        # Тот же запрос с другим порядком параметров и пустым фильтром
+        response, queries = self.get(f'{self.url}?search=&ordering=title&status=new')
+        self.assertEqual((response['X-Cache'], queries), ('HIT', 0))
+        self.assertEqual(response.json()['results'][0]['id'], self.task.id)
+
+        hits = registry.counters[('response_cache_requests_total', (('view', 'task-list-create'), ('result', 'hit')))]
+        self.assertGreaterEqual(hits, 1)
+
+    def test_writes_invalidate(self):
+        detail_url = reverse('task-detail-update-delete', kwargs={'id': self.task.id})
+        self.get(self.url)
+        self.get(detail_url)
+
+        Task.objects.filter(pk=self.task.pk).update(title='Кэш 2')
+        response, _ = self.get(detail_url)
+        self.assertEqual((response['X-Cache'], response.json()['title']), ('MISS', 'Кэш 2'))
+
+        Task.objects.create(title='Новая', owner=self.user)
+        response, _ = self.get(self.url)
+        self.assertEqual((response['X-Cache'], len(response.json()['results'])), ('MISS', 2))
+
+        # Каскад: удаление задачи сбрасывает и кэш подзадач
+        SubTask.objects.create(title='Шаг', task=self.task, owner=self.user)
+        subtasks_url = reverse('subtask-list-create')
+        self.get(subtasks_url)
+        self.task.delete()
+        response, _ = self.get(subtasks_url)
+        self.assertEqual((response['X-Cache'], response.json()['results']), ('MISS', []))
+
+    def test_owner_delete_invalidates(self):
+        SubTask.objects.create(title='Шаг', task=self.task, owner=self.user)
+        subtasks_url = reverse('subtask-list-create')
+        for url in (self.url, subtasks_url):
+            self.get(url)
+            self.assertEqual(self.get(url)[0]['X-Cache'], 'HIT')
+
+        # Задачи и подзадачи удаляются каскадом от пользователя - модели без кэша ответов
+        self.user.delete()
+        for url in (self.url, subtasks_url):
+            response, _ = self.get(url)
+            self.assertEqual((response['X-Cache'], response.json()['results']), ('MISS', []))
+
+    def test_soft_delete_invalidates_categories(self):
+        category = Category.objects.create(name='Кэш')
+        url = reverse('category-list')
+        self.get(url)
+        self.assertEqual(self.get(url)[0]['X-Cache'], 'HIT')
+
+        category.soft_delete()
+        response, _ = self.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertNotIn(category.id, [item['id'] for item in response.json()['results']])
+
+    def test_authenticated_not_cached(self):
+        self.client.force_authenticate(self.user)
+        response, _ = self.get(self.url)
+        self.assertFalse(response.has_header('X-Cache'))
+
+
+# ==============================================
+# КЭШ ПОЛЬЗОВАТЕЛЕЙ JWT-АУТЕНТИФИКАЦИИ
+# ==============================================
+
+class AuthUserCacheTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cached', password='Secret-pass-123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.url = reverse('profile')
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        return response, sum('FROM "auth_user"' in query['sql'] for query in ctx.captured_queries)
+
+    def test_user_cached(self):
+        self.assertEqual(self.user_queries()[1], 1)
+        response, queries = self.user_queries()
+        self.assertEqual((response.status_code, queries), (200, 0))
+
+    def test_profile_update_invalidates(self):
+        self.user_queries()
+        response = self.client.patch(self.url, {'first_name': 'Новое'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        response, queries = self.user_queries()
+        self.assertEqual((response.json()['first_name'], queries), ('Новое', 1))
+
+    def test_password_change_keeps_fresh_fields(self):
+        self.user_queries()
+        # Профиль меняют в обход кэша этого запроса; смена пароля не должна его затереть
+        User.objects.filter(pk=self.user.pk).update(email='new@example.com')
+        response = self.client.put(reverse('change_password'), {
+            'old_password': 'Secret-pass-123', 'new_password': 'Another-pass-456',
+            'new_password2': 'Another-pass-456',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email, 'new@example.com')
+        self.assertTrue(self.user.check_password('Another-pass-456'))
+
+    def test_deactivation_rejects_cached_user(self):
+        self.user_queries()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+
+# ==============================================
+# ОТОЗВАННЫЕ ТОКЕНЫ
+# ==============================================
+
+class TokenBlacklistTests(APITestCase):
+
+    def setUp(self):
+        blacklist_filter.clear()
+        self.user = User.objects.create_user(username='tokens', password='Secret-pass-123')
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(1000)
+        for index in range(1000):
+            bloom.add(f'jti-{index}')
+        self.assertTrue(all(f'jti-{index}' in bloom for index in range(1000)))
+        false_positives = sum(f'other-{index}' in bloom for index in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_check_without_queries(self):
+        token = str(RefreshToken.for_user(self.user))
+        blacklist_filter.refresh()
+        with CaptureQueriesContext(connection) as ctx:
+            FilteredRefreshToken(token)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    @override_settings(TOKEN_BLACKLIST_REFRESH_INTERVAL=0)
+    def test_blacklisted_elsewhere(self):
+        token = RefreshToken.for_user(self.user)
+        blacklist_filter.refresh()
+        # Отозван другим процессом: в фильтр попадет при следующей подгрузке
+        token.blacklist()
+        with self.assertRaises(TokenError):
+            FilteredRefreshToken(str(token))
+
+    def test_refresh_token_reuse_rejected(self):
+        refresh = str(RefreshToken.for_user(self.user))
+        url = reverse('token_refresh')
+        self.assertEqual(self.client.post(url, {'refresh': refresh}, format='json').status_code, 200)
+        self.assertEqual(self.client.post(url, {'refresh': refresh}, format='json').status_code, 401)
+
+    def test_rotation_race(self):
+        token = FilteredRefreshToken(str(RefreshToken.for_user(self.user)))
+        # Оба запроса прошли проверку до того, как второй записал blacklist
+        other = FilteredRefreshToken(str(token))
+        self.assertTrue(token.blacklist()[1])
+        self.assertFalse(other.blacklist()[1])
+
+    def test_purge_expired_tokens(self):
+        expired = RefreshToken.for_user(self.user)
+        expired.blacklist()
+        RefreshToken.for_user(self.user)
+        OutstandingToken.objects.filter(jti=expired['jti']).update(expires_at=timezone.now() - timedelta(days=1))
+
+        out = StringIO()
+        call_command('purge_expired_tokens', batch_size=1, stdout=out)
+        self.assertIn('Удалено истекших токенов: 1, записей blacklist: 1', out.getvalue())
+        self.assertEqual(OutstandingToken.objects.filter(user=self.user).count(), 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+# ==============================================
+# ВХОД: LAST_LOGIN И КАЛИБРОВКА ХЭШЕРА
+# ==============================================
+
+@override_settings(LAST_LOGIN_FLUSH_INTERVAL=3600)
+class LoginHotPathTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        last_login_buffer.clear()
+        self.addCleanup(last_login_buffer.clear)
+        self.user = User.objects.create_user(username='hot', password='Secret-pass-123')
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.calibration_file = os.path.join(self.tmpdir.name, 'password_hasher.json')
+
+    def login(self, username='hot', password='Secret-pass-123'):
+        return self.client.post(reverse('login'), {'username': username, 'password': password}, format='json')
+
+    def test_login_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.login().status_code, 200)
+        user_queries = [query['sql'] for query in ctx.captured_queries if '"auth_user"' in query['sql']]
+        self.assertEqual(len(user_queries), 1)
+        self.assertTrue(user_queries[0].startswith('SELECT'))
+        self.assertEqual(sum(not query['sql'].startswith('SELECT') for query in ctx.captured_queries), 1)
+
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+        self.assertIn(self.user.pk, last_login_buffer.pending)
+
+    def test_flush_in_batches(self):
+        users = [self.user] + [
+            User.objects.create_user(username=f'hot{i}', password='Secret-pass-123') for i in range(2)
+        ]
+        for user in users:
+            self.login(user.username)
+        # Повторный вход схлопывается с первым
+        self.login()
+        self.assertEqual(len(last_login_buffer.pending), 3)
+
+        with override_settings(LAST_LOGIN_BATCH_SIZE=2), CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(last_login_buffer.flush(), 3)
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertFalse(User.objects.filter(pk__in=[user.pk for user in users], last_login=None).exists())
+        self.assertEqual(last_login_buffer.pending, {})
+
+    def test_flush_keeps_newer_login(self):
+        other = User.objects.create_user(username='cold', password='Secret-pass-123')
+        newer = timezone.now()
+        User.objects.filter(pk=self.user.pk).update(last_login=newer)
+
+        # Другой воркер уже записал более поздний вход; этот сбрасывает буфер позже
+        last_login_buffer.touch(self.user.pk, newer - timedelta(minutes=5))
+        last_login_buffer.touch(other.pk, newer - timedelta(minutes=5))
+        last_login_buffer.flush()
+
+        self.user.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.user.last_login, newer)
+        self.assertEqual(other.last_login, newer - timedelta(minutes=5))
+
+    def test_flushed_after_response(self):
+        self.login()
+        with override_settings(LAST_LOGIN_FLUSH_INTERVAL=0):
+            self.client.get(reverse('task-stats'))
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+
+    def test_calibration_rehashes_on_login(self):
+        with override_settings(PASSWORD_HASHER_CALIBRATION_FILE=self.calibration_file,
+                               PASSWORD_HASHER_MIN_ITERATIONS=1000):
+            out = StringIO()
+            call_command('calibrate_password_hasher', target_ms=1, sample_iterations=1000, samples=1,
+                         stdout=out, stderr=StringIO())
+            self.assertIn('Сохранено', out.getvalue())
+            iterations = calibration.get('pbkdf2_sha256')['iterations']
+            self.assertGreaterEqual(iterations, 1000)
+
+            self.assertEqual(self.login().status_code, 200)
+            self.user.refresh_from_db()
+            self.assertEqual(int(self.user.password.split('$')[1]), iterations)
+            # Следующий вход - уже без пересчета и без записи пользователя
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.login().status_code, 200)
+            self.assertFalse(any(query['sql'].startswith('UPDATE') for query in ctx.captured_queries))
+
+            call_command('calibrate_password_hasher', reset=True, stdout=StringIO())
+            self.assertIsNone(calibration.get('pbkdf2_sha256'))
+
+
+# ==============================================
+# АСИНХРОННЫЕ ПРЕДСТАВЛЕНИЯ ЧТЕНИЯ
+# ==============================================
+
+class AsyncViewTests(APITestCase):
+    """Асинхронные варианты отвечают так же, как синхронные DRF-представления"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='async', password='Secret-pass-123')
+        cls.other = User.objects.create_user(username='async_other', password='Secret-pass-123')
+        now = timezone.now()
+        cls.tasks = [
+            Task.objects.create(owner=cls.user if i % 2 else cls.other, title=f'Задача {i}',
+                                status='done' if i % 3 else 'new', deadline=now + timedelta(days=i - 3))
+            for i in range(9)
+        ]
+        SubTask.objects.create(owner=cls.user, task=cls.tasks[1], title='Шаг')
+
+    def setUp(self):
+        cache.clear()
+        single_flight.clear()
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def pages(self, url, params):
+        """Все страницы списка: (id по страницам, ответы)"""
+        pages, responses = [], []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200, response.content)
+            responses.append(response)
+            pages.append([item['id'] for item in response.json()['results']])
+            link = response.json()['next']
+            if not link:
+                return pages, responses
+            response = self.client.get(link)
+
+    def test_list_matches_sync(self):
+        cases = [
+            (reverse('task-list-create'), reverse('async-task-list'),
+             {'page_size': 2, 'status': 'done', 'ordering': '-title'}),
+            (reverse('task-list-create'), reverse('async-task-list'), {'search': 'задача', 'page_size': 4}),
+            (reverse('task-list-create'), reverse('async-task-list'), {'pagination': 'page', 'page_size': 4}),
+            (reverse('subtask-list-create'), reverse('async-subtask-list'), {'task': self.tasks[1].pk}),
+        ]
+        for sync_url, async_url, params in cases:
+            with self.subTest(url=async_url, params=params):
+                sync_pages, sync_responses = self.pages(sync_url, params)
+                async_pages, async_responses = self.pages(async_url, params)
+                self.assertEqual(async_pages, sync_pages)
+                self.assertEqual(async_responses[0].json().get('count'), sync_responses[0].json().get('count'))
+                self.assertEqual(async_responses[-1]['X-Cache'], 'MISS')
+
+    def test_filter_errors_match_sync(self):
+        params = {'task': 10 ** 6}
+        sync_response = self.client.get(reverse('subtask-list-create'), params)
+        async_response = self.client.get(reverse('async-subtask-list'), params)
+        self.assertEqual(async_response.status_code, 400)
+        self.assertEqual(async_response.json(), sync_response.json())
+
+        response = self.client.get(reverse('async-task-list'), {'cursor': 'не-курсор'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_my_tasks_requires_auth(self):
+        response = self.client.get(reverse('async-my-tasks'))
+        self.assertEqual(response.status_code, 401)
+        self.assertTrue(response.has_header('WWW-Authenticate'))
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        response = self.client.get(reverse('async-my-tasks'), {'page_size': 10})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {item['id'] for item in response.json()['results']},
+            {task.pk for task in self.tasks if task.owner_id == self.user.pk},
+        )
+        self.assertEqual(response['ETag'], self.client.get(reverse('my-tasks'), {'page_size': 10})['ETag'])
+
+        response = self.client.get(reverse('async-my-tasks'), {'page_size': 10},
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not.a.token')
+        self.assertEqual(self.client.get(reverse('async-my-tasks')).status_code, 401)
+
+    def test_detail_and_stats_match_sync(self):
+        task = self.tasks[1]
+        sync_response = self.client.get(reverse('task-detail-update-delete', args=[task.pk]))
+        async_response = self.client.get(reverse('async-task-detail', args=[task.pk]))
+        self.assertEqual(async_response.json(), sync_response.json())
+        self.assertEqual(async_response['ETag'], sync_response['ETag'])
+        self.assertEqual(self.client.get(reverse('async-task-detail', args=[10 ** 6])).status_code, 404)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        for params in ({}, {'my_tasks': 'true'}):
+            with self.subTest(params=params):
+                self.assertEqual(
+                    self.client.get(reverse('async-task-stats'), params).json(),
+                    self.client.get(reverse('task-stats'), params).json(),
+                )
+
+    def test_writes_not_allowed(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        response = self.client.post(reverse('async-task-list'), {'title': 'Нет'}, format='json')
+        self.assertEqual(response.status_code, 405)
+
+    async def test_project_middlewares_skip_sync_to_async(self):
+        async def view(request):
+            return HttpResponse('ok')
+
+        handler = view
+        for middleware_class in (RequestLoggingMiddleware, ReplicaRoutingMiddleware, MetricsMiddleware):
+            handler = middleware_class(handler)
+            self.assertTrue(iscoroutinefunction(handler))
+        self.assertTrue(iscoroutinefunction(RequestLoggingMiddleware(view).process_view))
+
+        # Ни один хук не уходит в синхронный поток (MiddlewareMixin ушел бы на каждом).
+        # Анонимный GET: закрепления читаются из кэша только для пользователей
+        calls = []
+        original = SyncToAsync.__call__
+
+        async def counting(self, *args, **kwargs):
+            calls.append(self.func)
+            return await original(self, *args, **kwargs)
+
+        request = AsyncRequestFactory().get(reverse('async-task-list'))
+        with override_settings(DATABASE_REPLICAS=['default']), mock.patch.object(SyncToAsync, '__call__', counting):
+            response = await handler(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(calls, [])
+        self.assertTrue(request.db_routing.use_replica)
+
+    async def test_asgi_handler(self):
+        response = await self.async_client.get(
+            reverse('async-my-tasks'), headers={'Authorization': f'Bearer {self.token}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 4)
+
+
+# ==============================================
+# SQLITE: PRAGMA И ОБСЛУЖИВАНИЕ
+# ==============================================
+
+@skipUnless(connection.vendor == 'sqlite', 'PRAGMA только в SQLite')
+class SQLiteTuningTests(TestCase):
+
+    def file_connection(self):
+        """Отдельное соединение с файловой базой: тестовая база в памяти не переходит в WAL"""
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        settings_dict = {**connection.settings_dict, 'NAME': os.path.join(tmpdir.name, 'tuning.sqlite3')}
+        file_connection = type(connections['default'])(settings_dict, alias='tuning')
+        self.addCleanup(file_connection.close)
+        return file_connection
+
+    def test_pragmas_applied_on_connect(self):
+        pragmas = read_pragmas(self.file_connection())
+        self.assertEqual(pragmas['journal_mode'], 'wal')
+        # 1 - NORMAL, 2 - MEMORY, 2 - INCREMENTAL
+        self.assertEqual(
+            (pragmas['synchronous'], pragmas['temp_store'], pragmas['auto_vacuum']), (1, 2, 2)
+        )
+        self.assertEqual((pragmas['busy_timeout'], pragmas['cache_size']), (5000, -64000))
+        self.assertEqual(pragmas['mmap_size'], 256 * 1024 * 1024)
+
+    @override_settings(SQLITE_TUNING_ENABLED=False)
+    def test_tuning_can_be_disabled(self):
+        self.assertEqual(read_pragmas(self.file_connection(), ['journal_mode'])['journal_mode'], 'delete')
+
+    def test_maintenance_frees_pages_and_checkpoints(self):
+        file_connection = self.file_connection()
+        with file_connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE filler (payload TEXT)')
+            cursor.executemany('INSERT INTO filler VALUES (%s)', [('x' * 2000,) for _ in range(200)])
+            cursor.execute('DELETE FROM filler')
+
+        results = run_maintenance(file_connection)
+        self.assertEqual(list(results), ['analyze', 'optimize', 'vacuum', 'checkpoint'])
+        self.assertGreater(results['vacuum']['freed_pages'], 0)
+        self.assertFalse(results['checkpoint']['busy'])
+        with file_connection.cursor() as cursor:
+            cursor.execute('PRAGMA freelist_count')
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_maintenance_command(self):
+        out = StringIO()
+        call_command('db_maintenance', steps='analyze,optimize,checkpoint', stdout=out)
+        self.assertIn('✓ Обслуживание выполнено: analyze, optimize, checkpoint', out.getvalue())
+        # Тестовая база в памяти - checkpoint пропускается, а не падает
+        self.assertIn('skipped', out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command('db_maintenance', steps='defragment', stdout=StringIO())
+
+
+# ==============================================
+# РЕПЛИКИ ЧТЕНИЯ
+# ==============================================
+
+@skipUnless(connection.vendor == 'sqlite', 'Реплика - копия файла SQLite')
+@override_settings(DATABASE_REPLICAS=['replica_test'])
+class ReplicaRoutingTests(APITransactionTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Алиас реплики заводится после проверок раннера (его нет в DATABASES) и разрешается явно
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.replica_path = os.path.join(cls.tmpdir.name, 'replica.sqlite3')
+        connections.settings['replica_test'] = {**connections['default'].settings_dict, 'NAME': cls.replica_path}
+        cls.databases = {'default', 'replica_test'}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica_test'].close()
+        super().tearDownClass()
+        del connections['replica_test']
+        del connections.settings['replica_test']
+        cls.tmpdir.cleanup()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='replica', password='Secret-pass-123')
+        self.other = User.objects.create_user(username='other', password='Secret-pass-123')
+        self.copied = Task.objects.create(owner=self.user, title='Есть в реплике')
+
+        # Реплика - снимок базы на этот момент; дальше она не обновляется
+        connections['replica_test'].close()
+        call_command('sqlite_replica', self.replica_path, stdout=StringIO())
+
+        self.primary_only = Task.objects.create(owner=self.user, title='Только в основной')
+        self.url = reverse('task-list-create')
+        self.token = f'Bearer {RefreshToken.for_user(self.user).access_token}'
+
+    def task_ids(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        return {item['id'] for item in response.json()['results']}
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.task_ids(), {self.copied.id})
+        self.assertEqual(self.task_ids(Authorization=self.token), {self.copied.id})
+        self.assertEqual(self.client.get(reverse('async-task-list')).json()['results'][0]['id'], self.copied.id)
+
+    def test_writer_sticks_to_primary(self):
+        response = self.client.post(self.url, {'title': 'Новая'}, format='json', headers={'Authorization': self.token})
+        self.assertEqual(response.status_code, 201)
+
+        # Писавший клиент видит свою запись, остальные читают реплику
+        self.assertEqual(
+            self.task_ids(Authorization=self.token), {self.copied.id, self.primary_only.id, response.json()['id']}
+        )
+        self.assertEqual(self.task_ids(), {self.copied.id})
+        other = f'Bearer {RefreshToken.for_user(self.other).access_token}'
+        self.assertEqual(self.task_ids(Authorization=other), {self.copied.id})
+
+    def test_pin_survives_token_refresh(self):
+        refresh = RefreshToken.for_user(self.user)
+        token = f'Bearer {refresh.access_token}'
+        response = self.client.post(self.url, {'title': 'Новая'}, format='json', headers={'Authorization': token})
+        self.assertEqual(response.status_code, 201)
+
+        # Новый access-токен (в запросе обновления нет Authorization) - закрепление то же
+        refreshed = self.client.post(reverse('token_refresh'), {'refresh': str(refresh)}, format='json')
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertEqual(
+            self.task_ids(Authorization=f'Bearer {refreshed.json()["access"]}'),
+            {self.copied.id, self.primary_only.id, response.json()['id']},
+        )
+
+    def test_new_user_reads_primary(self):
+        response = self.client.post(reverse('register'), {
+            'username': 'newcomer', 'email': 'newcomer@example.com',
+            'password': 'Replica-pass-123', 'password2': 'Replica-pass-123',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        # Пользователя еще нет в реплике: без закрепления профиль не прочитать
+        profile = self.client.get(
+            reverse('profile'), headers={'Authorization': f'Bearer {response.json()["tokens"]["access"]}'}
+        )
+        self.assertEqual(profile.status_code, 200)
+        self.assertEqual(profile.json()['username'], 'newcomer')
+
+    @override_settings(DATABASE_REPLICA_STICKY_SECONDS=0)
+    def test_pin_expires(self):
+        self.client.post(self.url, {'title': 'Новая'}, format='json', headers={'Authorization': self.token})
+        self.assertEqual(self.task_ids(Authorization=self.token), {self.copied.id})
+
+    def test_stale_replica_read_not_cached(self):
+        self.client.post(self.url, {'title': 'Новая'}, format='json', headers={'Authorization': self.token})
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+
+    def test_router(self):
+        router = ReplicaRouter()
+        token = current_routing.set(RoutingState(use_replica=True))
+        try:
+            self.assertEqual(router.db_for_read(Task), 'replica_test')
+            self.assertEqual(router.db_for_write(Task), 'default')
+            # После записи чтение в этом запросе - с основной базы
+            self.assertEqual(router.db_for_read(Task), 'default')
+        finally:
+            current_routing.reset(token)
+        self.assertEqual(router.db_for_read(Task), 'default')
+        self.assertFalse(router.allow_migrate('replica_test', 'tasks'))
+        self.assertIsNone(router.allow_migrate('default', 'tasks'))
 
-# Create your tests here.
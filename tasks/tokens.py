@@ -0,0 +1,159 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow, datetime_from_epoch
+
+# Повторно читаем записи за последние секунды: транзакции коммитятся не в порядке blacklisted_at
+INCREMENTAL_OVERLAP = timedelta(seconds=10)
+MIN_CAPACITY = 10000
+
+
+def get_config():
+    return {
+        'refresh_interval': getattr(settings, 'TOKEN_BLACKLIST_REFRESH_INTERVAL', 5),
+        'rebuild_interval': getattr(settings, 'TOKEN_BLACKLIST_REBUILD_INTERVAL', 600),
+    }
+
+
+# ==============================================
+# ФИЛЬТР БЛУМА ОТОЗВАННЫХ ТОКЕНОВ
+# ==============================================
+
+class BloomFilter:
+    """Битовый массив на capacity элементов с долей ложных срабатываний error_rate"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + index * second) % self.size for index in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class TokenBlacklistFilter:
+    """
+    jti отозванных и еще не истекших refresh-токенов в памяти процесса. Раз в refresh_interval
+    секунд подгружаются новые записи BlacklistedToken, раз в rebuild_interval фильтр
+    собирается заново (без истекших и удаленных purge_expired_tokens). «Нет в фильтре» -
+    токен точно не отозван к моменту последней подгрузки; «есть» - проверяем в базе
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.loaded_until = None
+        self.refreshed_at = 0.0
+        self.rebuilt_at = 0.0
+
+    def _blacklisted(self):
+        return BlacklistedToken.objects.filter(token__expires_at__gt=aware_utcnow())
+
+    def _load(self, rows):
+        for jti, blacklisted_at in rows.values_list('token__jti', 'blacklisted_at').iterator(chunk_size=2000):
+            self.bloom.add(jti)
+            if self.loaded_until is None or blacklisted_at > self.loaded_until:
+                self.loaded_until = blacklisted_at
+
+    def refresh(self):
+        config = get_config()
+        now = time.monotonic()
+        with self.lock:
+            if self.bloom is not None and now - self.refreshed_at < config['refresh_interval']:
+                return
+            rebuild = (
+                self.bloom is None
+                or self.bloom.count > self.bloom.capacity
+                or now - self.rebuilt_at >= config['rebuild_interval']
+            )
+            if rebuild:
+                self.bloom = BloomFilter(max(MIN_CAPACITY, 2 * self._blacklisted().count()))
+                self.loaded_until = None
+                self._load(self._blacklisted())
+                self.rebuilt_at = now
+            elif self.loaded_until is not None:
+                self._load(self._blacklisted().filter(blacklisted_at__gte=self.loaded_until - INCREMENTAL_OVERLAP))
+            else:
+                self._load(self._blacklisted())
+            self.refreshed_at = now
+
+    def might_contain(self, jti):
+        self.refresh()
+        return jti in self.bloom
+
+    def add(self, jti):
+        with self.lock:
+            if self.bloom is not None:
+                self.bloom.add(jti)
+
+    def clear(self):
+        with self.lock:
+            self.bloom = None
+
+
+blacklist_filter = TokenBlacklistFilter()
+
+
+# ==============================================
+# REFRESH-ТОКЕН
+# ==============================================
+
+class RefreshToken(BaseRefreshToken):
+    """
+    RefreshToken simplejwt с дешевыми проверками blacklist:
+      check_blacklist - запрос в базу только если jti есть в фильтре Блума;
+      blacklist - без загрузки пользователя и без лишних SELECT; возвращает
+      (BlacklistedToken, created), created=False - токен уже был отозван.
+    Вставка в BlacklistedToken уникальна по токену, поэтому из двух одновременных
+    ротаций одного refresh-токена created=True получит только одна
+    """
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if blacklist_filter.might_contain(jti) and BlacklistedToken.objects.filter(token__jti=jti).exists():
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        try:
+            outstanding = OutstandingToken.objects.get(jti=jti)
+        except OutstandingToken.DoesNotExist:
+            outstanding, _created = OutstandingToken.objects.get_or_create(
+                jti=jti,
+                defaults={
+                    'user_id': self.payload.get(api_settings.USER_ID_CLAIM),
+                    'created_at': self.current_time,
+                    'token': str(self),
+                    'expires_at': datetime_from_epoch(self.payload['exp']),
+                },
+            )
+
+        blacklist_filter.add(jti)
+        try:
+            with transaction.atomic():
+                return BlacklistedToken.objects.create(token=outstanding), True
+        except IntegrityError:
+            return BlacklistedToken.objects.get(token=outstanding), False
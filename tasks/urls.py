@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
 
 router = DefaultRouter()
 router.register(r'categories', views.CategoryViewSet, basename='category')
@@ -38,12 +38,26 @@ urlpatterns = [
     path('tasks/<int:id>/', views.TaskRetrieveUpdateDestroyView.as_view(),
          name='task-detail-update-delete'),
     path('tasks/my/', views.MyTasksView.as_view(), name='my-tasks'),
+    path('tasks/bulk/', views.TaskBulkView.as_view(), name='task-bulk'),
+    path('tasks/export/', views.TaskExportView.as_view(), name='task-export'),
 
     # Подзадачи
     path('subtasks/', views.SubTaskListCreateView.as_view(), name='subtask-list-create'),
     path('subtasks/<int:id>/', views.SubTaskRetrieveUpdateDestroyView.as_view(),
          name='subtask-detail-update-delete'),
+    path('subtasks/bulk/', views.SubTaskBulkView.as_view(), name='subtask-bulk'),
 
     # Статистика
     path('tasks/stats/', views.TaskStatsAPIView.as_view(), name='task-stats'),
-]
\ No newline at end of file
+
+    # ==============================================
+    # АСИНХРОННЫЕ ВАРИАНТЫ ЧТЕНИЯ (ASGI)
+    # ==============================================
+
+    # Те же ответы, что у синхронных представлений выше; выигрыш - под ASGI-сервером
+    path('async/tasks/', async_views.AsyncTaskListView.as_view(), name='async-task-list'),
+    path('async/tasks/<int:id>/', async_views.AsyncTaskDetailView.as_view(), name='async-task-detail'),
+    path('async/tasks/my/', async_views.AsyncMyTasksView.as_view(), name='async-my-tasks'),
+    path('async/tasks/stats/', async_views.AsyncTaskStatsView.as_view(), name='async-task-stats'),
+    path('async/subtasks/', async_views.AsyncSubTaskListView.as_view(), name='async-subtask-list'),
+]
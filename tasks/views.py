@@ -1,20 +1,20 @@
-from rest_framework import viewsets, status, generics, filters, permissions
+from rest_framework import viewsets, status, generics, permissions
 from rest_framework.decorators import action, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.pagination import PageNumberPagination
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
+from django.http import StreamingHttpResponse
 from django.db.models import Q
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
 from datetime import timedelta
 
 from . import serializers
-from .models import Task, SubTask, Category
+from .models import Task, SubTask, Category, TaskStatusCounter
 from .serializers import (
     TaskDetailSerializer,
     TaskCreateSerializer,
@@ -26,23 +26,18 @@ from .serializers import (
     UserProfileSerializer
 )
 from .permissions import IsOwnerOrReadOnly, IsTaskOwner, IsSubTaskOwner
-
-
-# Класс пагинации
-class CustomPagination(PageNumberPagination):
-    page_size = 5
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
-    def get_paginated_response(self, data):
-        return Response({
-            'count': self.page.paginator.count,
-            'total_pages': self.page.paginator.num_pages,
-            'current_page': self.page.number,
-            'next': self.get_next_link(),
-            'previous': self.get_previous_link(),
-            'results': data
-        })
+from .filters import CaseInsensitiveOrderingFilter
+from .coalescing import coalesce_response
+from .conditional import ConditionalListMixin, ConditionalObjectMixin
+from .response_cache import CachedResponseMixin
+from .search import FullTextSearchFilter
+from .pagination import KeysetPagination
+from .authentication import fresh_user
+from .bulk import BulkWriteView
+from .export import EXPORT_FORMATS, stream_export
+from .last_login import last_login_buffer
+from .db_router import remember_writer
+from .tokens import RefreshToken
 
 
 # ==============================================
@@ -64,6 +59,8 @@ class RegisterView(generics.CreateAPIView):
 
         # Создаем пользователя
         user = serializer.save()
+        # Чтения нового пользователя - с основной базы, пока реплика не догнала запись
+        remember_writer(user.pk)
 
         # Создаем JWT токены для нового пользователя
         refresh = RefreshToken.for_user(user)
@@ -109,10 +106,11 @@ class CustomTokenObtainPairView(TokenObtainPairView):
 
         # Создаем токены
         refresh = RefreshToken.for_user(user)
+        remember_writer(user.pk)
 
-        # Обновляем last_login
+        # last_login пишется не в запросе, а пачкой из буфера (tasks/last_login.py)
         user.last_login = timezone.now()
-        user.save(update_fields=['last_login'])
+        last_login_buffer.touch(user.pk, user.last_login)
 
         response_data = {
             'message': 'Вход выполнен успешно',
@@ -226,18 +224,21 @@ class TokenRefreshView(APIView):
             # Пробуем обновить токен
             refresh = RefreshToken(refresh_token)
 
-            # Помещаем старый токен в blacklist (если включено)
-            try:
-                refresh.blacklist()
-            except Exception:
-                pass  # Игнорируем, если blacklist не настроен
+            # Помещаем старый токен в blacklist. Если он уже там, этот refresh-токен
+            # успел обменять параллельный запрос - повторная ротация запрещена
+            _, created = refresh.blacklist()
+            if not created:
+                raise TokenError('Token is blacklisted')
+            remember_writer(refresh[api_settings.USER_ID_CLAIM])
 
-            # Создаем новые токены
-            new_refresh = RefreshToken.for_user(refresh.access_token.payload['user_id'])
+            # Ротация: тот же токен с новыми jti и сроком, как в TokenRefreshSerializer simplejwt
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
 
             return Response({
-                'access': str(new_refresh.access_token),
-                'refresh': str(new_refresh),
+                'access': str(refresh.access_token),
+                'refresh': str(refresh),
             })
 
         except TokenError as e:
@@ -259,7 +260,9 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        if self.request.method in permissions.SAFE_METHODS:
+            return self.request.user
+        return fresh_user(self.request.user)
 
 
 class ChangePasswordView(generics.UpdateAPIView):
@@ -270,7 +273,7 @@ class ChangePasswordView(generics.UpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        return fresh_user(self.request.user)
 
     def update(self, request, *args, **kwargs):
         user = self.get_object()
@@ -278,14 +281,14 @@ class ChangePasswordView(generics.UpdateAPIView):
 
         if serializer.is_valid():
             # Проверяем старый пароль
-            if not user.check_password(serializer.data.get("old_password")):
+            if not user.check_password(serializer.validated_data["old_password"]):
                 return Response(
                     {"old_password": "Неверный пароль"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
             # Устанавливаем новый пароль
-            user.set_password(serializer.data.get("new_password"))
+            user.set_password(serializer.validated_data["new_password"])
             user.save()
 
             return Response(
@@ -300,10 +303,11 @@ class ChangePasswordView(generics.UpdateAPIView):
 # СУЩЕСТВУЮЩИЕ ПРЕДСТАВЛЕНИЯ (ОБНОВЛЯЕМ)
 # ==============================================
 
-class TaskListCreateView(generics.ListCreateAPIView):
+class TaskListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
+    cache_models = (Task,)
     serializer_class = TaskCreateSerializer
-    pagination_class = CustomPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, CaseInsensitiveOrderingFilter, FullTextSearchFilter]
     filterset_fields = ['status', 'deadline']
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'deadline', 'title']
@@ -326,7 +330,9 @@ class TaskListCreateView(generics.ListCreateAPIView):
         serializer.save(owner=self.request.user)
 
 
-class TaskRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class TaskRetrieveUpdateDestroyView(CachedResponseMixin, ConditionalObjectMixin,
+                                    generics.RetrieveUpdateDestroyAPIView):
+    cache_models = (Task,)
     queryset = Task.objects.all()
     serializer_class = TaskDetailSerializer
     lookup_field = 'id'
@@ -337,11 +343,12 @@ class TaskRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         return [permissions.IsAuthenticated(), IsTaskOwner()]
 
 
-class SubTaskListCreateView(generics.ListCreateAPIView):
+class SubTaskListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
+    cache_models = (SubTask,)
     queryset = SubTask.objects.all()
     serializer_class = SubTaskSerializer
-    pagination_class = CustomPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, CaseInsensitiveOrderingFilter, FullTextSearchFilter]
     filterset_fields = ['status', 'deadline', 'task']
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'deadline', 'title']
@@ -356,7 +363,7 @@ class SubTaskListCreateView(generics.ListCreateAPIView):
         serializer.save(owner=self.request.user)
 
 
-class SubTaskRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class SubTaskRetrieveUpdateDestroyView(ConditionalObjectMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = SubTask.objects.all()
     serializer_class = SubTaskSerializer
     lookup_field = 'id'
@@ -367,16 +374,71 @@ class SubTaskRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         return [permissions.IsAuthenticated(), IsSubTaskOwner()]
 
 
-class MyTasksView(generics.ListAPIView):
+class TaskBulkView(BulkWriteView):
+    """Массовое создание, изменение и удаление задач текущего пользователя"""
+    model = Task
+    serializer_class = TaskCreateSerializer
+
+
+class SubTaskBulkView(BulkWriteView):
+    """
+    Массовые операции с подзадачами. Родительские задачи всех элементов
+    загружаются одним запросом и только среди задач текущего пользователя
+    """
+    model = SubTask
+    serializer_class = SubTaskSerializer
+
+    def get_serializer_context(self, items):
+        context = super().get_serializer_context(items)
+        task_ids = {
+            self._pk(item.get('task'))
+            for item in items
+            if isinstance(item, dict) and 'task' in item
+        }
+        task_ids.discard(None)
+        context['prefetched'] = {
+            'task': Task.objects.filter(owner=self.request.user).in_bulk(task_ids) if task_ids else {},
+        }
+        return context
+
+
+class MyTasksView(ConditionalListMixin, generics.ListAPIView):
     serializer_class = TaskDetailSerializer
-    pagination_class = CustomPagination
+    pagination_class = KeysetPagination
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         return Task.objects.filter(owner=self.request.user).order_by('-created_at')
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class TaskExportView(APIView):
+    """
+    Полный экспорт задач текущего пользователя с подзадачами и категориями.
+    ?export_format=ndjson (по умолчанию) или csv. Ответ стримится по мере чтения
+    из базы, память не зависит от размера экспорта
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        export_format = request.query_params.get('export_format', 'ndjson').lower()
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f'Неизвестный формат экспорта. Доступны: {", ".join(EXPORT_FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        response = StreamingHttpResponse(
+            stream_export(request.user, export_format),
+            content_type=EXPORT_FORMATS[export_format],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="tasks-{request.user.username}.{export_format}"'
+        )
+        return response
+
+
+class CategoryViewSet(CachedResponseMixin, ConditionalListMixin, ConditionalObjectMixin, viewsets.ModelViewSet):
+    cache_models = (Category,)
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
@@ -400,6 +462,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
         )
 
     @action(detail=True, methods=['get'], permission_classes=[permissions.AllowAny])
+    @coalesce_response()
     def count_tasks(self, request, pk=None):
         category = self.get_object()
         tasks_count = category.tasks.count()
@@ -412,31 +475,44 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
 
 class TaskStatsAPIView(APIView):
+    """
+    Статистика по задачам.
+    Количество по статусам читается из TaskStatusCounter (O(1)),
+    просроченные задачи - одним диапазонным запросом по индексу deadline.
+    С ?my_tasks=true авторизованный пользователь получает статистику по своим задачам
+    """
     permission_classes = [permissions.AllowAny]
 
+    @coalesce_response()
     def get(self, request):
-        total_tasks = Task.objects.count()
-        total_overdue = Task.objects.filter(deadline__lt=timezone.now()).count()
-
-        status_new = Task.objects.filter(status='new').count()
-        status_in_progress = Task.objects.filter(status='in_progress').count()
-        status_pending = Task.objects.filter(status='pending').count()
-        status_blocked = Task.objects.filter(status='blocked').count()
-        status_done = Task.objects.filter(status='done').count()
+        owner = self.get_owner(request)
+        status_counts = list(TaskStatusCounter.objects.filter(owner=owner).values_list('status', 'count'))
+        return Response(self.build_stats(status_counts, self.overdue_tasks(owner).count()))
+
+    def get_owner(self, request):
+        if request.user.is_authenticated:
+            if request.query_params.get('my_tasks', '').lower() == 'true':
+                return request.user
+        return None
+
+    def overdue_tasks(self, owner):
+        overdue = Task.objects.filter(deadline__lt=timezone.now())
+        if owner is not None:
+            overdue = overdue.filter(owner=owner)
+        return overdue
+
+    def build_stats(self, status_counts, total_overdue):
+        by_status = {status_key: 0 for status_key, _ in Task.STATUS_CHOICES}
+        by_status.update(status_counts)
+        total_tasks = sum(by_status.values())
 
         completion_rate = 0
         if total_tasks > 0:
-            completion_rate = round((status_done / total_tasks) * 100, 2)
+            completion_rate = round((by_status['done'] / total_tasks) * 100, 2)
 
-        return Response({
+        return {
             'total_tasks': total_tasks,
             'total_overdue': total_overdue,
-            'by_status': {
-                'new': status_new,
-                'in_progress': status_in_progress,
-                'pending': status_pending,
-                'blocked': status_blocked,
-                'done': status_done
-            },
+            'by_status': by_status,
             'completion_rate': completion_rate
-        })
\ No newline at end of file
+        }